@@ -0,0 +1,144 @@
+import asyncio
+import multiprocessing
+import resource
+import time
+from multiprocessing.connection import Connection
+from typing import List
+
+import numpy as np
+from loguru import logger
+
+from ..model.binance_client_models import EventType
+from ..model.processor_models import (
+    KLineData,
+    KLineInterval,
+    ProcessorConfig,
+    ProcessorHighRiseConfig,
+)
+from ..services.processor import LogicType, ProcessorId
+from ..services_impl.binance_client_pool_impl import (
+    BinanceClientWebsocketStreamManagerPoolImpl,
+)
+from ..services_impl.processors_manager_pool_impl import create_processors_manager
+from ..utils.binance_utils import BinanceStreamNameUtil
+from .synthetic_binance_server import SyntheticBinanceServer
+
+STREAMS_COUNTS = (100, 1000, 2000)
+TICKS_PER_SECOND = 0.5  # Open candle updates per stream, like Binance
+CANDLE_SECONDS = 2.0  # Compressed interval, closes every stream at once
+WARM_UP_SECONDS = 2.0
+DURATION = 15.0
+CONFIG = ProcessorConfig(ProcessorHighRiseConfig({3, 5}))  # Fills within a run
+
+
+def run_server(connection: Connection) -> None:
+    # Own process, so its CPU does not count against the client
+    async def serve() -> None:
+        server = SyntheticBinanceServer(
+            ticks_per_second=TICKS_PER_SECOND, candle_seconds=CANDLE_SECONDS
+        )
+        connection.send(await server.start())
+        await asyncio.get_running_loop().run_in_executor(None, connection.recv)
+        await server.stop()
+
+    logger.remove()
+    asyncio.run(serve())
+
+
+def get_symbols(count: int) -> List[str]:
+    return [f"SYMBOL{i}USDT" for i in range(count)]
+
+
+async def measure(url: str, streams_count: int) -> None:
+    latencies: List[float] = list()
+    triggers = 0
+    is_measuring = False
+
+    async def on_logic_triggered(
+        processor_id: ProcessorId, logic_type: LogicType, data: KLineData
+    ) -> None:
+        nonlocal triggers
+        triggers += 1
+
+    # PROCESSORS_WORKERS selects processors in this process or in workers
+    manager = await create_processors_manager(on_logic_triggered)
+    await manager.create_processors(
+        get_symbols(streams_count),
+        KLineInterval.K_LINE_INTERVAL_1_MINUTE,
+        {LogicType.HIGH_VOLUME_RAISE},
+        CONFIG,
+    )
+
+    async def on_k_line(data: KLineData) -> None:
+        await manager.update_data(data)
+        if is_measuring:
+            # Logics are awaited inside update_data without workers, so this
+            # is completion, with workers it is the hand-off to them
+            latencies.append(time.time() * 1000 - data.event_time)
+
+    client = await BinanceClientWebsocketStreamManagerPoolImpl.create(
+        {EventType.KLINE: on_k_line},
+        connection_url=url,
+        connections=max(1, streams_count // 1024 + 1),
+        fast_decode=True,
+    )
+    await client.start()
+    await client.subscribe(
+        {
+            BinanceStreamNameUtil.get_k_line_stream(symbol.lower(), "1m")
+            for symbol in get_symbols(streams_count)
+        }
+    )
+    await asyncio.sleep(WARM_UP_SECONDS)
+
+    is_measuring = True
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started_at = time.perf_counter()
+    await asyncio.sleep(DURATION)
+    elapsed = time.perf_counter() - started_at
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    is_measuring = False
+
+    await client.stop()
+    await manager.stop()
+
+    cpu = (
+        usage_after.ru_utime
+        - usage_before.ru_utime
+        + usage_after.ru_stime
+        - usage_before.ru_stime
+    )
+    latency = np.array(latencies) if latencies else np.zeros(1)
+    print(
+        f"streams {streams_count:>5} "
+        f"{len(latencies) / elapsed:>8,.0f} k-lines/sec "
+        f"p50 {np.percentile(latency, 50):>7.2f}ms "
+        f"p99 {np.percentile(latency, 99):>7.2f}ms "
+        f"max {latency.max():>7.2f}ms "
+        f"cpu {100 * cpu / elapsed:>5.1f}% "
+        # Linux reports kilobytes
+        f"max rss {usage_after.ru_maxrss / 1024:>6.1f}MB "
+        f"triggers {triggers}"
+    )
+
+
+async def main() -> None:
+    logger.remove()
+    context = multiprocessing.get_context("spawn")
+    for streams_count in STREAMS_COUNTS:
+        # Fresh server per run, streams of previous runs are gone
+        connection, server_connection = context.Pipe()
+        server = context.Process(target=run_server, args=(server_connection,))
+        server.start()
+        try:
+            url = await asyncio.get_running_loop().run_in_executor(
+                None, connection.recv
+            )
+            await measure(url, streams_count)
+        finally:
+            connection.send(None)
+            server.join()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
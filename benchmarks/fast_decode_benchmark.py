@@ -0,0 +1,87 @@
+import asyncio
+import json
+import random
+import time
+from typing import Callable, List
+
+from ..model.binance_client_models import EventType, Utils
+from ..utils.binance_to_processor_model_mapper import (
+    binance_to_processor_kline_data,
+    raw_to_processor_kline_data,
+)
+
+MESSAGES_COUNT = 100_000
+ROUNDS = 3
+
+
+def generate_frames(count: int, symbols_count: int = 1000) -> List[str]:
+    rnd = random.Random(42)
+    frames = list()
+    for i in range(count):
+        price = rnd.uniform(1, 1000)
+        start_time = 1_660_000_000_000 + (i // symbols_count) * 60_000
+        frames.append(
+            json.dumps(
+                {
+                    "e": "kline",
+                    "E": start_time + 2000,
+                    "s": f"SYMBOL{i % symbols_count}USDT",
+                    "k": {
+                        "t": start_time,
+                        "T": start_time + 59_999,
+                        "s": f"SYMBOL{i % symbols_count}USDT",
+                        "i": "1m",
+                        "f": 100,
+                        "L": 200,
+                        "o": f"{price:.8f}",
+                        "c": f"{price * 1.01:.8f}",
+                        "h": f"{price * 1.02:.8f}",
+                        "l": f"{price * 0.99:.8f}",
+                        "v": f"{rnd.uniform(0, 10000):.8f}",
+                        "n": 100,
+                        "x": rnd.random() < 0.05,
+                        "q": "1.0000",
+                        "V": "500",
+                        "Q": "0.500",
+                        "B": "123456",
+                    },
+                }
+            )
+        )
+    return frames
+
+
+async def pydantic_path(frame: str) -> None:
+    raw_message = json.loads(frame)
+    model = (
+        await Utils.get_data_model_by_event_type(EventType(raw_message["e"]))
+    ).parse_obj(raw_message)
+    binance_to_processor_kline_data(model)
+
+
+async def fast_path(frame: str) -> None:
+    raw_message = json.loads(frame)
+    raw_to_processor_kline_data(raw_message)
+
+
+async def measure(name: str, decode: Callable, frames: List[str]) -> float:
+    best = 0.0
+    for _ in range(ROUNDS):
+        started_at = time.perf_counter()
+        for frame in frames:
+            await decode(frame)
+        best = max(best, len(frames) / (time.perf_counter() - started_at))
+
+    print(f"{name:<10} {best:>12,.0f} messages/sec")
+    return best
+
+
+async def main() -> None:
+    frames = generate_frames(MESSAGES_COUNT)
+    pydantic_rate = await measure("pydantic", pydantic_path, frames)
+    fast_rate = await measure("fast", fast_path, frames)
+    print(f"speedup    {fast_rate / pydantic_rate:>12.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+from typing import List, Tuple
+
+from loguru import logger
+
+from ..model.processor_models import (
+    KLineData,
+    KLineInterval,
+    ProcessorConfig,
+    ProcessorHighRiseConfig,
+)
+from ..services.processor import LogicType, ProcessorId
+from ..services_impl.k_lines_replay_listener import KLinesReplayListener
+from ..services_impl.processors_manager_impl import ProcessorsManagerImpl
+from ..utils.k_line_journal import KLineJournal
+
+SYMBOLS_COUNT = 200
+CANDLES_COUNT = 60
+REVISIONS_COUNT = 10  # Frames per candle, the last one closes it
+CONFIG = ProcessorConfig(ProcessorHighRiseConfig({10, 20}))
+
+
+def generate_frames() -> List[dict]:
+    rnd = random.Random(42)
+    frames = list()
+    for i in range(CANDLES_COUNT):
+        start_time = 1_660_000_000_000 + i * 60_000
+        for symbol_number in range(SYMBOLS_COUNT):
+            symbol = f"SYMBOL{symbol_number}USDT"
+            price = rnd.uniform(1, 1000)
+            volume = rnd.uniform(0, 100) * (50 if rnd.random() < 0.02 else 1)
+            for revision in range(1, REVISIONS_COUNT + 1):
+                event_time = start_time + revision * 6000
+                frames.append(
+                    {
+                        "e": "kline",
+                        "E": event_time,
+                        "s": symbol,
+                        "k": {
+                            "t": start_time,
+                            "T": start_time + 59_999,
+                            "s": symbol,
+                            "i": "1m",
+                            "f": 100,
+                            "L": 200,
+                            "o": f"{price:.8f}",
+                            "c": f"{price * 1.01:.8f}",
+                            "h": f"{price * 1.02:.8f}",
+                            "l": f"{price * 0.99:.8f}",
+                            "v": f"{volume * revision / REVISIONS_COUNT:.8f}",
+                            "n": 100,
+                            "x": revision == REVISIONS_COUNT,
+                            "q": "1.0000",
+                            "V": "500",
+                            "Q": "0.500",
+                            "B": "123456",
+                        },
+                    }
+                )
+    return frames
+
+
+async def write_recordings(directory: str) -> Tuple[str, str]:
+    frames = generate_frames()
+    json_path = os.path.join(directory, "frames.jsonl")
+    with open(json_path, "w") as frames_file:
+        frames_file.writelines(json.dumps(frame) + "\n" for frame in frames)
+
+    journal_path = os.path.join(directory, "journal")
+    journal = await KLineJournal.create(directory=journal_path)
+    for frame in frames:
+        k_line = frame["k"]
+        journal.append(
+            KLineData(
+                k_line["t"],
+                k_line["s"],
+                KLineInterval(k_line["i"]),
+                float(k_line["o"]),
+                float(k_line["c"]),
+                float(k_line["h"]),
+                float(k_line["l"]),
+                float(k_line["v"]),
+                k_line["x"],
+            )
+        )
+    await journal.close()
+
+    return json_path, journal_path
+
+
+async def replay(name: str, path: str, fast_decode: bool) -> set:
+    triggered = set()
+
+    async def on_logic_triggered(
+        processor_id: ProcessorId, logic_type: LogicType, data: KLineData
+    ) -> None:
+        triggered.add((processor_id, logic_type, data.start_time))
+
+    async def update_data(data: KLineData) -> None:
+        await manager.update_data(data)
+
+    listener = await KLinesReplayListener.create(
+        update_data,
+        path,
+        fast_decode=fast_decode,
+        on_logic_triggered=on_logic_triggered,
+    )
+    manager = ProcessorsManagerImpl(listener.count_trigger)
+    await manager.create_processors(
+        [f"SYMBOL{i}USDT" for i in range(SYMBOLS_COUNT)],
+        KLineInterval.K_LINE_INTERVAL_1_MINUTE,
+        {LogicType.HIGH_VOLUME_RAISE},
+        CONFIG,
+    )
+    await listener.start_listening()
+    stats = await listener.join()
+    print(
+        f"{name:<10} {stats.messages_per_second:>10,.0f} messages/sec "
+        f"{stats.k_lines} k-lines triggers {stats.triggers} "
+        f"distinct {len(triggered)}"
+    )
+    await manager.stop()
+
+    return triggered
+
+
+async def main() -> None:
+    logger.remove()
+    with tempfile.TemporaryDirectory() as directory:
+        json_path, journal_path = await write_recordings(directory)
+        results = [
+            await replay("pydantic", json_path, fast_decode=False),
+            await replay("fast", json_path, fast_decode=True),
+            await replay("fast", json_path, fast_decode=True),
+            await replay("journal", journal_path, fast_decode=True),
+        ]
+        is_deterministic = all(result == results[0] for result in results)
+        print(f"same triggers in every run: {is_deterministic}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+import multiprocessing
+import random
+import time
+from multiprocessing.synchronize import Event
+from typing import List
+
+import numpy as np
+
+from ..model.processor_models import KLineData, KLineInterval
+from ..services.processor import ProcessorId
+from ..utils.shared_k_line_store import SharedKLineStore
+
+SYMBOLS_COUNT = 1000
+CAPACITY = 512
+WINDOW = 100
+DURATION = 5.0
+READERS_COUNTS = (1, 2, 4)
+
+
+def get_processor_ids() -> List[ProcessorId]:
+    return [
+        ProcessorId(f"SYMBOL{i}USDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+        for i in range(SYMBOLS_COUNT)
+    ]
+
+
+def run_writer(name: str, stop: Event, writes: multiprocessing.Value) -> None:
+    store = SharedKLineStore.attach(name, is_writable=True, track=True)
+    rnd = random.Random(42)
+    processor_ids = get_processor_ids()
+    start_time = 1_660_000_000_000 + CAPACITY * 60_000
+    count = 0
+    while not stop.is_set():
+        for processor_id in processor_ids:
+            price = rnd.uniform(1, 1000)
+            store.write(
+                KLineData(
+                    start_time,
+                    processor_id.symbol,
+                    processor_id.interval,
+                    price,
+                    price * 1.01,
+                    price * 1.02,
+                    price * 0.99,
+                    rnd.uniform(0, 10000),
+                    count % 30 == 0,
+                )
+            )
+            count += 1
+        start_time += 60_000
+    writes.value = count
+
+
+def run_reader(
+    name: str, stop: Event, reads: multiprocessing.Value, retries: multiprocessing.Value
+) -> None:
+    store = SharedKLineStore.attach(name, track=True)
+    slots = [store.get_slot(processor_id) for processor_id in get_processor_ids()]
+    count = 0
+    retried = 0
+    checksum = 0.0
+    while not stop.is_set():
+        for slot in slots:
+            # Zero-copy read, computed on views and validated afterwards
+            while True:
+                sequence, window, _ = store.get_window(slot, WINDOW)
+                volume = float(np.mean(window.volumes))
+                if store.is_unchanged(slot, sequence):
+                    break
+                retried += 1
+            checksum += volume
+            count += 1
+    reads.value = count
+    retries.value = retried
+
+
+def fill(store: SharedKLineStore) -> None:
+    for processor_id in get_processor_ids():
+        for i in range(CAPACITY):
+            store.write(
+                KLineData(
+                    1_660_000_000_000 + i * 60_000,
+                    processor_id.symbol,
+                    processor_id.interval,
+                    1.0,
+                    1.0,
+                    1.0,
+                    1.0,
+                    1.0,
+                    True,
+                )
+            )
+
+
+def measure(store: SharedKLineStore, readers_count: int) -> None:
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    writes = context.Value("q", 0)
+    reads = [context.Value("q", 0) for _ in range(readers_count)]
+    retries = [context.Value("q", 0) for _ in range(readers_count)]
+    processes = [context.Process(target=run_writer, args=(store.name, stop, writes))]
+    processes.extend(
+        context.Process(
+            target=run_reader, args=(store.name, stop, reads[i], retries[i])
+        )
+        for i in range(readers_count)
+    )
+    for process in processes:
+        process.start()
+    time.sleep(DURATION)
+    stop.set()
+    for process in processes:
+        process.join()
+
+    total_reads = sum(value.value for value in reads)
+    total_retries = sum(value.value for value in retries)
+    print(
+        f"readers {readers_count:<3} {total_reads / DURATION:>12,.0f} windows/sec "
+        f"{total_retries:>8} retries "
+        f"writer {writes.value / DURATION:>12,.0f} k-lines/sec"
+    )
+
+
+def main() -> None:
+    store = SharedKLineStore.create(SYMBOLS_COUNT, CAPACITY)
+    try:
+        fill(store)
+        for readers_count in READERS_COUNTS:
+            measure(store, readers_count)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Set
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+from loguru import logger
+from websockets.exceptions import ConnectionClosed
+from websockets.server import WebSocketServer, WebSocketServerProtocol
+
+from ..utils.binance_utils import BinanceStreamNameUtil
+
+INTERVAL_MILLISECONDS: Dict[str, int] = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "8h": 28_800_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000,
+    "3d": 259_200_000,
+    "1w": 604_800_000,
+    "1M": 2_592_000_000,
+}
+
+
+@dataclass(slots=True)
+class _StreamState:
+    symbol: str
+    interval: str
+    start_time: int
+    open_price: float
+    close_price: float
+    volume: float
+    subscribers: Set[WebSocketServerProtocol] = field(default_factory=set)
+
+
+class SyntheticBinanceServer:
+    # Local stand-in for the Binance stream endpoint with the protocol subset
+    # the client uses: SUBSCRIBE, UNSUBSCRIBE and LIST_SUBSCRIPTIONS replies
+    # with `id`, error frames with `code` and kline events, raw on `/ws` and
+    # in `{"stream", "data"}` envelopes on `/stream?streams=`. Every subscribed
+    # stream gets `ticks_per_second` open candle updates, every
+    # `candle_seconds` all streams close their candle at once. Control plane
+    # faults are injected with `dropped_replies` and `reply_delay`
+    _host: str
+    _port: int
+    _ticks_per_second: float
+    _candle_seconds: float
+    _spike_probability: float  # Candles with volume far above the usual
+    _max_streams_per_connection: int
+    _random: random.Random
+    _streams: Dict[str, _StreamState]
+    _subscriptions: Dict[WebSocketServerProtocol, Set[str]]
+    _combined: Set[WebSocketServerProtocol]  # Connected to combined endpoint
+    _server: WebSocketServer | None = None
+    _generator_task: asyncio.Task | None = None
+    frames_sent: int = 0
+    dropped_replies: int = 0  # Next requests take effect, their replies are lost
+    reply_delay: float = 0.0  # Seconds before each request is handled
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        ticks_per_second: float = 0.5,
+        candle_seconds: float = 5.0,
+        spike_probability: float = 0.02,
+        max_streams_per_connection: int = 1024,
+        seed: int = 42,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._ticks_per_second = ticks_per_second
+        self._candle_seconds = candle_seconds
+        self._spike_probability = spike_probability
+        self._max_streams_per_connection = max_streams_per_connection
+        self._random = random.Random(seed)
+        self._streams = dict()
+        self._subscriptions = dict()
+        self._combined = set()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self._host}:{self._port}/ws"
+
+    async def start(self) -> str:
+        self._server = await websockets.serve(self._handle, self._host, self._port)
+        self._port = self._server.sockets[0].getsockname()[1]
+        self._generator_task = asyncio.create_task(self._run_generator())
+
+        return self.url
+
+    async def stop(self) -> None:
+        if self._generator_task is not None:
+            self._generator_task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _new_volume(self) -> float:
+        volume = self._random.uniform(10, 100)
+        if self._random.random() < self._spike_probability:
+            volume *= 20
+        return volume
+
+    def _subscribe(self, websocket: WebSocketServerProtocol, stream: str) -> None:
+        state = self._streams.get(stream)
+        if state is None:
+            symbol, interval = BinanceStreamNameUtil.parse_k_line_stream(stream)
+            price = self._random.uniform(1, 1000)
+            start_time = int(time.time() * 1000)
+            state = self._streams[stream] = _StreamState(
+                symbol.upper(),
+                interval,
+                start_time - start_time % INTERVAL_MILLISECONDS[interval],
+                price,
+                price,
+                self._new_volume(),
+            )
+        state.subscribers.add(websocket)
+        self._subscriptions[websocket].add(stream)
+
+    def _unsubscribe(self, websocket: WebSocketServerProtocol, stream: str) -> None:
+        self._subscriptions[websocket].discard(stream)
+        state = self._streams.get(stream)
+        if state is not None:
+            state.subscribers.discard(websocket)
+            if not state.subscribers:
+                del self._streams[stream]
+
+    def _reply(self, websocket: WebSocketServerProtocol, request: dict) -> dict:
+        request_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or []
+        subscriptions = self._subscriptions[websocket]
+        if method == "LIST_SUBSCRIPTIONS":
+            return {"result": sorted(subscriptions), "id": request_id}
+        if method not in ("SUBSCRIBE", "UNSUBSCRIBE"):
+            return {
+                "code": 2,
+                "msg": "Invalid request: unknown method",
+                "id": request_id,
+            }
+        if not isinstance(params, list):
+            return {
+                "code": 1,
+                "msg": "Invalid value type: expected Array",
+                "id": request_id,
+            }
+
+        for stream in params:
+            try:
+                BinanceStreamNameUtil.parse_k_line_stream(stream)
+            except ValueError:
+                return {
+                    "code": 2,
+                    "msg": f"Invalid request: unknown stream {stream}",
+                    "id": request_id,
+                }
+
+        if method == "SUBSCRIBE":
+            new_streams = set(params) - subscriptions
+            if len(subscriptions) + len(new_streams) > self._max_streams_per_connection:
+                return {
+                    "code": 2,
+                    "msg": "Invalid request: too many streams",
+                    "id": request_id,
+                }
+            for stream in new_streams:
+                self._subscribe(websocket, stream)
+        else:
+            for stream in params:
+                self._unsubscribe(websocket, stream)
+
+        return {"result": None, "id": request_id}
+
+    async def _handle(self, websocket: WebSocketServerProtocol, path: str) -> None:
+        self._subscriptions[websocket] = set()
+        url = urlparse(path)
+        if url.path.rstrip("/") == "/stream":
+            self._combined.add(websocket)
+            streams = "".join(parse_qs(url.query).get("streams", []))
+            reply = self._reply(
+                websocket,
+                {
+                    "method": "SUBSCRIBE",
+                    "params": streams.split("/") if streams else [],
+                },
+            )
+            if "code" in reply:
+                await websocket.close(1008, reply["msg"])
+                del self._subscriptions[websocket]
+                self._combined.discard(websocket)
+                return
+        try:
+            async for message in websocket:
+                try:
+                    request = json.loads(message)
+                except json.JSONDecodeError as e:
+                    await websocket.send(
+                        json.dumps({"code": 3, "msg": f"Invalid JSON: {e}", "id": None})
+                    )
+                    continue
+                if self.reply_delay:
+                    # Requests of a connection are handled in order
+                    await asyncio.sleep(self.reply_delay)
+                reply = self._reply(websocket, request)
+                if self.dropped_replies:
+                    self.dropped_replies -= 1
+                    continue
+                await websocket.send(json.dumps(reply))
+        except ConnectionClosed:
+            pass
+        finally:
+            for stream in list(self._subscriptions[websocket]):
+                self._unsubscribe(websocket, stream)
+            del self._subscriptions[websocket]
+            self._combined.discard(websocket)
+
+    async def _send_event(
+        self, stream: str, state: _StreamState, is_closed: bool
+    ) -> None:
+        event_time = int(time.time() * 1000)
+        event = {
+            "e": "kline",
+            "E": event_time,
+            "s": state.symbol,
+            "k": {
+                "t": state.start_time,
+                "T": state.start_time + INTERVAL_MILLISECONDS[state.interval] - 1,
+                "s": state.symbol,
+                "i": state.interval,
+                "f": 100,
+                "L": 200,
+                "o": f"{state.open_price:.8f}",
+                "c": f"{state.close_price:.8f}",
+                "h": f"{max(state.open_price, state.close_price):.8f}",
+                "l": f"{min(state.open_price, state.close_price):.8f}",
+                "v": f"{state.volume:.8f}",
+                "n": 100,
+                "x": is_closed,
+                "q": "1.0000",
+                "V": "500",
+                "Q": "0.500",
+                "B": "123456",
+            },
+        }
+        frame = json.dumps(event)
+        combined_frame: str | None = None
+        for websocket in list(state.subscribers):
+            try:
+                if websocket in self._combined:
+                    if combined_frame is None:
+                        combined_frame = json.dumps({"stream": stream, "data": event})
+                    await websocket.send(combined_frame)
+                else:
+                    await websocket.send(frame)
+                self.frames_sent += 1
+            except ConnectionClosed:
+                pass
+
+    async def _close_candles(self) -> None:
+        # Burst of closed candles for every stream at the interval boundary
+        for stream, state in list(self._streams.items()):
+            await self._send_event(stream, state, is_closed=True)
+            state.start_time += INTERVAL_MILLISECONDS[state.interval]
+            state.open_price = state.close_price
+            state.volume = self._new_volume()
+
+    async def _run_generator(self) -> None:
+        slice_seconds = 0.05
+        next_close = time.monotonic() + self._candle_seconds
+        cursor = 0
+        pending_ticks = 0.0
+        while True:
+            await asyncio.sleep(slice_seconds)
+            if time.monotonic() >= next_close:
+                next_close += self._candle_seconds
+                await self._close_candles()
+                continue
+
+            streams = list(self._streams.items())
+            if not streams:
+                continue
+
+            # Updates are spread evenly over time, round robin over streams
+            pending_ticks += len(streams) * self._ticks_per_second * slice_seconds
+            for _ in range(int(pending_ticks)):
+                stream, state = streams[cursor % len(streams)]
+                cursor += 1
+                state.close_price *= self._random.uniform(0.999, 1.0015)
+                await self._send_event(stream, state, is_closed=False)
+            pending_ticks -= int(pending_ticks)
+
+
+async def serve_forever(**kwargs) -> None:
+    server = SyntheticBinanceServer(**kwargs)
+    url = await server.start()
+    logger.info(f"Synthetic Binance server listening on {url}")
+    await asyncio.Future()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve_forever(port=9443))
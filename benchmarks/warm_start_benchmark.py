@@ -0,0 +1,85 @@
+import asyncio
+import random
+import tempfile
+import time
+
+from loguru import logger
+
+from ..model.processor_models import (
+    KLineData,
+    KLineInterval,
+    ProcessorConfig,
+    ProcessorHighRiseConfig,
+)
+from ..services.processor import LogicType
+from ..services_impl.processors_manager_impl import ProcessorsManagerImpl
+from ..utils.k_line_journal import KLineJournal
+
+PROCESSORS_COUNT = 1000
+CANDLES_COUNT = 150  # Journaled per processor, above the longest window
+REVISIONS_COUNT = 3  # Frames per candle, the last one closes it
+INTERVAL = KLineInterval.K_LINE_INTERVAL_1_HOUR
+CONFIG = ProcessorConfig(ProcessorHighRiseConfig({10, 20, 100}))
+
+
+def get_symbols() -> list:
+    return [f"SYMBOL{i}USDT" for i in range(PROCESSORS_COUNT)]
+
+
+async def write_history(directory: str) -> None:
+    rnd = random.Random(42)
+    journal = await KLineJournal.create(directory=directory)
+    for i in range(CANDLES_COUNT):
+        start_time = 1_660_000_000_000 + i * 3_600_000
+        for symbol in get_symbols():
+            price = rnd.uniform(1, 1000)
+            for revision in range(REVISIONS_COUNT):
+                journal.append(
+                    KLineData(
+                        start_time,
+                        symbol,
+                        INTERVAL,
+                        price,
+                        price * 1.01,
+                        price * 1.02,
+                        price * 0.99,
+                        rnd.uniform(0, 10000),
+                        revision == REVISIONS_COUNT - 1,
+                    )
+                )
+    await journal.close()
+
+
+async def measure(directory: str, batch_evaluation: bool, preload: bool) -> None:
+    started_at = time.perf_counter()
+    journal = await KLineJournal.create(directory=directory) if preload else None
+    opened_at = time.perf_counter()
+    manager = ProcessorsManagerImpl(batch_evaluation=batch_evaluation, history=journal)
+    await manager.create_processors(
+        get_symbols(), INTERVAL, {LogicType.HIGH_VOLUME_RAISE}, CONFIG
+    )
+    finished_at = time.perf_counter()
+
+    mode = "batch" if batch_evaluation else "per-processor"
+    print(
+        f"{mode:<14} preload={str(preload):<5} "
+        f"journal open {opened_at - started_at:>7.3f}s "
+        f"processors {finished_at - opened_at:>7.3f}s "
+        f"total {finished_at - started_at:>7.3f}s"
+    )
+    await manager.stop()
+    if journal is not None:
+        await journal.close()
+
+
+async def main() -> None:
+    logger.remove()
+    with tempfile.TemporaryDirectory() as directory:
+        await write_history(directory)
+        for batch_evaluation in (False, True):
+            for preload in (False, True):
+                await measure(directory, batch_evaluation, preload)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -23,3 +23,40 @@ LOGGIN_LEVEL = os.getenv("LOGGIN_LEVEL")
 
 BINANCE_API_KEY = os.getenv("BINANCE_API_KEY", None)
 BINANCE_SECRET_KEY = os.getenv("BINANCE_SECRET_KEY", None)
+
+BINANCE_WEBSOCKET_URL = os.getenv(
+    "BINANCE_WEBSOCKET_URL", "wss://stream.binance.com:9443/ws"
+)
+# Longer request lines are refused by common servers and proxies
+BINANCE_COMBINED_STREAM_MAX_URL_LENGTH = int(
+    os.getenv("BINANCE_COMBINED_STREAM_MAX_URL_LENGTH", 4000)
+)
+# Seconds between LIST_SUBSCRIPTIONS checks of local subscriptions state
+BINANCE_SUBSCRIPTIONS_CHECK_INTERVAL = float(
+    os.getenv("BINANCE_SUBSCRIPTIONS_CHECK_INTERVAL", 60)
+)
+BINANCE_REST_BASE_URL = os.getenv("BINANCE_REST_BASE_URL", "https://api.binance.com")
+BINANCE_REST_MAX_CONCURRENT_REQUESTS = int(
+    os.getenv("BINANCE_REST_MAX_CONCURRENT_REQUESTS", 5)
+)
+
+K_LINE_JOURNAL_DIRECTORY = os.getenv("K_LINE_JOURNAL_DIRECTORY", "journal")
+K_LINE_JOURNAL_SEGMENT_SIZE = int(
+    os.getenv("K_LINE_JOURNAL_SEGMENT_SIZE", 64 * 1024 * 1024)
+)
+K_LINE_JOURNAL_MAX_AGE = (
+    float(os.getenv("K_LINE_JOURNAL_MAX_AGE"))
+    if os.getenv("K_LINE_JOURNAL_MAX_AGE")
+    else None
+)
+K_LINE_JOURNAL_MAX_SIZE = (
+    int(os.getenv("K_LINE_JOURNAL_MAX_SIZE"))
+    if os.getenv("K_LINE_JOURNAL_MAX_SIZE")
+    else None
+)
+
+# Worker processes running processors, 0 runs them in the event loop process
+PROCESSORS_WORKERS = int(os.getenv("PROCESSORS_WORKERS", 0))
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9100))
@@ -6,6 +6,9 @@ from typing import Any, Dict, Final, List, Set
 
 from pydantic import BaseModel, Field, ValidationError, validator
 
+# Single enum for both models, re-exported for existing imports
+from ..model.processor_models import KLineInterval
+
 
 class Method(str, Enum):
     SUBSCRIBE: Final[str] = "SUBSCRIBE"
@@ -14,22 +17,11 @@ class Method(str, Enum):
     LIST_SUBSCRIPTIONS: Final[str] = "LIST_SUBSCRIPTIONS"
 
 
-class KLineInterval(str, Enum):
-    K_LINE_INTERVAL_1_MINUTE: Final[str] = "1m"
-    K_LINE_INTERVAL_3_MINUTE: Final[str] = "3m"
-    K_LINE_INTERVAL_5_MINUTE: Final[str] = "5m"
-    K_LINE_INTERVAL_15_MINUTE: Final[str] = "15m"
-    K_LINE_INTERVAL_30_MINUTE: Final[str] = "30m"
-    K_LINE_INTERVAL_1_HOUR: Final[str] = "1h"
-    K_LINE_INTERVAL_2_HOUR: Final[str] = "2h"
-    K_LINE_INTERVAL_4_HOUR: Final[str] = "4h"
-    K_LINE_INTERVAL_6_HOUR: Final[str] = "6h"
-    K_LINE_INTERVAL_8_HOUR: Final[str] = "8h"
-    K_LINE_INTERVAL_12_HOUR: Final[str] = "12h"
-    K_LINE_INTERVAL_1_DAY: Final[str] = "1d"
-    K_LINE_INTERVAL_3_DAY: Final[str] = "3d"
-    K_LINE_INTERVAL_1_WEEK: Final[str] = "1w"
-    K_LINE_INTERVAL_1_MONTH: Final[str] = "1M"
+class SubscriptionState(str, Enum):
+    SUBSCRIBING: Final[str] = "subscribing"  # SUBSCRIBE sent, not acknowledged
+    SUBSCRIBED: Final[str] = "subscribed"  # Acknowledged
+    UNSUBSCRIBING: Final[str] = "unsubscribing"  # UNSUBSCRIBE sent, not acknowledged
+    FAILED: Final[str] = "failed"  # SUBSCRIBE was rejected or timed out
 
 
 class EventType(str, Enum):
@@ -43,6 +35,9 @@ class ValidationUtils:
 
     METHOD_VALUES: Set[str] = set(e.value for e in Method)
 
+    # Streams per SUBSCRIBE/UNSUBSCRIBE frame, keeps frames well under size limits
+    MAX_PARAMS_PER_REQUEST: Final[int] = 200
+
 
 class RequestModel(BaseModel):
     method: Method
@@ -76,9 +71,10 @@ class RequestModel(BaseModel):
 
         if values["method"] in (Method.SUBSCRIBE, Method.UNSUBSCRIBE):
             params = set(params)
-            if len(params) > 5:  # Just somewhat random number. TODO: replace maybe
+            if len(params) > ValidationUtils.MAX_PARAMS_PER_REQUEST:
                 raise ValidationError(
-                    "Cannot Subscribe or Unsubscrive from more than 5 messages per request"
+                    "Cannot Subscribe or Unsubscrive from more than "
+                    f"{ValidationUtils.MAX_PARAMS_PER_REQUEST} streams per request"
                 )
 
         return params
@@ -91,6 +87,22 @@ class RequestModel(BaseModel):
         return method
 
 
+@dataclass
+class ControlPlaneStats:
+    queue_depth: int  # Requests waiting to be sent
+    in_flight_frames: int  # Frames sent and waiting for reply
+    frames_sent: int
+    requests_sent: int  # Requests packed into sent frames
+    last_send_latency: float  # Seconds from enqueue to send
+    avg_send_latency: float
+    max_send_latency: float
+    subscriptions: int  # Acknowledged streams
+    pending_subscriptions: int  # Waiting for SUBSCRIBE or UNSUBSCRIBE reply
+    failed_subscriptions: int
+    reconciles: int  # LIST_SUBSCRIPTIONS checks compared against local state
+    repaired_streams: int  # Streams that drifted and were fixed by reconcile
+
+
 class ResponseModel(BaseModel):
     result: Any
     id: int
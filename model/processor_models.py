@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Final, Set
+from typing import Dict, Final, Set
 
 
 class KLineInterval(str, Enum):
@@ -21,7 +21,7 @@ class KLineInterval(str, Enum):
     K_LINE_INTERVAL_1_MONTH: Final[str] = "1M"
 
 
-@dataclass
+@dataclass(slots=True)
 class KLineData:
     start_time: int
     symbol: str
@@ -32,6 +32,90 @@ class KLineData:
     low_price: float
     base_volume_asset: float
     is_kline_closed: bool
+    event_time: int = 0  # Exchange event time of the frame, unix milliseconds
+    stream_id: int = -1  # StreamRegistry id, -1 until resolved
+
+
+class OverflowPolicy(Enum):
+    BLOCK: Final[int] = 0  # Producer waits until queue has space
+    DROP_OLDEST: Final[int] = 1
+    DROP_NEWEST: Final[int] = 2
+
+
+@dataclass
+class RouterStats:
+    routed: int
+    unrouted: int  # No processor for symbol and interval
+    dropped: int  # Dropped by overflow policy
+    queue_depth: int  # Updates queued over all processors
+    max_queue_depth: int  # Deepest single processor queue seen
+    ready_processors: int  # Processors waiting for a worker
+    batches: int  # Micro-batches handed to processors
+
+
+@dataclass
+class CoalescerStats:
+    received: int
+    delivered: int
+    collapsed: int  # Open candle updates replaced by a newer one
+    pending_streams: int  # Streams with updates waiting for delivery
+    pending_closed: int  # Closed candles waiting for delivery
+
+
+@dataclass
+class SchedulerStats:
+    ticks: int
+    fired: int  # Processors passed to batched evaluations
+    scheduled_processors: int
+    expressions: int  # Distinct cron expressions on the wheel
+    last_lateness: float  # Seconds between tick time and its processing
+    avg_lateness: float
+    max_lateness: float
+
+
+@dataclass
+class ReplayStats:
+    messages: int  # Frames read from the recording
+    k_lines: int  # Frames passed to the listener callback
+    skipped: int  # Not k-line frames or filtered out symbols
+    elapsed: float  # Seconds
+    messages_per_second: float
+    triggers: Dict[str, int] = field(default_factory=dict)  # By logic type
+
+
+@dataclass
+class AggregatorStats:
+    received: int  # 1 minute k-lines pushed
+    emitted: int  # K-lines of every interval passed to the callback
+    skipped: int  # Stale or repeated minutes
+    partial: int  # Updates of buckets that started before the first minute seen
+    candles: int  # Candles being built over all streams and intervals
+
+
+@dataclass
+class DeduplicatorStats:
+    entries: int  # Alert keys remembered
+    fired: int
+    duplicates: int  # Suppressed, same candle already fired
+    cooling_down: int  # Suppressed by logic cooldown
+    held: int  # Suppressed until the condition resets
+    evicted: int  # Expired or over the size limit
+
+
+@dataclass
+class LatencyStats:
+    count: int
+    mean: float  # Seconds
+    p50: float
+    p99: float
+    max: float
+
+
+@dataclass
+class PipelineStats:
+    stages: Dict[str, LatencyStats]  # By pipeline stage
+    exchange_lag: LatencyStats  # From event time `E` to frame receive
+    stream_rates: Dict[str, float]  # Messages per second by stream
 
 
 class HighRiseType(Enum):
@@ -42,11 +126,15 @@ class HighRiseType(Enum):
 
 @dataclass
 class ProcessorHighRiseConfig:
-    process_intervals: Set[int] = {10, 20, 100}
+    process_intervals: Set[int] = field(default_factory=lambda: {10, 20, 100})
     check_interval: str = "* * * * * */2"
     check_type: HighRiseType = HighRiseType.UP
+    # Latest candle volume to average volume of the rest of the window
+    volume_rise_ratio: float = 3.0
 
 
 @dataclass
 class ProcessorConfig:
-    high_rise_config: ProcessorHighRiseConfig = ProcessorHighRiseConfig()
+    high_rise_config: ProcessorHighRiseConfig = field(
+        default_factory=ProcessorHighRiseConfig
+    )
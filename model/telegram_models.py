@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class OutboxStats:
+    queued: int  # Alerts accepted by the outbox
+    pending: int  # Alerts waiting for delivery
+    sent_messages: int
+    sent_alerts: int  # Alerts in sent messages, digests hold several
+    digests: int
+    retries: int  # Retried sends, flood control and network errors
+    failed: int  # Alerts dropped after an error
+    oldest_pending_age: float  # Seconds the oldest pending alert waits
+    lag_p50: float  # Seconds from queuing to delivery of sent alerts
+    lag_p99: float
+    lag_max: float
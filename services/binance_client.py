@@ -4,6 +4,16 @@ from abc import ABC, abstractmethod
 from typing import List, Set
 
 
+class BinanceClientError(Exception):
+    code: int
+    msg: str
+
+    def __init__(self, code: int, msg: str) -> None:
+        super().__init__(f"Binance error {code}: {msg}")
+        self.code = code
+        self.msg = msg
+
+
 class BinanceClientWebsocketStreamManager(ABC):
     @abstractmethod
     async def _run_listener(self) -> None:
@@ -0,0 +1,18 @@
+from abc import ABC, abstractmethod
+from typing import Any, List
+
+
+class BinanceRestClient(ABC):
+    @abstractmethod
+    async def get_k_lines(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int | None = None,
+    ) -> List[List[Any]]:
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Final, Set
+from typing import Any, Callable, Coroutine, Final, List, Set
 
 from ..model.processor_models import KLineData, KLineInterval, ProcessorConfig
 
@@ -16,6 +16,11 @@ class ProcessorId:
     interval: KLineInterval
 
 
+LogicTriggerCallbackType = Callable[
+    [ProcessorId, LogicType, KLineData], Coroutine[Any, Any, None]
+]
+
+
 class Processor(ABC):
     @abstractmethod
     async def run_logic(self, logic_type: LogicType) -> bool:
@@ -37,6 +42,14 @@ class Processor(ABC):
     async def update_data(self, data: KLineData) -> None:
         pass
 
+    async def update_data_batch(self, data: List[KLineData]) -> None:
+        for item in data:
+            await self.update_data(item)
+
+    @abstractmethod
+    async def run_logics(self) -> None:
+        pass
+
     @abstractmethod
     async def get_id(self) -> ProcessorId:
         pass
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Set
+from typing import List, Set
 
-from ..model.processor_models import KLineInterval, ProcessorConfig
+from ..model.processor_models import KLineData, KLineInterval, ProcessorConfig
 from ..services.processor import LogicType, Processor, ProcessorId
 
 
@@ -20,6 +20,16 @@ class ProcessorsManager(ABC):
     ) -> None:
         pass
 
+    async def create_processors(
+        self,
+        symbols: List[str],
+        interval: KLineInterval,
+        logics_to_run: Set[LogicType] = None,
+        config: ProcessorConfig = ProcessorConfig(),
+    ) -> None:
+        for symbol in symbols:
+            await self.create_processor(symbol, interval, logics_to_run, config)
+
     @abstractmethod
     async def add_logic(self, logic_type: LogicType, processor_id: ProcessorId) -> None:
         pass
@@ -29,3 +39,17 @@ class ProcessorsManager(ABC):
         self, logic_type: LogicType, processor_id: ProcessorId
     ) -> None:
         pass
+
+    @abstractmethod
+    async def update_config(
+        self, config: ProcessorConfig, processor_id: ProcessorId
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def update_data(self, data: KLineData) -> None:
+        pass
+
+    async def update_data_batch(self, data: List[KLineData]) -> None:
+        for item in data:
+            await self.update_data(item)
@@ -2,39 +2,126 @@ from __future__ import annotations
 
 import asyncio
 import json
+import random
+import time
 from collections import deque
-from typing import Callable, Coroutine, Deque, Dict, List, Set, Type
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Deque,
+    Dict,
+    Final,
+    Iterable,
+    List,
+    Set,
+    Type,
+)
 
 import websockets
 from loguru import logger
 from websockets.client import WebSocketClientProtocol
+from websockets.exceptions import ConnectionClosed, WebSocketException
+
+from ..config import config
 
 from ..model.binance_client_models import (
+    ControlPlaneStats,
     EventType,
     KLineDataModel,
     Method,
     RequestModel,
     ResponseModel,
+    SubscriptionState,
     Utils,
+    ValidationUtils,
+)
+from ..model.processor_models import KLineData as ProcessorKLineData
+from ..services.binance_client import (
+    BinanceClientError,
+    BinanceClientWebsocketStreamManager,
 )
-from ..services.binance_client import BinanceClientWebsocketStreamManager
+from ..services.binance_rest_client import BinanceRestClient
+from ..utils.binance_to_processor_model_mapper import raw_to_processor_kline_data
+from ..utils.binance_utils import BinanceKLineUtil, BinanceStreamNameUtil
+from ..utils.pipeline_metrics import PipelineMetrics, PipelineStage
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
+from ..utils.token_bucket import TokenBucket
+
+# Server may be sending these streams
+_ACKNOWLEDGED_STATES: Final[Set[SubscriptionState]] = {
+    SubscriptionState.SUBSCRIBED,
+    SubscriptionState.UNSUBSCRIBING,
+}
+
+# With `fast_decode` enabled kline callbacks receive `ProcessorKLineData`
+CallbackFunctionType = Callable[
+    [KLineDataModel | ProcessorKLineData], Coroutine[Any, Any, None]
+]
+
 
-CallbackFunctionType = Callable[[KLineDataModel], Coroutine[None]]
+@dataclass(slots=True, eq=False)
+class _QueuedRequest:
+    message: RequestModel
+    future: asyncio.Future[ResponseModel]
+    sent: asyncio.Event  # Set once request was packed into a sent frame
+    enqueued_at: float
+    frame_id: int | None = None
+    # Sent in a frame of its own, set after a merged frame was rejected
+    is_isolated: bool = False
 
 
 class BinanceClientWebsocketStreamManagerImpl(BinanceClientWebsocketStreamManager):
     _max_streams: int
     _max_messages_per_second: int
+    _fast_decode: bool  # Skip pydantic for kline frames
     _protocol: WebSocketClientProtocol
+    _connection_url: str | None  # Reconnection is possible only if it is known
+    _auto_reconnect: bool
+    _reconnect_base_delay: float
+    _reconnect_max_delay: float
+    _connected: asyncio.Event  # Cleared while reconnecting
+    _rest_client: BinanceRestClient | None  # Backfills gaps after reconnect if set
+    _last_k_line_start_times: Dict[int, int]  # Of the latest k-line by stream id
+    _is_resyncing: bool = False  # Resubscribing and backfilling after reconnect
+    _resync_buffer: Deque[dict]  # Live events held back while resyncing
+    _resync_task: asyncio.Task | None = None
     _is_listening: bool = False  # Is listining stream
     _callbacks: Dict[
         EventType, CallbackFunctionType
     ]  # Async callbacks to run once message was gotten
-    _messages_with_id: dict[int, ResponseModel]
+    _request_timeout: float  # Seconds to wait for reply once request was sent
+    _request_retries: int
+    _max_params_per_request: int
+    _rate_limiter: TokenBucket  # Enforces `max_messages_per_second` for sent frames
+    _frames_in_flight: Dict[
+        int, List[_QueuedRequest]
+    ]  # Requests packed into a sent frame by frame id, resolved by listener
     _listening_task: asyncio.Task
     _messages_sending_task: asyncio.Task
-    _subscriptions: List[str]
-    _messages_to_send: Deque[RequestModel] = deque()
+    # Local subscriptions state is authoritative, it changes on replies to
+    # SUBSCRIBE and UNSUBSCRIBE. LIST_SUBSCRIPTIONS only checks it for drift
+    # now and then when no other request is queued
+    _subscription_states: Dict[str, SubscriptionState]
+    _subscriptions: Set[str]  # Acknowledged and not yet unsubscribed
+    _subscriptions_version: int = 0  # Changes with every state change
+    _reconcile_interval: float | None  # Seconds, no checks if None
+    _reconcile_task: asyncio.Task | None = None
+    _reconciles: int = 0
+    _repaired_streams: int = 0
+    # Combined stream connection gets streams from its URL on every connect
+    _is_combined: bool
+    _url_streams: Set[str]  # Subscribed by URL of the current connection
+    _registry: StreamRegistry  # Gives stream ids to subscribed streams
+    _messages_to_send: Deque[_QueuedRequest]  # FIFO
+    _messages_to_send_event: asyncio.Event
+    _frames_sent: int = 0
+    _requests_sent: int = 0
+    _last_send_latency: float = 0.0
+    _total_send_latency: float = 0.0
+    _max_send_latency: float = 0.0
+    _metrics: PipelineMetrics | None  # Stage latencies are not measured if None
 
     def __init__(
         self,
@@ -42,154 +129,714 @@ class BinanceClientWebsocketStreamManagerImpl(BinanceClientWebsocketStreamManage
         callbacks: Dict[EventType, CallbackFunctionType] = None,
         max_streams=1024,
         max_messages_per_second=5,
+        fast_decode: bool = False,
+        request_timeout: float = 10,
+        request_retries: int = 2,
+        max_params_per_request: int = ValidationUtils.MAX_PARAMS_PER_REQUEST,
+        connection_url: str | None = None,
+        auto_reconnect: bool = True,
+        reconnect_base_delay: float = 1,
+        reconnect_max_delay: float = 60,
+        rest_client: BinanceRestClient | None = None,
+        metrics: PipelineMetrics | None = None,
+        streams: Set[str] | None = None,
+        reconcile_interval: float | None = config.BINANCE_SUBSCRIPTIONS_CHECK_INTERVAL,
+        registry: StreamRegistry = STREAM_REGISTRY,
     ) -> None:
-        self._callbacks = callbacks | {}
+        self._callbacks = dict(callbacks or {})
         self._protocol = protocol
         self._max_messages_per_second = max_messages_per_second
         self._max_streams = max_streams
+        self._fast_decode = fast_decode
+        self._request_timeout = request_timeout
+        self._request_retries = request_retries
+        self._max_params_per_request = min(
+            max_params_per_request, ValidationUtils.MAX_PARAMS_PER_REQUEST
+        )
+        # Burst of 1 spreads frames evenly so no 1 second window exceeds the limit
+        self._rate_limiter = TokenBucket(max_messages_per_second, capacity=1)
+        self._frames_in_flight = dict()
+        self._subscription_states = dict()
+        self._subscriptions = set()
+        self._registry = registry
+        self._is_combined = bool(streams)
+        self._url_streams = set(streams or ())
+        self._set_subscriptions(self._url_streams)
+        self._messages_to_send = deque()
+        self._messages_to_send_event = asyncio.Event()
+        self._connection_url = connection_url
+        self._auto_reconnect = auto_reconnect and connection_url is not None
+        self._reconnect_base_delay = reconnect_base_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._connected = asyncio.Event()
+        self._connected.set()
+        self._rest_client = rest_client
+        self._last_k_line_start_times = dict()
+        self._resync_buffer = deque()
+        self._metrics = metrics
+        self._reconcile_interval = reconcile_interval
 
     @classmethod
     async def create(
         cls: Type[BinanceClientWebsocketStreamManagerImpl],
         callbacks: dict[EventType, CallbackFunctionType],
-        connection_url: str = "wss://stream.binance.com:9443/ws",
+        connection_url: str = config.BINANCE_WEBSOCKET_URL,
         max_streams: int = 1024,
         max_messages_per_second: int = 5,
+        fast_decode: bool = False,
+        request_timeout: float = 10,
+        request_retries: int = 2,
+        max_params_per_request: int = ValidationUtils.MAX_PARAMS_PER_REQUEST,
+        auto_reconnect: bool = True,
+        reconnect_base_delay: float = 1,
+        reconnect_max_delay: float = 60,
+        rest_client: BinanceRestClient | None = None,
+        metrics: PipelineMetrics | None = None,
+        streams: Set[str] | None = None,
+        reconcile_interval: float | None = config.BINANCE_SUBSCRIPTIONS_CHECK_INTERVAL,
+        registry: StreamRegistry = STREAM_REGISTRY,
     ) -> BinanceClientWebsocketStreamManager:
-        protocol = await websockets.connect(connection_url)
+        # With `streams` connects to combined stream endpoint subscribed to
+        # them, no SUBSCRIBE requests are sent at startup
+        url = connection_url
+        if streams:
+            groups = BinanceStreamNameUtil.split_combined_streams(
+                connection_url, sorted(streams), max_streams
+            )
+            if len(groups) > 1:
+                raise ValueError(
+                    f"{len(streams)} streams do not fit one combined stream "
+                    "connection, use the connections pool"
+                )
+            url = BinanceStreamNameUtil.get_combined_stream_url(
+                connection_url, groups[0]
+            )
+        protocol = await websockets.connect(url)
         return cls(
             protocol,
             callbacks,
             max_streams=max_streams,
             max_messages_per_second=max_messages_per_second,
+            fast_decode=fast_decode,
+            request_timeout=request_timeout,
+            request_retries=request_retries,
+            max_params_per_request=max_params_per_request,
+            connection_url=connection_url,
+            auto_reconnect=auto_reconnect,
+            reconnect_base_delay=reconnect_base_delay,
+            reconnect_max_delay=reconnect_max_delay,
+            rest_client=rest_client,
+            metrics=metrics,
+            streams=streams,
+            reconcile_interval=reconcile_interval,
+            registry=registry,
         )
 
     async def _run_listener(self) -> None:
         while self._is_listening:
-            raw_message: str = json.loads(await self._protocol.recv())
-            if "id" in raw_message:
-                self._messages_with_id[raw_message["id"]] = ResponseModel.parse_obj(
-                    raw_message
+            try:
+                frame = await self._protocol.recv()
+            except ConnectionClosed as e:
+                if not self._auto_reconnect or not self._is_listening:
+                    raise
+                logger.warning(f"Connection closed ({e}), reconnecting")
+                await self._reconnect()
+                continue
+
+            metrics = self._metrics
+            if metrics is None:
+                raw_message: dict = json.loads(frame)
+            else:
+                received_at = time.perf_counter_ns()
+                raw_message: dict = json.loads(frame)
+                metrics.record(
+                    PipelineStage.DECODE, time.perf_counter_ns() - received_at
                 )
+            stream = None
+            if "stream" in raw_message:
+                stream = raw_message["stream"]
+                raw_message = raw_message["data"]
+            if "e" in raw_message:
+                if metrics is not None:
+                    metrics.record_event(raw_message)
+                if self._is_resyncing:
+                    self._resync_buffer.append(raw_message)
+                else:
+                    await self._dispatch_event(raw_message, stream)
+                    if metrics is not None:
+                        metrics.record(
+                            PipelineStage.TOTAL, time.perf_counter_ns() - received_at
+                        )
+            elif "id" in raw_message:
+                self._resolve_request(raw_message)
             elif "code" in raw_message:
                 logger.error(f"Got error {raw_message}")
-            elif "e" in raw_message:
-                try:
-                    event_type = EventType(raw_message["e"])
-                    callback = self._callbacks[event_type]
-                    model = (
-                        await Utils.get_data_model_by_event_type(event_type)
-                    ).parse_obj(raw_message)
-                    await asyncio.create_task(callback(model))
-                except KeyError:
-                    logger.warning(f"No callback for EventType {raw_message['e']}")
             else:
                 logger.warning(f"Unexpected message {raw_message}")
 
+    async def _dispatch_event(
+        self, raw_message: dict, stream: str | None = None
+    ) -> None:
+        is_k_line = raw_message["e"] == EventType.KLINE.value
+        stream_id = None
+        if is_k_line:
+            k_line = raw_message["k"]
+            if stream is not None:
+                stream_id = self._registry.find_stream_id(stream)
+            if stream_id is None:
+                stream_id = self._registry.get_stream_id(k_line["s"], k_line["i"])
+            if self._rest_client is not None:
+                self._last_k_line_start_times[stream_id] = k_line["t"]
+
+        metrics = self._metrics
+        if self._fast_decode and is_k_line:
+            callback = self._callbacks.get(EventType.KLINE)
+            if callback:
+                started_at = time.perf_counter_ns() if metrics is not None else 0
+                data = raw_to_processor_kline_data(
+                    raw_message, stream_id, self._registry
+                )
+                if metrics is not None:
+                    metrics.record(
+                        PipelineStage.PARSE, time.perf_counter_ns() - started_at
+                    )
+                await callback(data)
+            else:
+                logger.warning(f"No callback for EventType {raw_message['e']}")
+            return
+
+        try:
+            event_type = EventType(raw_message["e"])
+            callback = self._callbacks[event_type]
+        except (KeyError, ValueError):
+            logger.warning(f"No callback for EventType {raw_message['e']}")
+            return
+
+        started_at = time.perf_counter_ns() if metrics is not None else 0
+        model = (await Utils.get_data_model_by_event_type(event_type)).parse_obj(
+            raw_message
+        )
+        if metrics is not None:
+            metrics.record(PipelineStage.PARSE, time.perf_counter_ns() - started_at)
+        await callback(model)
+
+    async def _reconnect(self) -> None:
+        self._connected.clear()
+        attempt = 0
+        while self._is_listening:
+            # Full jitter keeps many connections from reconnecting in lockstep
+            delay = min(
+                self._reconnect_max_delay, self._reconnect_base_delay * 2**attempt
+            )
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            url = self._connection_url
+            url_streams: List[str] = list()
+            if self._is_combined and self._subscriptions:
+                # Streams beyond URL limits are subscribed while resyncing
+                url_streams = BinanceStreamNameUtil.split_combined_streams(
+                    self._connection_url, sorted(self._subscriptions), self._max_streams
+                )[0]
+                url = BinanceStreamNameUtil.get_combined_stream_url(
+                    self._connection_url, url_streams
+                )
+            try:
+                self._protocol = await websockets.connect(url)
+                self._url_streams = set(url_streams)
+                break
+            except (OSError, WebSocketException, asyncio.TimeoutError) as e:
+                attempt += 1
+                logger.warning(f"Reconnect attempt {attempt} failed {e}")
+        else:
+            return
+
+        logger.info(f"Reconnected to {self._connection_url}")
+        self._is_resyncing = True
+        self._connected.set()
+        self._resync_task = asyncio.create_task(self._resync())
+
+    async def _resync(self) -> None:
+        backfilled_until: Dict[int, int] = dict()
+        try:
+            # Streams that failed here are found missing by the next reconcile
+            await self._request_streams(
+                Method.SUBSCRIBE, self._subscriptions - self._url_streams
+            )
+            if self._rest_client is not None:
+                backfilled_until = await self._backfill()
+        except Exception as e:
+            logger.error(f"Failed to resync after reconnect {e}")
+        finally:
+            # Nothing awaits between the last check and flag reset, so no live
+            # event can slip past the buffer
+            while self._resync_buffer:
+                raw_message = self._resync_buffer.popleft()
+                if raw_message["e"] == EventType.KLINE.value:
+                    k_line = raw_message["k"]
+                    stream_id = self._registry.get_stream_id(k_line["s"], k_line["i"])
+                    if k_line["t"] < backfilled_until.get(stream_id, -1):
+                        continue
+                await self._dispatch_event(raw_message)
+            self._is_resyncing = False
+
+    async def _backfill(self) -> Dict[int, int]:
+        now = int(time.time() * 1000)
+        streams = list()
+        for stream_id, start_time in self._last_k_line_start_times.items():
+            symbol = self._registry.get_symbol(stream_id)
+            interval = self._registry.get_interval(stream_id).value
+            if f"{symbol.lower()}@kline_{interval}" in self._subscriptions:
+                streams.append((stream_id, symbol, interval, start_time))
+        results = await asyncio.gather(
+            *(
+                self._rest_client.get_k_lines(symbol, interval, start_time)
+                for _, symbol, interval, start_time in streams
+            ),
+            return_exceptions=True,
+        )
+
+        backfilled_until: Dict[int, int] = dict()
+        for (stream_id, symbol, interval, _), k_lines in zip(streams, results):
+            if isinstance(k_lines, BaseException):
+                logger.error(f"Failed to backfill {symbol} {interval} {k_lines}")
+                continue
+            for k_line in k_lines:
+                await self._dispatch_event(
+                    BinanceKLineUtil.rest_k_line_to_event(symbol, interval, k_line, now)
+                )
+            if k_lines:
+                backfilled_until[stream_id] = k_lines[-1][0]
+
+        logger.info(f"Backfilled {len(backfilled_until)} streams after reconnect")
+        return backfilled_until
+
     async def start(self) -> None:
         self._is_listening = True
-        self._listening_task = await asyncio.create_task(self._run_listener())
-        self._messages_sending_task = await asyncio.create_task(
+        self._listening_task = asyncio.create_task(self._run_listener())
+        self._messages_sending_task = asyncio.create_task(
             self._send_messages_from_queue()
         )
+        if self._reconcile_interval is not None:
+            self._reconcile_task = asyncio.create_task(self._run_reconciler())
 
     async def stop(self) -> None:
         self._is_listening = False
         self._listening_task.cancel()
         self._messages_sending_task.cancel()
-        self._subscriptions.clear()
-        self._messages_to_send.clear()
-        if not self._protocol.closed():
+        if self._resync_task is not None:
+            self._resync_task.cancel()
+        if self._reconcile_task is not None:
+            self._reconcile_task.cancel()
+            self._reconcile_task = None
+        self._resync_buffer.clear()
+        self._fail_requests("Client was stopped")
+        self._set_subscriptions(())
+        if not self._protocol.closed:
             await self._protocol.close()
 
     async def subscribe(self, params: Set[str]) -> List[bool]:
         if not params:
             raise ValueError("params must be not None")
 
-        params = set(params) - self._subscriptions
+        requested = list(params)
+        params = {
+            stream
+            for stream in requested
+            if self._subscription_states.get(stream)
+            not in (SubscriptionState.SUBSCRIBING, SubscriptionState.SUBSCRIBED)
+        }
 
-        if len(params) + self._subscriptions > self._max_streams:
+        streams_count = sum(
+            state != SubscriptionState.FAILED
+            for state in self._subscription_states.values()
+        )
+        if len(params) + streams_count > self._max_streams:
             raise ValueError(
-                f"Cannot create more than {self._max_streams}. Currently connected {len(self._subscriptions)} streams"
+                f"Cannot create more than {self._max_streams}. Currently connected {streams_count} streams"
             )
 
-        tasks: List[asyncio.Task] = list()
-        step = 5
-        for i in range(0, len(params) - 1 - step, step):
-            step_params = params[i : i + step]
-            tasks.append(
-                asyncio.create_task(
-                    self._send_message_with_id(
-                        RequestModel(method=Method.SUBSCRIBE, params=step_params)
-                    )
+        for stream in params:
+            self._set_state(stream, SubscriptionState.SUBSCRIBING)
+        subscribed = await self._request_streams(Method.SUBSCRIBE, params)
+        for stream in params:
+            # Stream may have been unsubscribed meanwhile
+            if self._subscription_states.get(stream) == SubscriptionState.SUBSCRIBING:
+                self._set_state(
+                    stream,
+                    SubscriptionState.SUBSCRIBED
+                    if stream in subscribed
+                    else SubscriptionState.FAILED,
                 )
-            )
-        if len(params) % step != 0:
-            tasks.append(
-                asyncio.create_task(
-                    self._send_message_with_id(
-                        RequestModel(
-                            method=Method.SUBSCRIBE,
-                            params=params[len(params) // step * step :],
-                        )
-                    )
+
+        return [
+            self._subscription_states.get(stream) == SubscriptionState.SUBSCRIBED
+            for stream in requested
+        ]
+
+    async def unsubscribe(self, params: Set[str]) -> List[bool]:
+        if not params:
+            raise ValueError("params must be not None")
+
+        requested = list(params)
+        params = set()
+        for stream in set(requested):
+            state = self._subscription_states.get(stream)
+            if state == SubscriptionState.FAILED:
+                self._set_state(stream, None)
+            elif state in (SubscriptionState.SUBSCRIBING, SubscriptionState.SUBSCRIBED):
+                params.add(stream)
+
+        for stream in params:
+            self._set_state(stream, SubscriptionState.UNSUBSCRIBING)
+        unsubscribed = await self._request_streams(Method.UNSUBSCRIBE, params)
+        for stream in params:
+            if self._subscription_states.get(stream) == SubscriptionState.UNSUBSCRIBING:
+                self._set_state(
+                    stream,
+                    None if stream in unsubscribed else SubscriptionState.SUBSCRIBED,
                 )
-            )
 
-        await asyncio.gather(tasks)
-        del tasks
+        return [
+            self._subscription_states.get(stream)
+            not in (SubscriptionState.SUBSCRIBED, SubscriptionState.UNSUBSCRIBING)
+            for stream in requested
+        ]
 
-        await self._send_message_with_id(
-            RequestModel(method=Method.SUBSCRIBE, params=params)
+    async def _request_streams(self, method: Method, streams: Set[str]) -> Set[str]:
+        # Returns streams of acknowledged requests
+        chunks = self._split_params(streams)
+        results = await asyncio.gather(
+            *(
+                self._send_message_with_id(RequestModel(method=method, params=chunk))
+                for chunk in chunks
+            ),
+            return_exceptions=True,
         )
 
-        self._subscriptions = (
-            await (
-                self._send_message_with_id(
-                    RequestModel(method=Method.LIST_SUBSCRIPTIONS)
-                )
-            )
-        ).result
+        succeeded: Set[str] = set()
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                logger.error(f"{method.value} of {len(chunk)} streams failed {result}")
+                continue
+            succeeded.update(chunk)
 
-        return [sub in self._subscriptions for sub in params]
+        return succeeded
 
-    async def unsubscribe(self, params: Set[str]) -> List[bool]:
-        if not params:
-            raise ValueError("params must be not None")
+    async def _run_reconciler(self) -> None:
+        while True:
+            await asyncio.sleep(self._reconcile_interval)
+            try:
+                await self._reconcile()
+            except asyncio.CancelledError:
+                # Only cancellation of the reconciler itself stops it, not of a
+                # request it awaited
+                if asyncio.current_task().cancelling():
+                    raise
+                logger.warning("Subscriptions check was cancelled")
+            except Exception as e:
+                logger.exception(f"Failed to check subscriptions {e}")
 
-        params = set(params) & self._subscriptions
+    async def _reconcile(self) -> None:
+        # Low priority, skipped while anything else is queued or in flight
+        if (
+            self._is_resyncing
+            or not self._connected.is_set()
+            or self._messages_to_send
+            or self._frames_in_flight
+        ):
+            return
 
-        await self._send_message_with_id(
-            RequestModel(method=Method.UNSUBSCRIBE, params=params)
+        version = self._subscriptions_version
+        listed = set(
+            (
+                await self._send_message_with_id(
+                    RequestModel(method=Method.LIST_SUBSCRIPTIONS), retries=0
+                )
+            ).result
+            or ()
         )
+        if version != self._subscriptions_version or self._is_resyncing:
+            # State changed while waiting, the reply may be already stale
+            return
 
-        self._subscriptions = (
-            await (
-                self._send_message_with_id(
-                    RequestModel(method=Method.LIST_SUBSCRIPTIONS)
+        self._reconciles += 1
+        subscribed = {
+            stream
+            for stream, state in self._subscription_states.items()
+            if state == SubscriptionState.SUBSCRIBED
+        }
+        missing = subscribed - listed
+        unexpected = listed - subscribed
+        # Timed out SUBSCRIBE that went through after all
+        adopted = {
+            stream
+            for stream in unexpected
+            if self._subscription_states.get(stream) == SubscriptionState.FAILED
+        }
+        unexpected -= adopted
+        if not missing and not unexpected and not adopted:
+            return
+
+        logger.warning(
+            f"Subscriptions drifted, {len(missing)} missing, "
+            f"{len(unexpected)} unexpected, {len(adopted)} failed but subscribed"
+        )
+        self._repaired_streams += len(missing) + len(unexpected) + len(adopted)
+        for stream in adopted:
+            self._set_state(stream, SubscriptionState.SUBSCRIBED)
+        for stream in missing:
+            self._set_state(stream, SubscriptionState.SUBSCRIBING)
+        subscribed, _ = await asyncio.gather(
+            self._request_streams(Method.SUBSCRIBE, missing),
+            self._request_streams(Method.UNSUBSCRIBE, unexpected),
+        )
+        for stream in missing:
+            if self._subscription_states.get(stream) == SubscriptionState.SUBSCRIBING:
+                self._set_state(
+                    stream,
+                    SubscriptionState.SUBSCRIBED
+                    if stream in subscribed
+                    else SubscriptionState.FAILED,
                 )
+
+    def get_subscription_states(self) -> Dict[str, SubscriptionState]:
+        return dict(self._subscription_states)
+
+    def get_control_plane_stats(self) -> ControlPlaneStats:
+        return ControlPlaneStats(
+            queue_depth=len(self._messages_to_send),
+            in_flight_frames=len(self._frames_in_flight),
+            frames_sent=self._frames_sent,
+            requests_sent=self._requests_sent,
+            last_send_latency=self._last_send_latency,
+            avg_send_latency=self._total_send_latency / max(1, self._requests_sent),
+            max_send_latency=self._max_send_latency,
+            subscriptions=len(self._subscriptions),
+            pending_subscriptions=sum(
+                state
+                in (SubscriptionState.SUBSCRIBING, SubscriptionState.UNSUBSCRIBING)
+                for state in self._subscription_states.values()
+            ),
+            failed_subscriptions=sum(
+                state == SubscriptionState.FAILED
+                for state in self._subscription_states.values()
+            ),
+            reconciles=self._reconciles,
+            repaired_streams=self._repaired_streams,
+        )
+
+    def _set_subscriptions(self, streams: Iterable[str]) -> None:
+        # Replaces local state with acknowledged `streams`
+        for stream in list(self._subscription_states):
+            self._set_state(stream, None)
+        for stream in streams:
+            self._set_state(stream, SubscriptionState.SUBSCRIBED)
+
+    def _set_state(self, stream: str, state: SubscriptionState | None) -> None:
+        self._subscriptions_version += 1
+        if state is None:
+            self._subscription_states.pop(stream, None)
+        else:
+            self._subscription_states[stream] = state
+
+        if state not in _ACKNOWLEDGED_STATES:
+            self._subscriptions.discard(stream)
+        elif stream not in self._subscriptions:
+            self._subscriptions.add(stream)
+            try:
+                # Envelopes of combined streams are decoded by stream name
+                self._registry.register_stream(stream)
+            except ValueError:
+                pass
+
+    def _split_params(self, params: Set[str]) -> List[Set[str]]:
+        params = list(params)
+        step = self._max_params_per_request
+        return [set(params[i : i + step]) for i in range(0, len(params), step)]
+
+    def _resolve_request(self, raw_message: dict) -> None:
+        requests = self._frames_in_flight.pop(raw_message["id"], None)
+        if requests is None:
+            logger.debug(f"Got reply for unknown or expired request {raw_message}")
+            return
+
+        # Binance reports failed requests either flat or nested in `error`
+        error = raw_message.get("error", raw_message)
+        if "code" in error:
+            exception = BinanceClientError(error["code"], error.get("msg", ""))
+            response = None
+        else:
+            exception = None
+            response = ResponseModel.parse_obj(raw_message)
+
+        if exception and len(requests) > 1:
+            # One bad param rejects the whole merged frame, every request is
+            # retried alone so only callers whose own params fail get the error
+            pending = [request for request in requests if not request.future.done()]
+            for request in pending:
+                request.is_isolated = True
+            self._messages_to_send.extendleft(reversed(pending))
+            self._messages_to_send_event.set()
+            logger.warning(
+                f"Merged frame of {len(requests)} requests failed {exception}, "
+                "retrying them one by one"
             )
-        ).result
+            return
 
-        return [sub not in self._subscriptions for sub in params]
+        for request in requests:
+            if request.future.done():
+                continue
+            if exception:
+                request.future.set_exception(exception)
+            else:
+                request.future.set_result(response)
 
-    async def _send_message_with_id(self, message: RequestModel) -> ResponseModel:
-        id = message.id
+    # Every attempt queues a new request that goes out in a new frame with its
+    # own id, a late reply to the frame of an expired attempt is ignored
+    async def _send_message_with_id(
+        self,
+        message: RequestModel,
+        timeout: float | None = None,
+        retries: int | None = None,
+    ) -> ResponseModel:
+        timeout = timeout or self._request_timeout
+        retries = self._request_retries if retries is None else retries
 
-        self._messages_with_id[id] = None
+        for attempt in range(retries + 1):
+            request = _QueuedRequest(
+                message,
+                asyncio.get_running_loop().create_future(),
+                asyncio.Event(),
+                time.monotonic(),
+            )
+            self._messages_to_send.append(request)
+            self._messages_to_send_event.set()
+            sent_waiter = asyncio.ensure_future(request.sent.wait())
+            try:
+                # Future is failed instead of sent if the client stops or the
+                # sender exits, timeout counts from the moment request was sent
+                await asyncio.wait(
+                    (sent_waiter, request.future), return_when=asyncio.FIRST_COMPLETED
+                )
+                if request.future.done():
+                    return request.future.result()
+                return await asyncio.wait_for(request.future, timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    f"No reply for request {message.method.value} frame "
+                    f"{request.frame_id} in {timeout}s "
+                    f"(attempt {attempt + 1}/{retries + 1})"
+                )
+            finally:
+                sent_waiter.cancel()
+                request.future.cancel()
+                self._forget_frame_if_expired(request.frame_id)
+
+        raise asyncio.TimeoutError(
+            f"No reply for request {message.method.value} after {retries + 1} attempts"
+        )
+
+    def _fail_requests(self, reason: str) -> None:
+        # Queued and in flight requests, their callers stop waiting
+        exception = ConnectionError(reason)
+        for request in self._messages_to_send:
+            if not request.future.done():
+                request.future.set_exception(exception)
+        for requests in self._frames_in_flight.values():
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(exception)
+        self._messages_to_send.clear()
+        self._frames_in_flight.clear()
 
-        await self._wait_until_message_exists(id)
+    def _forget_frame_if_expired(self, frame_id: int | None) -> None:
+        requests = self._frames_in_flight.get(frame_id)
+        if requests is not None and all(request.future.done() for request in requests):
+            del self._frames_in_flight[frame_id]
 
-        return self._messages_with_id.pop(id)
+    def _pack_next_frame(self) -> List[_QueuedRequest]:
+        # Merges consecutive requests of the same method from the queue head, so
+        # FIFO order between SUBSCRIBE and UNSUBSCRIBE of the same stream holds
+        while self._messages_to_send and self._messages_to_send[0].future.done():
+            self._messages_to_send.popleft()
+        if not self._messages_to_send:
+            return []
 
-    async def _wait_until_message_exists(self, message_id: int) -> None:
-        while not self._messages_with_id[message_id]:
-            await asyncio.sleep(1)
+        first = self._messages_to_send.popleft()
+        packed = [first]
+        method = first.message.method
+        if first.is_isolated or method not in (
+            Method.SUBSCRIBE,
+            Method.UNSUBSCRIBE,
+            Method.LIST_SUBSCRIPTIONS,
+        ):
+            return packed
+
+        params_count = len(first.message.params or ())
+        while self._messages_to_send:
+            request = self._messages_to_send[0]
+            if request.future.done():
+                self._messages_to_send.popleft()
+                continue
+            if request.message.method != method or request.is_isolated:
+                break
+            request_params_count = len(request.message.params or ())
+            if params_count + request_params_count > self._max_params_per_request:
+                break
+
+            params_count += request_params_count
+            packed.append(self._messages_to_send.popleft())
+
+        return packed
 
     async def _send_messages_from_queue(self) -> None:
+        try:
+            await self._run_sender()
+        finally:
+            self._fail_requests("Control-plane sender stopped")
+
+    async def _run_sender(self) -> None:
         while True:
-            if len(self._messages_to_send) > 0:
-                await self._protocol.send(
-                    self._messages_to_send.pop().json(exclude_none=True)
-                )
-            await asyncio.sleep(5)
+            if not self._messages_to_send:
+                self._messages_to_send_event.clear()
+                await self._messages_to_send_event.wait()
+                continue
+
+            await self._rate_limiter.acquire()
+            requests = self._pack_next_frame()
+            if not requests:
+                continue
+
+            first = requests[0].message
+            if len(requests) == 1:
+                frame = first
+            else:
+                params = set()
+                for request in requests:
+                    params.update(request.message.params or ())
+                frame = RequestModel(method=first.method, params=params or None)
+
+            self._frames_in_flight[frame.id] = requests
+            protocol = self._protocol
+            try:
+                await protocol.send(frame.json(exclude_none=True))
+            except ConnectionClosed:
+                if not self._auto_reconnect:
+                    raise
+                # Put requests back in order and wait for listener to reconnect
+                del self._frames_in_flight[frame.id]
+                self._messages_to_send.extendleft(reversed(requests))
+                if self._protocol is protocol:
+                    self._connected.clear()
+                await self._connected.wait()
+                continue
+
+            sent_at = time.monotonic()
+            self._frames_sent += 1
+            for request in requests:
+                request.frame_id = frame.id
+                request.sent.set()
+                latency = sent_at - request.enqueued_at
+                self._requests_sent += 1
+                self._last_send_latency = latency
+                self._total_send_latency += latency
+                self._max_send_latency = max(self._max_send_latency, latency)
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import asyncio
+import zlib
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Set, Type
+
+from loguru import logger
+
+from ..config import config
+from ..model.binance_client_models import ControlPlaneStats, EventType
+from ..services.binance_client import BinanceClientWebsocketStreamManager
+from ..services_impl.binance_client_impl import (
+    BinanceClientWebsocketStreamManagerImpl,
+    CallbackFunctionType,
+)
+from ..utils.binance_utils import BinanceStreamNameUtil
+
+
+class BinanceClientWebsocketStreamManagerPoolImpl(BinanceClientWebsocketStreamManager):
+    # Streams go to the shard of their name hash, or to the least loaded one
+    # if it is full, a new connection is opened when all are full. Once loads
+    # of shards drift apart by `rebalance_spread` of a connection capacity,
+    # after unsubscribes or a new connection, streams are moved from the most
+    # to the least loaded shards. A moved stream is subscribed on the new
+    # shard before it is unsubscribed from the old one, so no update is lost
+    _connection_url: str
+    _callbacks: Dict[EventType, CallbackFunctionType]
+    _client_kwargs: Dict[str, Any]  # Passed to every shard on creation
+    _max_connections: int
+    _max_streams_per_connection: int
+    _shards: List[BinanceClientWebsocketStreamManagerImpl]
+    _shard_loads: List[int]  # Streams assigned to every shard
+    _stream_to_shard: Dict[str, int]
+    _shards_lock: asyncio.Lock  # Held by every request and rebalance
+    _rebalance_spread: float | None  # Share of connection capacity, off if None
+    _moved_streams: int = 0
+    _is_listening: bool = False
+
+    def __init__(
+        self,
+        shards: List[BinanceClientWebsocketStreamManagerImpl],
+        callbacks: Dict[EventType, CallbackFunctionType],
+        connection_url: str,
+        max_connections: int = 8,
+        max_streams_per_connection: int = 1024,
+        rebalance_spread: float | None = 0.25,
+        **client_kwargs: Any,
+    ) -> None:
+        if not shards:
+            raise ValueError("Pool needs at least one connection")
+
+        self._shards = list(shards)
+        self._shard_loads = [0] * len(self._shards)
+        self._callbacks = callbacks
+        self._connection_url = connection_url
+        self._max_connections = max(max_connections, len(self._shards))
+        self._max_streams_per_connection = max_streams_per_connection
+        self._client_kwargs = client_kwargs
+        self._stream_to_shard = dict()
+        self._shards_lock = asyncio.Lock()
+        self._rebalance_spread = rebalance_spread
+
+    @classmethod
+    async def create(
+        cls: Type[BinanceClientWebsocketStreamManagerPoolImpl],
+        callbacks: dict[EventType, CallbackFunctionType],
+        connection_url: str = config.BINANCE_WEBSOCKET_URL,
+        connections: int = 2,
+        max_connections: int = 8,
+        max_streams_per_connection: int = 1024,
+        streams: Set[str] | None = None,
+        rebalance_spread: float | None = 0.25,
+        **client_kwargs: Any,
+    ) -> BinanceClientWebsocketStreamManager:
+        # Initial `streams` are split over combined stream connections by
+        # streams count and URL length, more connections are opened if needed
+        groups = (
+            BinanceStreamNameUtil.split_combined_streams(
+                connection_url, sorted(streams), max_streams_per_connection
+            )
+            if streams
+            else []
+        )
+        groups += [[]] * max(0, connections - len(groups))
+        shards = await asyncio.gather(
+            *(
+                BinanceClientWebsocketStreamManagerImpl.create(
+                    callbacks,
+                    connection_url=connection_url,
+                    max_streams=max_streams_per_connection,
+                    streams=set(group) or None,
+                    **client_kwargs,
+                )
+                for group in groups
+            )
+        )
+        this = cls(
+            shards,
+            callbacks,
+            connection_url,
+            max_connections=max_connections,
+            max_streams_per_connection=max_streams_per_connection,
+            rebalance_spread=rebalance_spread,
+            **client_kwargs,
+        )
+        for shard_index, group in enumerate(groups):
+            for stream in group:
+                this._stream_to_shard[stream] = shard_index
+            this._shard_loads[shard_index] = len(group)
+
+        return this
+
+    @staticmethod
+    def _stream_hash(stream: str) -> int:
+        # Stable across processes unlike builtin `hash`
+        return zlib.crc32(stream.encode())
+
+    @property
+    def moved_streams(self) -> int:
+        return self._moved_streams
+
+    async def _open_shard(self) -> int:
+        shard = await BinanceClientWebsocketStreamManagerImpl.create(
+            self._callbacks,
+            connection_url=self._connection_url,
+            max_streams=self._max_streams_per_connection,
+            **self._client_kwargs,
+        )
+        if self._is_listening:
+            await shard.start()
+
+        self._shards.append(shard)
+        self._shard_loads.append(0)
+        logger.info(f"Opened connection #{len(self._shards)} for stream pool")
+
+        return len(self._shards) - 1
+
+    async def _assign_shard(self, stream: str) -> int:
+        shard_index = self._stream_hash(stream) % len(self._shards)
+        if self._shard_loads[shard_index] >= self._max_streams_per_connection:
+            # Preferred shard is full, fall back to the least loaded one
+            shard_index = min(
+                range(len(self._shards)), key=self._shard_loads.__getitem__
+            )
+            if self._shard_loads[shard_index] >= self._max_streams_per_connection:
+                if len(self._shards) >= self._max_connections:
+                    raise ValueError(
+                        f"Cannot create more than {self._max_connections * self._max_streams_per_connection} streams"
+                    )
+                shard_index = await self._open_shard()
+
+        self._stream_to_shard[stream] = shard_index
+        self._shard_loads[shard_index] += 1
+
+        return shard_index
+
+    def _release_stream(self, stream: str) -> None:
+        shard_index = self._stream_to_shard.pop(stream, None)
+        if shard_index is not None:
+            self._shard_loads[shard_index] -= 1
+
+    async def _run_listener(self) -> None:
+        # Every shard runs own listener task, all of them share the same callbacks
+        await asyncio.gather(*(shard.start() for shard in self._shards))
+
+    async def start(self) -> None:
+        self._is_listening = True
+        await self._run_listener()
+
+    async def stop(self) -> None:
+        self._is_listening = False
+        await asyncio.gather(*(shard.stop() for shard in self._shards))
+        self._stream_to_shard.clear()
+        self._shard_loads = [0] * len(self._shards)
+
+    # Requests hold the lock while they run, so a concurrent rebalance never
+    # moves a stream that is being subscribed or unsubscribed
+    async def subscribe(self, params: Set[str]) -> List[bool]:
+        if not params:
+            raise ValueError("params must be not None")
+
+        requested = list(params)
+        async with self._shards_lock:
+            params = set(requested) - self._stream_to_shard.keys()
+            params_by_shard: DefaultDict[int, Set[str]] = defaultdict(set)
+            for stream in params:
+                params_by_shard[await self._assign_shard(stream)].add(stream)
+
+            subscribed = await self._run_on_shards(
+                params_by_shard, BinanceClientWebsocketStreamManagerImpl.subscribe
+            )
+            for stream in params - subscribed:
+                self._release_stream(stream)
+            result = [stream in self._stream_to_shard for stream in requested]
+        await self._rebalance_if_needed()
+
+        return result
+
+    async def unsubscribe(self, params: Set[str]) -> List[bool]:
+        if not params:
+            raise ValueError("params must be not None")
+
+        requested = list(params)
+        async with self._shards_lock:
+            params = set(requested) & self._stream_to_shard.keys()
+            params_by_shard: DefaultDict[int, Set[str]] = defaultdict(set)
+            for stream in params:
+                params_by_shard[self._stream_to_shard[stream]].add(stream)
+
+            unsubscribed = await self._run_on_shards(
+                params_by_shard, BinanceClientWebsocketStreamManagerImpl.unsubscribe
+            )
+            for stream in unsubscribed:
+                self._release_stream(stream)
+            result = [stream not in self._stream_to_shard for stream in requested]
+        await self._rebalance_if_needed()
+
+        return result
+
+    def _is_unbalanced(self) -> bool:
+        if self._rebalance_spread is None or len(self._shards) < 2:
+            return False
+        spread = max(self._shard_loads) - min(self._shard_loads)
+        return spread > self._rebalance_spread * self._max_streams_per_connection
+
+    async def _rebalance_if_needed(self) -> None:
+        if self._is_unbalanced():
+            await self.rebalance()
+
+    # Evens out shard loads, returns count of moved streams
+    async def rebalance(self) -> int:
+        async with self._shards_lock:
+            loads = list(self._shard_loads)
+            target_load = -(-sum(loads) // len(loads))
+            streams_by_shard: DefaultDict[int, List[str]] = defaultdict(list)
+            for stream, shard_index in self._stream_to_shard.items():
+                streams_by_shard[shard_index].append(stream)
+
+            moves: DefaultDict[int, Dict[str, int]] = defaultdict(dict)  # By target
+            for source in sorted(range(len(loads)), key=loads.__getitem__)[::-1]:
+                streams = streams_by_shard[source]
+                while loads[source] > target_load and streams:
+                    target = min(range(len(loads)), key=loads.__getitem__)
+                    if loads[target] >= target_load:
+                        break
+                    moves[target][streams.pop()] = source
+                    loads[source] -= 1
+                    loads[target] += 1
+            if not moves:
+                return 0
+
+            subscribed = await self._run_on_shards(
+                {target: set(streams) for target, streams in moves.items()},
+                BinanceClientWebsocketStreamManagerImpl.subscribe,
+            )
+            params_by_source: DefaultDict[int, Set[str]] = defaultdict(set)
+            for target, streams in moves.items():
+                for stream, source in streams.items():
+                    if stream not in subscribed:
+                        continue
+                    params_by_source[source].add(stream)
+                    self._stream_to_shard[stream] = target
+                    self._shard_loads[source] -= 1
+                    self._shard_loads[target] += 1
+            unsubscribed = await self._run_on_shards(
+                params_by_source, BinanceClientWebsocketStreamManagerImpl.unsubscribe
+            )
+            moved = len(subscribed)
+            not_unsubscribed = moved - len(unsubscribed)
+            if not_unsubscribed:
+                logger.warning(
+                    f"{not_unsubscribed} moved streams are still subscribed "
+                    "on their previous connection"
+                )
+            self._moved_streams += moved
+            logger.info(f"Moved {moved} streams to rebalance connections")
+
+            return moved
+
+    async def _run_on_shards(
+        self, params_by_shard: Dict[int, Set[str]], method: Any
+    ) -> Set[str]:
+        shard_params = [
+            (shard_index, list(streams))
+            for shard_index, streams in params_by_shard.items()
+        ]
+        results = await asyncio.gather(
+            *(
+                method(self._shards[shard_index], streams)
+                for shard_index, streams in shard_params
+            ),
+            return_exceptions=True,
+        )
+
+        succeeded: Set[str] = set()
+        for (shard_index, streams), result in zip(shard_params, results):
+            if isinstance(result, BaseException):
+                logger.error(
+                    f"Request to connection #{shard_index + 1} failed {result}"
+                )
+                continue
+            succeeded.update(stream for stream, is_ok in zip(streams, result) if is_ok)
+
+        return succeeded
+
+    def get_streams_by_connection(self) -> List[int]:
+        return list(self._shard_loads)
+
+    def get_control_plane_stats(self) -> List[ControlPlaneStats]:
+        return [shard.get_control_plane_stats() for shard in self._shards]
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, List
+
+import aiohttp
+from loguru import logger
+
+from ..config import config
+from ..services.binance_rest_client import BinanceRestClient
+
+
+class BinanceRestClientImpl(BinanceRestClient):
+    K_LINES_PATH: str = "/api/v3/klines"
+    MAX_K_LINES_PER_REQUEST: int = 1000
+
+    _base_url: str
+    _session: aiohttp.ClientSession | None = None  # Reused for keep-alive
+    _semaphore: asyncio.Semaphore  # Limits concurrent requests
+
+    def __init__(
+        self,
+        base_url: str = config.BINANCE_REST_BASE_URL,
+        max_concurrent_requests: int = config.BINANCE_REST_MAX_CONCURRENT_REQUESTS,
+    ) -> None:
+        self._base_url = base_url.rstrip("/")
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=30),
+                raise_for_status=True,
+            )
+        return self._session
+
+    async def get_k_lines(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: int,
+        end_time: int | None = None,
+    ) -> List[List[Any]]:
+        k_lines: List[List[Any]] = list()
+        while True:
+            params = {
+                "symbol": symbol.upper(),
+                "interval": interval,
+                "startTime": start_time,
+                "limit": self.MAX_K_LINES_PER_REQUEST,
+            }
+            if end_time is not None:
+                params["endTime"] = end_time
+
+            async with self._semaphore:
+                async with self._get_session().get(
+                    f"{self._base_url}{self.K_LINES_PATH}", params=params
+                ) as response:
+                    page: List[List[Any]] = await response.json()
+
+            k_lines.extend(page)
+            if len(page) < self.MAX_K_LINES_PER_REQUEST:
+                break
+            # Continue right after the last open time we got
+            start_time = page[-1][0] + 1
+
+        logger.debug(f"Got {len(k_lines)} k-lines for {symbol} {interval}")
+        return k_lines
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Dict, Set, Tuple
+
+from ..model.processor_models import AggregatorStats, KLineData, KLineInterval
+from ..utils.binance_utils import BinanceKLineIntervalUtil
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
+
+KLineCallbackType = Callable[[KLineData], Coroutine[Any, Any, Any]]
+
+
+@dataclass(slots=True, eq=False)
+class _Candle:
+    start_time: int
+    end_time: int  # Start time of the next candle
+    open_price: float
+    close_price: float
+    high_price: float  # Of closed minutes, the open one is kept aside
+    low_price: float
+    volume: float
+    is_complete: bool  # First minute of the candle was seen
+    minute: KLineData | None = None  # Latest update of the open minute
+    last_closed_minute: int = -1
+    is_closed: bool = False
+
+
+class KLinesAggregator:
+    # Builds k-lines of higher intervals from 1 minute k-lines of the same
+    # symbol, so one `@kline_1m` stream feeds processors of every interval.
+    # Every pushed minute update emits the 1 minute k-line and the revised
+    # candle of each interval, candle is closed with its last minute.
+    # Candle that started before the first minute seen misses volume and
+    # prices, it is emitted only with `emit_partial`, push history first
+    _on_k_line: KLineCallbackType
+    _registry: StreamRegistry
+    _intervals: Tuple[KLineInterval, ...]  # Higher than 1 minute
+    _is_emitting_minutes: bool
+    _emit_partial: bool
+    _candles: Dict[int, _Candle]  # By stream id of the candle interval
+    _received: int = 0
+    _emitted: int = 0
+    _skipped: int = 0
+    _partial: int = 0
+
+    def __init__(
+        self,
+        on_k_line: KLineCallbackType,
+        intervals: Set[KLineInterval] | None = None,
+        emit_partial: bool = False,
+        registry: StreamRegistry = STREAM_REGISTRY,
+    ) -> None:
+        intervals = set(KLineInterval if intervals is None else intervals)
+        self._on_k_line = on_k_line
+        self._registry = registry
+        self._is_emitting_minutes = KLineInterval.K_LINE_INTERVAL_1_MINUTE in intervals
+        # Declaration order is from the shortest interval
+        self._intervals = tuple(
+            interval
+            for interval in KLineInterval
+            if interval in intervals
+            and interval != KLineInterval.K_LINE_INTERVAL_1_MINUTE
+        )
+        self._emit_partial = emit_partial
+        self._candles = dict()
+
+    @property
+    def intervals(self) -> Tuple[KLineInterval, ...]:
+        return self._intervals
+
+    async def push(self, data: KLineData) -> None:
+        if data.interval != KLineInterval.K_LINE_INTERVAL_1_MINUTE:
+            raise ValueError(f"Only 1m k-lines are aggregated, got {data.interval}")
+
+        self._received += 1
+        if self._is_emitting_minutes:
+            self._emitted += 1
+            await self._on_k_line(data)
+
+        stream_id = self._registry.resolve(data)
+        for interval in self._intervals:
+            key = StreamRegistry.replace_interval(stream_id, interval)
+            candle = self._candles.get(key)
+            if candle is None or data.start_time >= candle.end_time:
+                if candle is not None and not candle.is_closed:
+                    # Last minute was never closed, the next candle closes it
+                    await self._emit(candle, data, key, True)
+                start_time, end_time = BinanceKLineIntervalUtil.get_bounds(
+                    interval.value, data.start_time
+                )
+                candle = self._candles[key] = _Candle(
+                    start_time,
+                    end_time,
+                    data.open_price,
+                    data.close_price,
+                    data.high_price,
+                    data.low_price,
+                    0.0,
+                    is_complete=data.start_time == start_time,
+                )
+            elif (
+                data.start_time < candle.start_time
+                or data.start_time <= candle.last_closed_minute
+                or candle.minute is not None
+                and data.start_time < candle.minute.start_time
+            ):
+                self._skipped += 1
+                continue
+
+            minute = candle.minute
+            if minute is not None and minute.start_time < data.start_time:
+                # Close of the previous minute was missed
+                self._close_minute(candle, minute)
+            candle.close_price = data.close_price
+            if data.is_kline_closed:
+                self._close_minute(candle, data)
+            else:
+                candle.minute = data
+
+            is_closed = (
+                data.is_kline_closed
+                and data.start_time + BinanceKLineIntervalUtil.MINUTE_MILLISECONDS
+                >= candle.end_time
+            )
+            await self._emit(candle, data, key, is_closed)
+
+    @staticmethod
+    def _close_minute(candle: _Candle, minute: KLineData) -> None:
+        candle.high_price = max(candle.high_price, minute.high_price)
+        candle.low_price = min(candle.low_price, minute.low_price)
+        candle.volume += minute.base_volume_asset
+        candle.last_closed_minute = minute.start_time
+        candle.minute = None
+
+    async def _emit(
+        self,
+        candle: _Candle,
+        minute_data: KLineData,  # Update that caused the emit
+        stream_id: int,
+        is_closed: bool,
+    ) -> None:
+        candle.is_closed = is_closed
+        if not candle.is_complete and not self._emit_partial:
+            self._partial += 1
+            return
+
+        minute = candle.minute
+        high_price, low_price, volume = (
+            candle.high_price,
+            candle.low_price,
+            candle.volume,
+        )
+        if minute is not None:
+            high_price = max(high_price, minute.high_price)
+            low_price = min(low_price, minute.low_price)
+            volume += minute.base_volume_asset
+
+        self._emitted += 1
+        await self._on_k_line(
+            KLineData(
+                candle.start_time,
+                minute_data.symbol,
+                self._registry.get_interval(stream_id),
+                candle.open_price,
+                candle.close_price,
+                high_price,
+                low_price,
+                volume,
+                is_closed,
+                minute_data.event_time,
+                stream_id,
+            )
+        )
+
+    def remove_symbol(self, symbol: str) -> None:
+        stream_id = self._registry.find_symbol_stream_id(
+            symbol, KLineInterval.K_LINE_INTERVAL_1_MINUTE
+        )
+        if stream_id is None:
+            return
+        for interval in self._intervals:
+            self._candles.pop(
+                StreamRegistry.replace_interval(stream_id, interval), None
+            )
+
+    def get_stats(self) -> AggregatorStats:
+        return AggregatorStats(
+            received=self._received,
+            emitted=self._emitted,
+            skipped=self._skipped,
+            partial=self._partial,
+            candles=len(self._candles),
+        )
@@ -1,18 +1,40 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Callable, Coroutine, Dict, List, Set, Type
+import time
+from typing import Callable, Coroutine, Dict, List, Set, Tuple, Type
 
 from ..model.binance_client_models import EventType, KLineData, KLineDataModel
+from ..model.processor_models import KLineData as ProcessorKLineData
+from ..model.processor_models import KLineInterval
 from ..services.binance_client import BinanceClientWebsocketStreamManager
+from ..services.binance_rest_client import BinanceRestClient
 from ..services.k_lines_listener import KLinesListener
 from ..services_impl.binance_client_impl import BinanceClientWebsocketStreamManagerImpl
+from ..services_impl.binance_rest_client_impl import BinanceRestClientImpl
+from ..services_impl.k_lines_aggregator import KLinesAggregator
+from ..services_impl.k_lines_coalescer import KLinesCoalescer
+from ..utils.binance_to_processor_model_mapper import binance_to_processor_kline_data
 from ..utils.binance_utils import BinanceStreamNameUtil
+from ..utils.k_line_journal import KLineJournal
+from ..utils.pipeline_metrics import PipelineMetrics, PipelineStage
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
 
 
 class KLinesBinanceListener(KLinesListener):
     _binance_client: BinanceClientWebsocketStreamManager
+    _rest_client: BinanceRestClient | None = None  # Backfills gaps on reconnect
     _listener_callback: Callable[[KLineData], Coroutine[None]]
+    _coalescer: KLinesCoalescer | None = None  # Collapses open candle updates
+    # Builds k-lines of other intervals from the 1 minute stream
+    _aggregator: KLinesAggregator | None = None
+    _aggregated_callback: Callable[[KLineData], Coroutine[None]] | None = None
+    # Records every received k-line and closed candles of the aggregator
+    _journal: KLineJournal | None = None
+    _metrics: PipelineMetrics | None = None  # Stage latencies of the pipeline
+    _registry: StreamRegistry = STREAM_REGISTRY  # Stream ids of k-lines
+    # Subscribed per symbol, only 1 minute when other intervals are aggregated
+    _intervals: Tuple[KLineInterval, ...] = (KLineInterval.K_LINE_INTERVAL_1_MINUTE,)
 
     def __init__(
         self,
@@ -26,35 +48,125 @@ class KLinesBinanceListener(KLinesListener):
     async def create(
         cls: Type[KLinesBinanceListener],
         listener_callback: Callable[[KLineData], Coroutine[None]],
+        fast_decode: bool = False,
+        rest_client: BinanceRestClient | None = None,
+        backfill: bool = False,
+        coalesce: bool = False,
+        journal: KLineJournal | None = None,
+        metrics: PipelineMetrics | None = None,
+        aggregate_intervals: Set[KLineInterval] | None = None,
+        symbols: Set[str] | List[str] | None = None,
+        registry: StreamRegistry = STREAM_REGISTRY,
+        intervals: Set[KLineInterval] | None = None,
     ) -> KLinesBinanceListener:
+        if aggregate_intervals and intervals:
+            raise ValueError("Native intervals cannot be streamed with aggregation")
 
         this = cls(listener_callback)
+        if intervals:
+            # Declaration order is from the shortest interval
+            this._intervals = tuple(
+                interval for interval in KLineInterval if interval in intervals
+            )
+        this._journal = journal
+        this._metrics = metrics
+        this._registry = registry
+        if coalesce:
+            this._coalescer = KLinesCoalescer(listener_callback, registry)
+            this._listener_callback = this._coalescer.push
+        if aggregate_intervals:
+            on_aggregated = this._listener_callback
+            if journal is not None:
+                this._aggregated_callback = this._listener_callback
+                on_aggregated = this._journal_aggregated_k_line
+            this._aggregator = KLinesAggregator(
+                on_aggregated, aggregate_intervals, registry=registry
+            )
+            this._listener_callback = this._aggregator.push
+        # Gaps after reconnect are backfilled with given client or on request
+        if rest_client is None and backfill:
+            rest_client = BinanceRestClientImpl()
+        this._rest_client = rest_client
 
         binance_client_listener_callbacks: Dict[EventType, KLineDataModel] = {
             EventType.KLINE: this._publish_new_k_line
         }
         binance_client: BinanceClientWebsocketStreamManager = (
             await BinanceClientWebsocketStreamManagerImpl.create(
-                binance_client_listener_callbacks
+                binance_client_listener_callbacks,
+                fast_decode=fast_decode,
+                rest_client=this._rest_client,
+                metrics=metrics,
+                streams=this._get_streams(symbols) if symbols else None,
+                registry=registry,
             )
         )
         this._binance_client = binance_client
 
         return this
 
-    async def _publish_new_k_line(self, data: KLineDataModel) -> None:
-        asyncio.create_task(self._listener_callback(data))
+    async def _publish_new_k_line(
+        self, data: KLineDataModel | ProcessorKLineData
+    ) -> None:
+        metrics = self._metrics
+        if metrics is None:
+            if isinstance(data, KLineDataModel):
+                data = binance_to_processor_kline_data(data, self._registry)
+            if self._journal is not None:
+                self._journal.append(data)
+            await self._listener_callback(data)
+            return
+
+        started_at = time.perf_counter_ns()
+        if isinstance(data, KLineDataModel):
+            data = binance_to_processor_kline_data(data, self._registry)
+            mapped_at = time.perf_counter_ns()
+            metrics.record(PipelineStage.MAP, mapped_at - started_at)
+            started_at = mapped_at
+        if self._journal is not None:
+            self._journal.append(data)
+            journaled_at = time.perf_counter_ns()
+            metrics.record(PipelineStage.JOURNAL, journaled_at - started_at)
+            started_at = journaled_at
+        await self._listener_callback(data)
+        metrics.record(PipelineStage.PROCESS, time.perf_counter_ns() - started_at)
+
+    async def _journal_aggregated_k_line(self, data: ProcessorKLineData) -> None:
+        # 1 minute k-lines are journaled when received, so processors of
+        # aggregated intervals are preloaded with their closed candles
+        if (
+            data.is_kline_closed
+            and data.interval != KLineInterval.K_LINE_INTERVAL_1_MINUTE
+        ):
+            self._journal.append(data)
+        await self._aggregated_callback(data)
 
     async def start_listening(self, symbols: Set[str] | List[str] = None) -> None:
+        if self._coalescer is not None:
+            await self._coalescer.start()
         await self._binance_client.start()
 
     async def stop_listening(self, symbols: Set[str] | List[str] = None) -> None:
         await self._binance_client.stop()
+        if self._coalescer is not None:
+            await self._coalescer.stop()
+        if self._journal is not None:
+            await self._journal.flush()
+        if self._rest_client is not None:
+            await self._rest_client.close()
+
+    def _get_streams(self, symbols: Set[str] | List[str]) -> Set[str]:
+        return {
+            BinanceStreamNameUtil.get_k_line_stream(symbol.lower(), interval.value)
+            for symbol in symbols
+            for interval in self._intervals
+        }
 
     async def add_symbols_to_listen(self, symbols: Set[str] | List[str]) -> None:
-        params = [BinanceStreamNameUtil.get_k_line_stream(symbol) for symbol in symbols]
-        await self._binance_client.subscribe(params)
+        await self._binance_client.subscribe(self._get_streams(symbols))
 
     async def remove_symbols_to_listen(self, symbols: Set[str] | List[str]) -> None:
-        params = [BinanceStreamNameUtil.get_k_line_stream(symbol) for symbol in symbols]
-        await self._binance_client.unsubscribe(params)
+        await self._binance_client.unsubscribe(self._get_streams(symbols))
+        if self._aggregator is not None:
+            for symbol in symbols:
+                self._aggregator.remove_symbol(symbol.upper())
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Deque, Dict
+
+from loguru import logger
+
+from ..model.processor_models import CoalescerStats, KLineData
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
+
+KLineCallbackType = Callable[[KLineData], Coroutine[Any, Any, Any]]
+
+
+@dataclass(slots=True, eq=False)
+class _PendingStream:
+    closed: Deque[KLineData] = field(default_factory=deque)  # Never dropped
+    latest: KLineData | None = None  # Newest open candle update
+    is_scheduled: bool = False
+
+
+class KLinesCoalescer:
+    # Latest-wins stage for open candles. `push` never waits, while delivery is
+    # behind a newer open candle update replaces the pending one, so backlog is
+    # bounded by streams count plus closed candles instead of growing with load
+    _on_k_line: KLineCallbackType
+    _registry: StreamRegistry
+    _pending: Dict[int, _PendingStream]  # By stream id
+    _ready: Deque[_PendingStream]  # Streams with pending updates, FIFO
+    _has_ready: asyncio.Event
+    _is_idle: asyncio.Event  # Nothing pending and nothing being delivered
+    _task: asyncio.Task | None = None
+    _received: int = 0
+    _delivered: int = 0
+    _collapsed: int = 0
+    _pending_closed: int = 0
+
+    def __init__(
+        self, on_k_line: KLineCallbackType, registry: StreamRegistry = STREAM_REGISTRY
+    ) -> None:
+        self._on_k_line = on_k_line
+        self._registry = registry
+        self._pending = dict()
+        self._ready = deque()
+        self._has_ready = asyncio.Event()
+        self._is_idle = asyncio.Event()
+        self._is_idle.set()
+
+    async def push(self, data: KLineData) -> None:
+        self._received += 1
+        key = self._registry.resolve(data)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingStream()
+
+        if data.is_kline_closed:
+            # Close supersedes pending revisions of the same or older candle
+            if (
+                pending.latest is not None
+                and pending.latest.start_time <= data.start_time
+            ):
+                pending.latest = None
+                self._collapsed += 1
+            pending.closed.append(data)
+            self._pending_closed += 1
+        else:
+            if pending.latest is not None:
+                self._collapsed += 1
+            pending.latest = data
+
+        if not pending.is_scheduled:
+            pending.is_scheduled = True
+            self._ready.append(pending)
+            self._has_ready.set()
+            self._is_idle.clear()
+
+    async def _run(self) -> None:
+        while True:
+            if not self._ready:
+                self._is_idle.set()
+                self._has_ready.clear()
+                await self._has_ready.wait()
+                continue
+
+            pending = self._ready.popleft()
+            pending.is_scheduled = False
+            updates = list(pending.closed)
+            pending.closed.clear()
+            self._pending_closed -= len(updates)
+            if pending.latest is not None:
+                updates.append(pending.latest)
+                pending.latest = None
+
+            for data in updates:
+                try:
+                    await self._on_k_line(data)
+                except Exception as e:
+                    logger.exception(
+                        f"Failed to deliver {data.symbol} {data.interval.value} "
+                        f"k-line {e}"
+                    )
+                self._delivered += 1
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def join(self) -> None:
+        await self._is_idle.wait()
+
+    def get_stats(self) -> CoalescerStats:
+        return CoalescerStats(
+            received=self._received,
+            delivered=self._delivered,
+            collapsed=self._collapsed,
+            pending_streams=len(self._ready),
+            pending_closed=self._pending_closed,
+        )
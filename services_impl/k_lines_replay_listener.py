@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import AsyncIterator, Callable, Coroutine, List, Set, Tuple, Type
+
+from ..model.binance_client_models import EventType, Utils
+from ..model.processor_models import KLineData, ReplayStats
+from ..services.k_lines_listener import KLinesListener
+from ..services.processor import LogicTriggerCallbackType, LogicType, ProcessorId
+from ..utils.binance_to_processor_model_mapper import (
+    binance_to_processor_kline_data,
+    raw_to_processor_kline_data,
+)
+from ..utils.k_line_journal import KLineJournal
+
+# Fast replay gives other tasks a turn every this many frames
+_YIELD_EVERY = 1000
+
+
+class KLinesReplayListener(KLinesListener):
+    # Feeds recorded frames to the listener callback instead of a websocket.
+    # Recording is either a file of raw websocket frames, one JSON per line,
+    # or a KLineJournal directory. Frames are passed one by one and every
+    # callback is awaited, so the same recording gives the same output
+    _listener_callback: Callable[[KLineData], Coroutine[None]]
+    _path: str
+    _speed: float | None  # None is as fast as possible, else wall clock factor
+    _fast_decode: bool
+    _symbols: Set[str]  # Replays every symbol while empty
+    _on_logic_triggered: LogicTriggerCallbackType | None  # Called after counting
+    _triggers: Counter
+    _task: asyncio.Task | None = None
+    _messages: int = 0
+    _k_lines: int = 0
+    _skipped: int = 0
+    _elapsed: float = 0.0
+
+    def __init__(
+        self,
+        listener_callback: Callable[[KLineData], Coroutine[None]],
+        path: str,
+        speed: float | None = None,
+        fast_decode: bool = True,
+        on_logic_triggered: LogicTriggerCallbackType | None = None,
+    ) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError(f"speed must be positive, got {speed}")
+
+        self._listener_callback = listener_callback
+        self._path = path
+        self._speed = speed
+        self._fast_decode = fast_decode
+        self._on_logic_triggered = on_logic_triggered
+        self._symbols = set()
+        self._triggers = Counter()
+
+    @classmethod
+    async def create(
+        cls: Type[KLinesReplayListener],
+        listener_callback: Callable[[KLineData], Coroutine[None]],
+        path: str,
+        speed: float | None = None,
+        fast_decode: bool = True,
+        on_logic_triggered: LogicTriggerCallbackType | None = None,
+    ) -> KLinesReplayListener:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No recording at {path}")
+
+        return cls(listener_callback, path, speed, fast_decode, on_logic_triggered)
+
+    # Pass as processors `on_logic_triggered` to get trigger counts in stats
+    async def count_trigger(
+        self, processor_id: ProcessorId, logic_type: LogicType, data: KLineData
+    ) -> None:
+        self._triggers[logic_type.value] += 1
+        if self._on_logic_triggered:
+            await self._on_logic_triggered(processor_id, logic_type, data)
+
+    async def _decode(self, line: str) -> Tuple[int, KLineData | None]:
+        raw_message = json.loads(line)
+        # Combined stream frames wrap the event
+        if "stream" in raw_message and "data" in raw_message:
+            raw_message = raw_message["data"]
+        event_time = raw_message.get("E", 0)
+        if raw_message.get("e") != EventType.KLINE.value:
+            return event_time, None
+
+        if self._fast_decode:
+            return event_time, raw_to_processor_kline_data(raw_message)
+
+        model = (await Utils.get_data_model_by_event_type(EventType.KLINE)).parse_obj(
+            raw_message
+        )
+        return event_time, binance_to_processor_kline_data(model)
+
+    async def _read_json_lines(self) -> AsyncIterator[Tuple[int, KLineData | None]]:
+        with open(self._path) as frames_file:
+            for line in frames_file:
+                if line.strip():
+                    yield await self._decode(line)
+
+    async def _read_journal(self) -> AsyncIterator[Tuple[int, KLineData | None]]:
+        journal = await KLineJournal.create(directory=self._path)
+        try:
+            streams = journal.get_streams()
+            for records in journal.iterate_segments():
+                for (
+                    start_time,
+                    received_at,
+                    open_price,
+                    high_price,
+                    low_price,
+                    close_price,
+                    volume,
+                    stream_id,
+                    is_closed,
+                ) in records.tolist():
+                    symbol, interval = streams[stream_id]
+                    yield received_at, KLineData(
+                        start_time,
+                        symbol,
+                        interval,
+                        open_price,
+                        close_price,
+                        high_price,
+                        low_price,
+                        volume,
+                        bool(is_closed),
+                    )
+        finally:
+            await journal.close()
+
+    async def _replay(self) -> None:
+        frames = (
+            self._read_journal()
+            if os.path.isdir(self._path)
+            else self._read_json_lines()
+        )
+        started_at = time.perf_counter()
+        first_event_time: int | None = None
+        async for event_time, data in frames:
+            self._messages += 1
+            if self._speed is not None:
+                if first_event_time is None:
+                    first_event_time = event_time
+                delay = (
+                    started_at
+                    + (event_time - first_event_time) / 1000 / self._speed
+                    - time.perf_counter()
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self._messages % _YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
+            if data is None or self._symbols and data.symbol not in self._symbols:
+                self._skipped += 1
+                continue
+
+            await self._listener_callback(data)
+            self._k_lines += 1
+            self._elapsed = time.perf_counter() - started_at
+
+        self._elapsed = time.perf_counter() - started_at
+
+    async def start_listening(self, symbols: Set[str] | List[str] = None) -> None:
+        if symbols:
+            await self.add_symbols_to_listen(symbols)
+        self._task = asyncio.create_task(self._replay())
+
+    async def stop_listening(self, symbols: Set[str] | List[str] = None) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # Waits for the end of the recording
+    async def join(self) -> ReplayStats:
+        if self._task is not None:
+            await self._task
+        return self.get_stats()
+
+    async def add_symbols_to_listen(self, symbols: Set[str] | List[str]) -> None:
+        self._symbols.update(symbol.upper() for symbol in symbols)
+
+    async def remove_symbols_to_listen(self, symbols: Set[str] | List[str]) -> None:
+        self._symbols.difference_update(symbol.upper() for symbol in symbols)
+
+    def get_stats(self) -> ReplayStats:
+        return ReplayStats(
+            messages=self._messages,
+            k_lines=self._k_lines,
+            skipped=self._skipped,
+            elapsed=self._elapsed,
+            messages_per_second=self._messages / self._elapsed if self._elapsed else 0,
+            triggers=dict(sorted(self._triggers.items())),
+        )
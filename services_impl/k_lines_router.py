@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List
+
+from loguru import logger
+
+from ..model.processor_models import KLineData, OverflowPolicy, RouterStats
+from ..services.processor import Processor, ProcessorId
+from ..utils.binance_utils import BinanceStreamNameUtil
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
+
+
+@dataclass(slots=True, eq=False)
+class _Route:
+    processor: Processor
+    processor_id: ProcessorId
+    queue: Deque[KLineData]
+    # Set while route waits in ready queue or is processed by a worker, so
+    # one processor never gets two batches at the same time
+    is_scheduled: bool = False
+    not_full: asyncio.Event | None = None  # Created for BLOCK policy only
+
+
+class KLinesRouter:
+    _registry: StreamRegistry
+    _routes: List[_Route | None]  # By stream id
+    _max_queue_size: int  # Per processor
+    _overflow_policy: OverflowPolicy
+    _workers_count: int
+    _workers: List[asyncio.Task]
+    _ready: asyncio.Queue[_Route]
+    _routed: int = 0
+    _unrouted: int = 0
+    _dropped: int = 0
+    _queue_depth: int = 0
+    _max_queue_depth: int = 0
+    _batches: int = 0
+
+    def __init__(
+        self,
+        workers_count: int = 4,
+        max_queue_size: int = 64,
+        overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        registry: StreamRegistry = STREAM_REGISTRY,
+    ) -> None:
+        self._registry = registry
+        self._routes = list()
+        self._workers_count = workers_count
+        self._max_queue_size = max_queue_size
+        self._overflow_policy = overflow_policy
+        self._workers = list()
+        self._ready = asyncio.Queue()
+
+    def add_processor(self, processor_id: ProcessorId, processor: Processor) -> None:
+        route = _Route(processor, processor_id, deque())
+        if self._overflow_policy == OverflowPolicy.BLOCK:
+            route.not_full = asyncio.Event()
+            route.not_full.set()
+
+        # Name is registered for `route_stream`
+        stream_id = self._registry.register_stream(
+            BinanceStreamNameUtil.get_k_line_stream(
+                processor_id.symbol.lower(), processor_id.interval.value
+            )
+        )
+        if stream_id >= len(self._routes):
+            self._routes.extend([None] * (stream_id + 1 - len(self._routes)))
+        self._routes[stream_id] = route
+
+    def remove_processor(self, processor_id: ProcessorId) -> None:
+        stream_id = self._registry.find_symbol_stream_id(
+            processor_id.symbol, processor_id.interval
+        )
+        if stream_id is None or stream_id >= len(self._routes):
+            return
+        route = self._routes[stream_id]
+        if route is None:
+            return
+
+        self._routes[stream_id] = None
+        self._queue_depth -= len(route.queue)
+        route.queue.clear()
+        if route.not_full is not None:
+            route.not_full.set()
+
+    async def route(self, data: KLineData) -> bool:
+        stream_id = data.stream_id
+        if stream_id < 0:
+            stream_id = self._registry.resolve(data)
+        return await self._enqueue(stream_id, data)
+
+    async def route_stream(self, stream: str, data: KLineData) -> bool:
+        stream_id = self._registry.find_stream_id(stream)
+        if stream_id is None:
+            self._unrouted += 1
+            return False
+
+        data.stream_id = stream_id
+        return await self.route(data)
+
+    async def _enqueue(self, stream_id: int, data: KLineData) -> bool:
+        routes = self._routes
+        route = routes[stream_id] if stream_id < len(routes) else None
+        if route is None:
+            self._unrouted += 1
+            return False
+
+        if len(route.queue) >= self._max_queue_size:
+            if self._overflow_policy == OverflowPolicy.DROP_NEWEST:
+                self._dropped += 1
+                return False
+            if self._overflow_policy == OverflowPolicy.DROP_OLDEST:
+                route.queue.popleft()
+                self._queue_depth -= 1
+                self._dropped += 1
+            else:
+                # Backpressure: producer waits for a worker to drain this queue
+                while len(route.queue) >= self._max_queue_size:
+                    route.not_full.clear()
+                    await route.not_full.wait()
+                # Removing the processor wakes producers waiting for its queue
+                if self._routes[stream_id] is not route:
+                    self._unrouted += 1
+                    return False
+
+        route.queue.append(data)
+        self._routed += 1
+        self._queue_depth += 1
+        self._max_queue_depth = max(self._max_queue_depth, len(route.queue))
+        if not route.is_scheduled:
+            route.is_scheduled = True
+            self._ready.put_nowait(route)
+
+        return True
+
+    async def _run_worker(self) -> None:
+        while True:
+            route = await self._ready.get()
+            try:
+                # Everything queued for the processor goes in one call
+                batch = list(route.queue)
+                route.queue.clear()
+                self._queue_depth -= len(batch)
+                if route.not_full is not None:
+                    route.not_full.set()
+
+                self._batches += 1
+                await route.processor.update_data_batch(batch)
+            except Exception as e:
+                logger.exception(
+                    f"Failed to process batch for {route.processor_id} {e}"
+                )
+            finally:
+                if route.queue:
+                    self._ready.put_nowait(route)
+                else:
+                    route.is_scheduled = False
+                self._ready.task_done()
+
+    async def start(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._run_worker()) for _ in range(self._workers_count)
+        ]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers.clear()
+
+    # Waits until every routed update was handed to its processor
+    async def join(self) -> None:
+        await self._ready.join()
+
+    def get_stats(self) -> RouterStats:
+        return RouterStats(
+            routed=self._routed,
+            unrouted=self._unrouted,
+            dropped=self._dropped,
+            queue_depth=self._queue_depth,
+            max_queue_depth=self._max_queue_depth,
+            ready_processors=self._ready.qsize(),
+            batches=self._batches,
+        )
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Set
+
+from loguru import logger
+
+from ..model.processor_models import SchedulerStats
+from ..services.processor import ProcessorId
+from ..utils.cron_expression import CronExpression
+from ..utils.timer_wheel import HierarchicalTimerWheel
+
+ScheduledLogicsCallbackType = Callable[[List[ProcessorId]], Coroutine[Any, Any, None]]
+
+
+class LogicScheduler:
+    # Runs processors logics by their `check_interval` cron expressions from a
+    # single task. Processors with the same expression share one timer on the
+    # wheel, every due tick makes one batched call with all due processors
+    _on_due: ScheduledLogicsCallbackType
+    _wheel: HierarchicalTimerWheel[str]  # One second ticks, keyed by expression
+    _expressions: Dict[str, CronExpression]  # Compiled once per expression
+    _processors: Dict[str, Set[ProcessorId]]  # By expression
+    _expression_by_processor: Dict[ProcessorId, str]
+    _task: asyncio.Task | None = None
+    _ticks: int = 0
+    _fired: int = 0
+    _last_lateness: float = 0.0
+    _lateness_sum: float = 0.0
+    _max_lateness: float = 0.0
+
+    def __init__(
+        self, on_due: ScheduledLogicsCallbackType, now: int | None = None
+    ) -> None:
+        self._on_due = on_due
+        self._wheel = HierarchicalTimerWheel(int(time.time()) if now is None else now)
+        self._expressions = dict()
+        self._processors = dict()
+        self._expression_by_processor = dict()
+
+    def add_processor(self, processor_id: ProcessorId, check_interval: str) -> None:
+        if self._expression_by_processor.get(processor_id) == check_interval:
+            return
+
+        if check_interval not in self._expressions:
+            expression = CronExpression(check_interval)
+            self._expressions[check_interval] = expression
+            self._processors[check_interval] = set()
+            self._wheel.schedule(check_interval, expression.get_next(self._wheel.now))
+
+        self.remove_processor(processor_id)
+        self._processors[check_interval].add(processor_id)
+        self._expression_by_processor[processor_id] = check_interval
+
+    def remove_processor(self, processor_id: ProcessorId) -> None:
+        check_interval = self._expression_by_processor.pop(processor_id, None)
+        if check_interval is None:
+            return
+
+        processors = self._processors[check_interval]
+        processors.discard(processor_id)
+        if not processors:
+            del self._processors[check_interval]
+            del self._expressions[check_interval]
+            self._wheel.cancel(check_interval)
+
+    # Processes every tick up to `now`, returns processors due at them
+    def advance(self, now: int) -> List[ProcessorId]:
+        processor_ids: List[ProcessorId] = list()
+        while self._wheel.now < now:
+            tick = self._wheel.now + 1
+            for check_interval in self._wheel.tick():
+                processor_ids.extend(self._processors[check_interval])
+                self._wheel.schedule(
+                    check_interval, self._expressions[check_interval].get_next(tick)
+                )
+
+        return processor_ids
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, self._wheel.now + 1 - time.time()))
+            now = time.time()
+            # Late from the first tick being processed
+            lateness = now - (self._wheel.now + 1)
+            processor_ids = self.advance(int(now))
+
+            self._ticks += 1
+            self._last_lateness = lateness
+            self._lateness_sum += lateness
+            self._max_lateness = max(self._max_lateness, lateness)
+            if lateness >= 1:
+                logger.warning(f"Logic scheduler is {lateness:.3f}s late")
+            if not processor_ids:
+                continue
+
+            self._fired += len(processor_ids)
+            try:
+                await self._on_due(processor_ids)
+            except Exception as e:
+                logger.exception(f"Failed to run scheduled logics {e}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            # Ticks missed before start are skipped, not fired at once
+            self.advance(int(time.time()))
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self) -> SchedulerStats:
+        return SchedulerStats(
+            ticks=self._ticks,
+            fired=self._fired,
+            scheduled_processors=len(self._expression_by_processor),
+            expressions=len(self._expressions),
+            last_lateness=self._last_lateness,
+            avg_lateness=self._lateness_sum / self._ticks if self._ticks else 0.0,
+            max_lateness=self._max_lateness,
+        )
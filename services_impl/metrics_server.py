@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Type
+
+from aiohttp import web
+from loguru import logger
+
+from ..config import config
+from ..utils.pipeline_metrics import PipelineMetrics, PipelineStage
+
+
+class MetricsServer:
+    # Serves pipeline metrics in Prometheus text format on `/metrics` and
+    # measures event loop lag, time a ready task waits before it runs
+    _metrics: PipelineMetrics
+    _host: str
+    _port: int
+    _loop_probe_interval: float
+    _runner: web.AppRunner | None = None
+    _probe_task: asyncio.Task | None = None
+
+    def __init__(
+        self,
+        metrics: PipelineMetrics,
+        host: str = config.METRICS_HOST,
+        port: int = config.METRICS_PORT,
+        loop_probe_interval: float = 0.1,
+    ) -> None:
+        self._metrics = metrics
+        self._host = host
+        self._port = port
+        self._loop_probe_interval = loop_probe_interval
+
+    @classmethod
+    async def create(
+        cls: Type[MetricsServer],
+        metrics: PipelineMetrics,
+        host: str = config.METRICS_HOST,
+        port: int = config.METRICS_PORT,
+        loop_probe_interval: float = 0.1,
+    ) -> MetricsServer:
+        this = cls(metrics, host, port, loop_probe_interval)
+        await this.start()
+
+        return this
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._host}:{self._port}/metrics"
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self._metrics.to_prometheus(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def _run_loop_probe(self) -> None:
+        while True:
+            expected_at = time.perf_counter_ns() + int(self._loop_probe_interval * 1e9)
+            await asyncio.sleep(self._loop_probe_interval)
+            self._metrics.record(
+                PipelineStage.LOOP_LAG, time.perf_counter_ns() - expected_at
+            )
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        if not self._port:
+            # Port picked by the OS, addresses are socket names of the sites
+            self._port = self._runner.addresses[0][1]
+        self._probe_task = asyncio.create_task(self._run_loop_probe())
+        logger.info(f"Serving metrics on {self.url}")
+
+    async def stop(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -1,24 +1,51 @@
-import asyncio
-from collections import defaultdict
-from typing import Callable, Coroutine, DefaultDict, Dict, List, Set
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Set
 
 from loguru import logger
 
-from ..model.processor_models import KLineData, KLineInterval, ProcessorConfig
-from ..services.processor import LogicType, Processor, ProcessorId
+from ..model.processor_models import (
+    HighRiseType,
+    KLineData,
+    KLineInterval,
+    ProcessorConfig,
+)
+from ..services.processor import (
+    LogicTriggerCallbackType,
+    LogicType,
+    Processor,
+    ProcessorId,
+)
+from ..utils.alert_deduplicator import AlertDeduplicator
+from ..utils.candle_ring_buffer import CandleRingBuffer, CandleWindow
+from ..utils.indicator_graph import Indicator, IndicatorGraph, IndicatorKind
+from ..utils.pipeline_metrics import PipelineMetrics, PipelineStage
+
+LogicFunctionType = Callable[[], Coroutine[Any, Any, bool]]
+LogicIndicatorsFunctionType = Callable[[], Set[Indicator]]
+CandleClosedCallbackType = Callable[[ProcessorId, KLineData], None]
 
 
 class ProcessorImpl(Processor):
     _id: ProcessorId
     _config: ProcessorConfig
-    _logics: DefaultDict[LogicType, Callable[[], Coroutine[None]]] = defaultdict(
-        lambda: None
-    )
-    _running_logics: Dict[LogicType, Callable[[], Coroutine[None]]] = dict()
-
-    _max_elements_in_data: int = None
-
-    _data: List[KLineData] = [None]
+    _logics: Dict[LogicType, LogicFunctionType]
+    # Indicators every logic reads, depend on the current config
+    _logic_indicators: Dict[LogicType, LogicIndicatorsFunctionType]
+    _running_logics: Dict[LogicType, LogicFunctionType]
+
+    _max_elements_in_data: int
+
+    _data: CandleRingBuffer  # Closed candles followed by the latest one
+    _last_data: KLineData | None = None
+    _indicators: IndicatorGraph  # Shared by running logics
+    _on_logic_triggered: LogicTriggerCallbackType | None
+    _evaluate_logics: bool  # False when logics are evaluated in batches outside
+    _on_candle_closed: CandleClosedCallbackType | None
+    _history_end: int | None = None  # Start time of the last preloaded candle
+    _metrics: PipelineMetrics | None  # Records logics duration if set
+    _deduplicator: AlertDeduplicator | None  # Suppresses repeated triggers
 
     def __init__(
         self,
@@ -26,26 +53,43 @@ class ProcessorImpl(Processor):
         interval: KLineInterval,
         logics_to_run: Set[LogicType] = None,
         config: ProcessorConfig = ProcessorConfig(),
+        on_logic_triggered: LogicTriggerCallbackType | None = None,
+        evaluate_logics: bool = True,
+        on_candle_closed: CandleClosedCallbackType | None = None,
+        metrics: PipelineMetrics | None = None,
+        deduplicator: AlertDeduplicator | None = None,
     ) -> None:
         self._id = ProcessorId(symbol, interval)
-        self._logics.update({LogicType.HIGH_VOLUME_RAISE: self._high_volume_raise})
+        self._metrics = metrics
+        self._deduplicator = deduplicator
+        self._on_logic_triggered = on_logic_triggered
+        self._evaluate_logics = evaluate_logics
+        self._on_candle_closed = on_candle_closed
+        self._logics = {LogicType.HIGH_VOLUME_RAISE: self._high_volume_raise}
+        self._logic_indicators = {
+            LogicType.HIGH_VOLUME_RAISE: self._get_high_volume_raise_indicators
+        }
+        self._running_logics = dict()
         self._config = config
         self._max_elements_in_data = max(
             self._config.high_rise_config.process_intervals
         )
+        self._data = CandleRingBuffer(self._max_elements_in_data)
 
-        for logic_type_to_run in set(logics_to_run):
-            if self._logics[logic_type_to_run]:
-                self._running_logics.add(self._logics[logic_type_to_run])
+        for logic_type_to_run in set(logics_to_run or ()):
+            if logic_type_to_run in self._logics:
+                self._running_logics[logic_type_to_run] = self._logics[
+                    logic_type_to_run
+                ]
+        self._rebuild_indicators()
 
     async def run_logic(self, logic_type: LogicType) -> bool:
-        if not self._logics[logic_type]:
+        if logic_type not in self._logics:
             return False
 
-        if self._running_logics[logic_type]:
-            return True
-
-        self._running_logics.add(self._logics[logic_type])
+        if logic_type not in self._running_logics:
+            self._running_logics[logic_type] = self._logics[logic_type]
+            self._rebuild_indicators()
 
         return True
 
@@ -54,22 +98,142 @@ class ProcessorImpl(Processor):
             return True
 
         del self._running_logics[logic_type]
+        self._rebuild_indicators()
 
         return True
 
-    async def _high_volume_raise(self) -> None:
-        logger.debug("Runnin High Volume Raise logic")
+    @staticmethod
+    def _is_price_moving(
+        check_type: HighRiseType, open_price: float, close_price: float
+    ) -> bool:
+        if check_type == HighRiseType.UP:
+            return close_price > open_price
+        if check_type == HighRiseType.DOWN:
+            return close_price < open_price
+        return close_price != open_price
+
+    def _get_high_volume_raise_indicators(self) -> Set[Indicator]:
+        indicators = {Indicator(IndicatorKind.LATEST, CandleRingBuffer.VOLUME)}
+        for length in self._config.high_rise_config.process_intervals:
+            indicators.add(
+                Indicator(IndicatorKind.COUNT, CandleRingBuffer.VOLUME, length)
+            )
+            indicators.add(
+                Indicator(
+                    IndicatorKind.MEAN_BEFORE_LATEST, CandleRingBuffer.VOLUME, length
+                )
+            )
+        return indicators
+
+    async def _high_volume_raise(self) -> bool:
+        high_rise_config = self._config.high_rise_config
+        data = self._last_data
+        if data is None or not self._is_price_moving(
+            high_rise_config.check_type, data.open_price, data.close_price
+        ):
+            return False
 
-    async def update_data(self, data: KLineData) -> None:
-        self._data[-1] = data
-        if data.is_kline_closed:
-            self._data.append(None)
+        # Latest volume against average of the rest of every window
+        indicators = self._indicators
+        volume = indicators.get(
+            Indicator(IndicatorKind.LATEST, CandleRingBuffer.VOLUME)
+        )
+        for length in sorted(high_rise_config.process_intervals):
+            if (
+                length < 2
+                or indicators.get(
+                    Indicator(IndicatorKind.COUNT, CandleRingBuffer.VOLUME, length)
+                )
+                < length
+            ):
+                return False
+            average = indicators.get(
+                Indicator(
+                    IndicatorKind.MEAN_BEFORE_LATEST, CandleRingBuffer.VOLUME, length
+                )
+            )
+            if volume < average * high_rise_config.volume_rise_ratio:
+                return False
+
+        await self._trigger(LogicType.HIGH_VOLUME_RAISE, data)
+
+        return True
+
+    async def _trigger(self, logic_type: LogicType, data: KLineData) -> None:
+        if self._deduplicator is not None and not self._deduplicator.should_fire(
+            self._id, logic_type, data.start_time
+        ):
+            return
+
+        logger.info(f"{logic_type.value} triggered for {self._id} at {data.start_time}")
+        if self._on_logic_triggered:
+            await self._on_logic_triggered(self._id, logic_type, data)
+
+    def _get_indicators(self) -> Set[Indicator]:
+        indicators: Set[Indicator] = set()
+        for logic_type in self._running_logics:
+            indicators.update(self._logic_indicators[logic_type]())
+        return indicators
+
+    # Graph of running logics indicators, filled from stored candles
+    def _rebuild_indicators(self) -> None:
+        self._indicators = IndicatorGraph(self._get_indicators())
+        self._indicators.load(self._data.get_window(), self._data.is_last_closed)
+
+    # Fills data with closed candles before live data is attached
+    def preload(self, window: CandleWindow) -> None:
+        self._data.load(window)
+        self._rebuild_indicators()
+        if len(window.start_times):
+            self._history_end = int(window.start_times[-1])
+
+    def _apply_data(self, data: KLineData) -> bool:
+        # Live frames overlapping preloaded history are already applied
+        if self._history_end is not None and data.start_time <= self._history_end:
+            return False
+        if not self._data.update(data):
+            return False
+
+        self._last_data = data
+        is_new = self._indicators.update(data)
+        if is_new and data.is_kline_closed and self._on_candle_closed:
+            self._on_candle_closed(self._id, data)
 
-        if len(self._data) + 1 > self._max_elements_in_data:
-            del self._data[0]
+        return True
+
+    async def _run_logics(self) -> None:
+        deduplicator = self._deduplicator
+        for logic_type, logic in list(self._running_logics.items()):
+            if not await logic() and deduplicator is not None:
+                deduplicator.reset(self._id, logic_type)
+
+    async def run_logics(self) -> None:
+        if self._metrics is None:
+            await self._run_logics()
+            return
 
-        for logic_type, logic in self._running_logics.items():
-            asyncio.create_task(logic())
+        started_at = time.perf_counter_ns()
+        await self._run_logics()
+        self._metrics.record(PipelineStage.LOGIC, time.perf_counter_ns() - started_at)
+
+    async def update_data(self, data: KLineData) -> None:
+        if self._apply_data(data) and self._evaluate_logics:
+            await self.run_logics()
+
+    async def update_data_batch(self, data: List[KLineData]) -> None:
+        # Logics see every closed candle and the latest state, open candle
+        # revisions in between are folded
+        is_evaluated = True
+        for item in data:
+            if not self._apply_data(item):
+                continue
+            is_evaluated = False
+            if item.is_kline_closed and self._evaluate_logics:
+                await self.run_logics()
+                is_evaluated = True
+
+        if not is_evaluated and self._evaluate_logics:
+            await self.run_logics()
 
     async def get_id(self) -> ProcessorId:
         return self._id
@@ -77,13 +241,15 @@ class ProcessorImpl(Processor):
     async def ger_running_logics(self) -> Set[LogicType]:
         return set(self._running_logics.keys())
 
-    @property.setter
     async def update_config(self, config: ProcessorConfig) -> None:
         self._config = config
         self._max_elements_in_data = max(
             self._config.high_rise_config.process_intervals
         )
+        if self._max_elements_in_data != self._data.capacity:
+            self._data.resize(self._max_elements_in_data)
+        if self._get_indicators() != self._indicators.indicators:
+            self._rebuild_indicators()
 
-    @property.getter
     async def get_config(self) -> ProcessorConfig:
         return self._config
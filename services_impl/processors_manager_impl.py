@@ -1,20 +1,90 @@
+from __future__ import annotations
+
 import asyncio
-from dataclasses import dataclass
-from typing import Dict, Set, Tuple
+import time
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Set, Tuple
+
+import numpy as np
+
+from loguru import logger
 
-from ..model.processor_models import KLineInterval, ProcessorConfig
-from ..services.processor import LogicType, Processor, ProcessorId
+from ..model.processor_models import KLineData, KLineInterval, ProcessorConfig
+from ..services.processor import (
+    LogicTriggerCallbackType,
+    LogicType,
+    Processor,
+    ProcessorId,
+)
 from ..services.processors_manager import ProcessorsManager
+from ..services_impl.k_lines_router import KLinesRouter
+from ..services_impl.logic_scheduler import LogicScheduler
 from ..services_impl.processor_impl import ProcessorImpl
+from ..utils.alert_deduplicator import AlertDeduplicator
+from ..utils.candle_ring_buffer import CandleWindow
+from ..utils.high_volume_raise_matrix import HighVolumeRaiseMatrix
+from ..utils.k_line_journal import KLineJournal
+from ..utils.pipeline_metrics import PipelineMetrics, PipelineStage
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
 
 
 class ProcessorsManagerImpl(ProcessorsManager):
     _processors: Dict[ProcessorId, Processor]
+    _processors_by_stream_id: Dict[int, Processor]  # Same ones, routes updates
+    _registry: StreamRegistry
+    _router: KLinesRouter | None  # Gets every added processor as a route
+    _on_logic_triggered: LogicTriggerCallbackType | None
+    # In batch mode HIGH_VOLUME_RAISE runs once per interval boundary for all
+    # processors of the interval instead of a task per processor and update
+    _batch_evaluation: bool
+    _batch_delay: float  # Seconds to collect closes of one interval boundary
+    _matrices: Dict[KLineInterval, HighVolumeRaiseMatrix]
+    _closed_since_evaluation: DefaultDict[KLineInterval, Set[ProcessorId]]
+    _evaluation_tasks: Dict[KLineInterval, asyncio.Task]
+    # Runs logics by `check_interval` instead of on every update, batch mode
+    # keeps evaluating on candle closes
+    _scheduler: LogicScheduler | None = None
+    _history: KLineJournal | None  # New processors are preloaded from it
+    _metrics: PipelineMetrics | None  # Passed to processors, records logics
+    _deduplicator: AlertDeduplicator | None  # Shared by all processors
+
+    def __init__(
+        self,
+        on_logic_triggered: LogicTriggerCallbackType | None = None,
+        batch_evaluation: bool = False,
+        batch_delay: float = 0.05,
+        router: KLinesRouter | None = None,
+        scheduled_evaluation: bool = False,
+        history: KLineJournal | None = None,
+        metrics: PipelineMetrics | None = None,
+        deduplicator: AlertDeduplicator | None = None,
+        registry: StreamRegistry = STREAM_REGISTRY,
+    ) -> None:
+        self._processors = dict()
+        self._processors_by_stream_id = dict()
+        self._registry = registry
+        self._metrics = metrics
+        self._deduplicator = deduplicator
+        self._history = history
+        self._router = router
+        self._on_logic_triggered = on_logic_triggered
+        self._batch_evaluation = batch_evaluation
+        self._batch_delay = batch_delay
+        self._matrices = dict()
+        self._closed_since_evaluation = defaultdict(set)
+        self._evaluation_tasks = dict()
+        if scheduled_evaluation and not batch_evaluation:
+            self._scheduler = LogicScheduler(self._run_scheduled_logics)
 
     async def add_processor(self, processor: Processor) -> None:
         id = await processor.get_id()
         if id not in self._processors:
             self._processors[id] = processor
+            self._processors_by_stream_id[
+                self._registry.get_stream_id(id.symbol, id.interval)
+            ] = processor
+            if self._router is not None:
+                self._router.add_processor(id, processor)
 
     async def create_processor(
         self,
@@ -23,24 +93,240 @@ class ProcessorsManagerImpl(ProcessorsManager):
         logics_to_run: Set[LogicType] = None,
         config: ProcessorConfig = ProcessorConfig(),
     ) -> None:
-        processor = ProcessorImpl(symbol, interval, logics_to_run, config)
+        await self.create_processors([symbol], interval, logics_to_run, config)
+
+    # History of all new processors is read at once
+    async def create_processors(
+        self,
+        symbols: List[str],
+        interval: KLineInterval,
+        logics_to_run: Set[LogicType] = None,
+        config: ProcessorConfig = ProcessorConfig(),
+    ) -> None:
+        symbols = [
+            symbol
+            for symbol in dict.fromkeys(symbols)
+            if ProcessorId(symbol, interval) not in self._processors
+        ]
+        history: Dict[Tuple[str, KLineInterval], np.ndarray] = dict()
+        if self._history is not None and symbols:
+            history = await asyncio.get_running_loop().run_in_executor(
+                None,
+                self._history.read_last_closed,
+                [(symbol, interval) for symbol in symbols],
+                max(config.high_rise_config.process_intervals),
+            )
 
+        for symbol in symbols:
+            await self._create_processor(
+                symbol, interval, logics_to_run, config, history.get((symbol, interval))
+            )
+
+    async def _create_processor(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        logics_to_run: Set[LogicType] | None,
+        config: ProcessorConfig,
+        history: np.ndarray | None,
+    ) -> None:
+        if not self._batch_evaluation:
+            processor = ProcessorImpl(
+                symbol,
+                interval,
+                logics_to_run,
+                config,
+                on_logic_triggered=self._on_logic_triggered,
+                evaluate_logics=self._scheduler is None,
+                metrics=self._metrics,
+                deduplicator=self._deduplicator,
+            )
+            processor_id = await processor.get_id()
+            if processor_id in self._processors:
+                return
+
+            self._preload(processor, history)
+            await self.add_processor(processor)
+            if self._scheduler is not None:
+                self._scheduler.add_processor(
+                    processor_id, config.high_rise_config.check_interval
+                )
+                await self._scheduler.start()
+            return
+
+        processor = ProcessorImpl(
+            symbol,
+            interval,
+            logics_to_run,
+            config,
+            on_logic_triggered=self._on_logic_triggered,
+            evaluate_logics=False,
+            on_candle_closed=self._on_candle_closed,
+            metrics=self._metrics,
+            deduplicator=self._deduplicator,
+        )
+        processor_id = await processor.get_id()
+        if processor_id in self._processors:
+            return
+
+        matrix = self._matrices.setdefault(interval, HighVolumeRaiseMatrix())
+        matrix.add(processor_id, config)
+        matrix.set_enabled(
+            processor_id, LogicType.HIGH_VOLUME_RAISE in (logics_to_run or ())
+        )
+        if self._preload(processor, history):
+            matrix.load_closed(processor_id, history["base_volume_asset"])
         await self.add_processor(processor)
 
+    @staticmethod
+    def _preload(processor: ProcessorImpl, history: np.ndarray | None) -> bool:
+        if history is None or not len(history):
+            return False
+
+        processor.preload(
+            CandleWindow(
+                history["open_price"],
+                history["high_price"],
+                history["low_price"],
+                history["close_price"],
+                history["base_volume_asset"],
+                history["start_time"],
+            )
+        )
+        return True
+
+    def _set_batch_logic_enabled(
+        self, logic_type: LogicType, processor_id: ProcessorId, is_enabled: bool
+    ) -> None:
+        if logic_type != LogicType.HIGH_VOLUME_RAISE:
+            return
+
+        matrix = self._matrices.get(processor_id.interval)
+        if matrix is not None and processor_id in matrix:
+            matrix.set_enabled(processor_id, is_enabled)
+
     async def add_logic(self, logic_type: LogicType, processor_id: ProcessorId) -> None:
         if processor_id:
             await self._processors[processor_id].run_logic(logic_type)
+            self._set_batch_logic_enabled(logic_type, processor_id, True)
             return
 
         for id, processor in self._processors.items():
             await asyncio.create_task(processor.run_logic(logic_type))
+            self._set_batch_logic_enabled(logic_type, id, True)
 
     async def remove_logic(
         self, logic_type: LogicType, processor_id: ProcessorId
     ) -> None:
         if processor_id:
             await self._processors[processor_id].stop_logic(logic_type)
+            self._set_batch_logic_enabled(logic_type, processor_id, False)
             return
 
         for id, processor in self._processors.items():
             await asyncio.create_task(processor.stop_logic(logic_type))
+            self._set_batch_logic_enabled(logic_type, id, False)
+
+    async def update_config(
+        self, config: ProcessorConfig, processor_id: ProcessorId
+    ) -> None:
+        processor_ids = [processor_id] if processor_id else list(self._processors)
+        for id in processor_ids:
+            await self._processors[id].update_config(config)
+            matrix = self._matrices.get(id.interval)
+            if matrix is not None and id in matrix:
+                matrix.set_config(id, config)
+            if self._scheduler is not None:
+                self._scheduler.add_processor(
+                    id, config.high_rise_config.check_interval
+                )
+
+    async def update_data(self, data: KLineData) -> None:
+        if self._router is not None:
+            await self._router.route(data)
+            return
+
+        processor = self._processors_by_stream_id.get(self._registry.resolve(data))
+        if processor is not None:
+            await processor.update_data(data)
+
+    async def update_data_batch(self, data: List[KLineData]) -> None:
+        if self._router is not None:
+            for item in data:
+                await self._router.route(item)
+            return
+
+        batches: DefaultDict[int, List[KLineData]] = defaultdict(list)
+        for item in data:
+            batches[self._registry.resolve(item)].append(item)
+        for stream_id, batch in batches.items():
+            processor = self._processors_by_stream_id.get(stream_id)
+            if processor is not None:
+                await processor.update_data_batch(batch)
+
+    async def _run_scheduled_logics(self, processor_ids: List[ProcessorId]) -> None:
+        for processor_id in processor_ids:
+            processor = self._processors.get(processor_id)
+            if processor is not None:
+                await processor.run_logics()
+
+    async def stop(self) -> None:
+        if self._scheduler is not None:
+            await self._scheduler.stop()
+        for task in self._evaluation_tasks.values():
+            task.cancel()
+        self._evaluation_tasks.clear()
+
+    def _on_candle_closed(self, processor_id: ProcessorId, data: KLineData) -> None:
+        interval = processor_id.interval
+        matrix = self._matrices.get(interval)
+        if matrix is None or processor_id not in matrix:
+            return
+
+        matrix.update_closed(processor_id, data)
+        self._closed_since_evaluation[interval].add(processor_id)
+        if interval not in self._evaluation_tasks:
+            self._evaluation_tasks[interval] = asyncio.create_task(
+                self._evaluate_interval_later(interval)
+            )
+
+    async def _evaluate_interval_later(self, interval: KLineInterval) -> None:
+        await asyncio.sleep(self._batch_delay)
+        # Closes that come while triggers are published go to the next batch
+        del self._evaluation_tasks[interval]
+        await self.evaluate_interval(interval)
+
+    async def evaluate_interval(self, interval: KLineInterval) -> Set[ProcessorId]:
+        processor_ids = self._closed_since_evaluation.pop(interval, set())
+        matrix = self._matrices.get(interval)
+        if matrix is None or not processor_ids:
+            return set()
+
+        started_at = time.perf_counter_ns()
+        triggered = matrix.evaluate(processor_ids)
+        if self._metrics is not None:
+            self._metrics.record(
+                PipelineStage.LOGIC, time.perf_counter_ns() - started_at
+            )
+        logger.debug(
+            f"Evaluated {len(processor_ids)} {interval.value} processors, "
+            f"{len(triggered)} triggered"
+        )
+        if self._deduplicator is not None:
+            for processor_id in processor_ids.difference(triggered):
+                self._deduplicator.reset(processor_id, LogicType.HIGH_VOLUME_RAISE)
+        for processor_id in triggered:
+            data = matrix.get_last_data(processor_id)
+            if self._deduplicator is not None and not self._deduplicator.should_fire(
+                processor_id, LogicType.HIGH_VOLUME_RAISE, data.start_time
+            ):
+                continue
+            logger.info(
+                f"High Volume Raise triggered for {processor_id} at {data.start_time}"
+            )
+            if self._on_logic_triggered:
+                await self._on_logic_triggered(
+                    processor_id, LogicType.HIGH_VOLUME_RAISE, data
+                )
+
+        return set(triggered)
@@ -0,0 +1,454 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import zlib
+from collections import defaultdict, deque
+from enum import Enum
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from typing import Any, DefaultDict, Deque, Dict, Final, List, Set, Tuple, Type
+
+from loguru import logger
+
+from ..config import config
+from ..model.processor_models import (
+    KLineData,
+    KLineInterval,
+    OverflowPolicy,
+    ProcessorConfig,
+)
+from ..services.processor import (
+    LogicTriggerCallbackType,
+    LogicType,
+    Processor,
+    ProcessorId,
+)
+from ..services.processors_manager import ProcessorsManager
+from ..services_impl.processors_manager_impl import ProcessorsManagerImpl
+
+# start_time, symbol, interval, open, close, high, low, volume, is_closed,
+# event_time
+KLineTupleType = Tuple[int, str, str, float, float, float, float, float, bool, int]
+
+
+class _ShardCommand(Enum):
+    CREATE_PROCESSOR: Final[int] = 0
+    ADD_LOGIC: Final[int] = 1
+    REMOVE_LOGIC: Final[int] = 2
+    UPDATE_CONFIG: Final[int] = 3
+    K_LINES: Final[int] = 4
+    STOP: Final[int] = 5
+    CREATE_PROCESSORS: Final[int] = 6
+
+
+# Processors state of a shard, sent again to its restarted worker
+_REPLAYED_COMMANDS: Final[Set[_ShardCommand]] = {
+    _ShardCommand.CREATE_PROCESSOR,
+    _ShardCommand.CREATE_PROCESSORS,
+    _ShardCommand.ADD_LOGIC,
+    _ShardCommand.REMOVE_LOGIC,
+    _ShardCommand.UPDATE_CONFIG,
+}
+
+
+def _to_tuple(data: KLineData) -> KLineTupleType:
+    return (
+        data.start_time,
+        data.symbol,
+        data.interval.value,
+        data.open_price,
+        data.close_price,
+        data.high_price,
+        data.low_price,
+        data.base_volume_asset,
+        data.is_kline_closed,
+        data.event_time,
+    )
+
+
+def _from_tuple(item: KLineTupleType) -> KLineData:
+    return KLineData(
+        item[0],
+        item[1],
+        KLineInterval(item[2]),
+        item[3],
+        item[4],
+        item[5],
+        item[6],
+        item[7],
+        item[8],
+        item[9],
+    )
+
+
+async def _serve_shard(
+    shard: int, commands: Queue, results: Queue, manager_kwargs: Dict[str, Any]
+) -> None:
+    async def on_logic_triggered(
+        processor_id: ProcessorId, logic_type: LogicType, data: KLineData
+    ) -> None:
+        results.put((processor_id, logic_type, _to_tuple(data)))
+
+    manager = ProcessorsManagerImpl(on_logic_triggered, **manager_kwargs)
+    loop = asyncio.get_running_loop()
+    while True:
+        command, args = await loop.run_in_executor(None, commands.get)
+        try:
+            if command == _ShardCommand.K_LINES:
+                try:
+                    await manager.update_data_batch(
+                        [_from_tuple(item) for item in args]
+                    )
+                finally:
+                    # Acknowledged batch lets the next one of the shard in
+                    results.put(shard)
+            elif command == _ShardCommand.CREATE_PROCESSOR:
+                await manager.create_processor(*args)
+            elif command == _ShardCommand.CREATE_PROCESSORS:
+                await manager.create_processors(*args)
+            elif command == _ShardCommand.ADD_LOGIC:
+                await manager.add_logic(*args)
+            elif command == _ShardCommand.REMOVE_LOGIC:
+                await manager.remove_logic(*args)
+            elif command == _ShardCommand.UPDATE_CONFIG:
+                await manager.update_config(*args)
+            elif command == _ShardCommand.STOP:
+                break
+        except Exception as e:
+            logger.exception(f"Shard {os.getpid()} failed to run {command} {e}")
+
+    await manager.stop()
+
+
+def _run_shard(
+    shard: int, commands: Queue, results: Queue, manager_kwargs: Dict[str, Any]
+) -> None:
+    asyncio.run(_serve_shard(shard, commands, results, manager_kwargs))
+
+
+class ProcessorsManagerPoolImpl(ProcessorsManager):
+    # Processors live in worker processes, each running ProcessorsManagerImpl
+    # for the symbols hashed to it. K-lines are forwarded as tuple batches,
+    # triggers and acknowledgements of processed batches come back through
+    # one results queue. At most `max_pending_batches` batches of a shard are
+    # unprocessed, later k-lines wait in a buffer of `max_buffered` where
+    # `overflow_policy` applies, so slow workers do not grow memory.
+    # Workers that exit are restarted and get processor commands of their
+    # shard again, candles they had are lost unless managers preload history
+    _on_logic_triggered: LogicTriggerCallbackType | None
+    _context: BaseContext  # Workers are spawned from it
+    _manager_kwargs: Dict[str, Any]
+    _commands: List[Queue]  # By shard
+    _results: Queue
+    _workers: List[BaseProcess]
+    _buffers: List[Deque[KLineTupleType]]  # K-lines not sent yet, by shard
+    _batch_size: int
+    _max_pending_batches: int
+    _max_buffered: int
+    _overflow_policy: OverflowPolicy
+    _pending_batches: List[int]  # Sent and not acknowledged, by shard
+    _not_full: List[asyncio.Event]  # Buffer of the shard has room, BLOCK policy
+    _replayed: List[List[Tuple[_ShardCommand, tuple]]]  # Sent to new workers
+    _monitor_interval: float
+    _dropped: int = 0
+    _restarts: int = 0
+    _is_stopping: bool = False
+    _is_flush_scheduled: bool = False
+    _results_task: asyncio.Task | None = None
+    _monitor_task: asyncio.Task | None = None
+
+    def __init__(
+        self,
+        on_logic_triggered: LogicTriggerCallbackType | None,
+        workers_count: int,
+        manager_kwargs: Dict[str, Any],
+        batch_size: int = 256,
+        max_pending_batches: int = 4,
+        max_buffered: int = 4096,
+        overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        monitor_interval: float = 1.0,
+    ) -> None:
+        if workers_count <= 0 or max_pending_batches <= 0 or max_buffered <= 0:
+            raise ValueError(
+                "workers_count, max_pending_batches and max_buffered must be "
+                f"positive, got {workers_count}, {max_pending_batches} and "
+                f"{max_buffered}"
+            )
+
+        self._on_logic_triggered = on_logic_triggered
+        # Spawned workers do not inherit running event loop and sockets
+        self._context = multiprocessing.get_context("spawn")
+        self._manager_kwargs = manager_kwargs
+        self._results = self._context.Queue()
+        self._commands = [None] * workers_count
+        self._workers = [None] * workers_count
+        self._buffers = [deque() for _ in range(workers_count)]
+        self._batch_size = batch_size
+        self._max_pending_batches = max_pending_batches
+        self._max_buffered = max_buffered
+        self._overflow_policy = overflow_policy
+        self._pending_batches = [0] * workers_count
+        self._not_full = [asyncio.Event() for _ in range(workers_count)]
+        self._replayed = [list() for _ in range(workers_count)]
+        self._monitor_interval = monitor_interval
+
+    @classmethod
+    async def create(
+        cls: Type[ProcessorsManagerPoolImpl],
+        on_logic_triggered: LogicTriggerCallbackType | None = None,
+        workers_count: int | None = None,
+        batch_size: int = 256,
+        max_pending_batches: int = 4,
+        max_buffered: int = 4096,
+        overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        monitor_interval: float = 1.0,
+        **manager_kwargs: Any,
+    ) -> ProcessorsManagerPoolImpl:
+        this = cls(
+            on_logic_triggered,
+            workers_count or os.cpu_count() or 1,
+            manager_kwargs,
+            batch_size,
+            max_pending_batches,
+            max_buffered,
+            overflow_policy,
+            monitor_interval,
+        )
+        for shard in range(len(this._workers)):
+            this._start_worker(shard)
+        this._results_task = asyncio.create_task(this._receive_results())
+        this._monitor_task = asyncio.create_task(this._monitor_workers())
+
+        return this
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def restarts(self) -> int:
+        return self._restarts
+
+    def _start_worker(self, shard: int) -> None:
+        # Queue of a dead worker may be left locked, the new one gets its own
+        commands = self._context.Queue()
+        worker = self._context.Process(
+            target=_run_shard,
+            args=(shard, commands, self._results, self._manager_kwargs),
+            daemon=True,
+        )
+        worker.start()
+        self._commands[shard] = commands
+        self._workers[shard] = worker
+        self._pending_batches[shard] = 0
+        self._not_full[shard].set()
+        for command, args in self._replayed[shard]:
+            commands.put((command, args))
+
+    async def _monitor_workers(self) -> None:
+        while True:
+            await asyncio.sleep(self._monitor_interval)
+            for shard, worker in enumerate(self._workers):
+                if worker.is_alive() or self._is_stopping:
+                    continue
+
+                logger.error(
+                    f"Worker of shard {shard} exited with code {worker.exitcode}, "
+                    "restarting it"
+                )
+                self._commands[shard].cancel_join_thread()
+                self._commands[shard].close()
+                self._start_worker(shard)
+                self._restarts += 1
+                self._flush_shard(shard)
+
+    def _get_shard(self, symbol: str) -> int:
+        return zlib.crc32(symbol.encode()) % len(self._workers)
+
+    def _send(self, shard: int, command: _ShardCommand, *args: Any) -> None:
+        # Pending k-lines go first to keep order with the command
+        self._flush_shard(shard, force=True)
+        self._commands[shard].put((command, args))
+        if command in _REPLAYED_COMMANDS:
+            self._replayed[shard].append((command, args))
+
+    def _send_to_processors(
+        self, command: _ShardCommand, processor_id: ProcessorId, *args: Any
+    ) -> None:
+        if processor_id:
+            self._send(self._get_shard(processor_id.symbol), command, *args)
+            return
+
+        for shard in range(len(self._workers)):
+            self._send(shard, command, *args)
+
+    async def add_processor(self, processor: Processor) -> None:
+        # Processor objects stay in this process, shard creates its own copy
+        processor_id = await processor.get_id()
+        await self.create_processor(
+            processor_id.symbol,
+            processor_id.interval,
+            await processor.ger_running_logics(),
+            await processor.get_config(),
+        )
+
+    async def create_processor(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        logics_to_run: Set[LogicType] = None,
+        config: ProcessorConfig = ProcessorConfig(),
+    ) -> None:
+        self._send(
+            self._get_shard(symbol),
+            _ShardCommand.CREATE_PROCESSOR,
+            symbol,
+            interval,
+            logics_to_run,
+            config,
+        )
+
+    # One command per shard, so shards preload history of all their symbols
+    # at once
+    async def create_processors(
+        self,
+        symbols: List[str],
+        interval: KLineInterval,
+        logics_to_run: Set[LogicType] = None,
+        config: ProcessorConfig = ProcessorConfig(),
+    ) -> None:
+        symbols_by_shard: DefaultDict[int, List[str]] = defaultdict(list)
+        for symbol in symbols:
+            symbols_by_shard[self._get_shard(symbol)].append(symbol)
+        for shard, shard_symbols in symbols_by_shard.items():
+            self._send(
+                shard,
+                _ShardCommand.CREATE_PROCESSORS,
+                shard_symbols,
+                interval,
+                logics_to_run,
+                config,
+            )
+
+    async def add_logic(self, logic_type: LogicType, processor_id: ProcessorId) -> None:
+        self._send_to_processors(
+            _ShardCommand.ADD_LOGIC, processor_id, logic_type, processor_id
+        )
+
+    async def remove_logic(
+        self, logic_type: LogicType, processor_id: ProcessorId
+    ) -> None:
+        self._send_to_processors(
+            _ShardCommand.REMOVE_LOGIC, processor_id, logic_type, processor_id
+        )
+
+    async def update_config(
+        self, config: ProcessorConfig, processor_id: ProcessorId
+    ) -> None:
+        self._send_to_processors(
+            _ShardCommand.UPDATE_CONFIG, processor_id, config, processor_id
+        )
+
+    async def _buffer(self, shard: int, item: KLineTupleType) -> None:
+        if len(self._buffers[shard]) >= self._max_buffered:
+            if self._overflow_policy == OverflowPolicy.DROP_NEWEST:
+                self._dropped += 1
+                return
+            if self._overflow_policy == OverflowPolicy.DROP_OLDEST:
+                self._buffers[shard].popleft()
+                self._dropped += 1
+            else:
+                while len(self._buffers[shard]) >= self._max_buffered:
+                    self._not_full[shard].clear()
+                    await self._not_full[shard].wait()
+        self._buffers[shard].append(item)
+
+    async def update_data(self, data: KLineData) -> None:
+        shard = self._get_shard(data.symbol)
+        await self._buffer(shard, _to_tuple(data))
+        if len(self._buffers[shard]) >= self._batch_size:
+            self._flush_shard(shard)
+        elif not self._is_flush_scheduled:
+            # Updates that come in the same loop iteration go in one batch
+            self._is_flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    async def update_data_batch(self, data: List[KLineData]) -> None:
+        for item in data:
+            await self._buffer(self._get_shard(item.symbol), _to_tuple(item))
+        self._flush()
+
+    # Buffer waits for acknowledgements of the shard unless forced
+    def _flush_shard(self, shard: int, force: bool = False) -> None:
+        buffer = self._buffers[shard]
+        if not buffer or (
+            not force and self._pending_batches[shard] >= self._max_pending_batches
+        ):
+            return
+
+        self._buffers[shard] = deque()
+        self._pending_batches[shard] += 1
+        self._commands[shard].put((_ShardCommand.K_LINES, list(buffer)))
+        self._not_full[shard].set()
+
+    def _flush(self) -> None:
+        self._is_flush_scheduled = False
+        for shard in range(len(self._workers)):
+            self._flush_shard(shard)
+
+    def _on_batch_done(self, shard: int) -> None:
+        # Acknowledgements sent by a worker before a restart are not counted
+        self._pending_batches[shard] = max(0, self._pending_batches[shard] - 1)
+        self._flush_shard(shard)
+
+    async def _receive_results(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            result = await loop.run_in_executor(None, self._results.get)
+            if result is None:
+                return
+            if isinstance(result, int):
+                self._on_batch_done(result)
+                continue
+
+            processor_id, logic_type, item = result
+            if self._on_logic_triggered:
+                try:
+                    await self._on_logic_triggered(
+                        processor_id, logic_type, _from_tuple(item)
+                    )
+                except Exception as e:
+                    logger.exception(f"Failed to publish {logic_type} trigger {e}")
+
+    async def stop(self) -> None:
+        self._is_stopping = True
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        for shard in range(len(self._workers)):
+            self._send(shard, _ShardCommand.STOP)
+
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            await loop.run_in_executor(None, worker.join)
+        self._results.put(None)
+        if self._results_task is not None:
+            await self._results_task
+            self._results_task = None
+
+
+# Processors run in the event loop process if `workers_count` is 0, in a pool
+# of worker processes otherwise
+async def create_processors_manager(
+    on_logic_triggered: LogicTriggerCallbackType | None = None,
+    workers_count: int = config.PROCESSORS_WORKERS,
+    **manager_kwargs: Any,
+) -> ProcessorsManager:
+    if workers_count <= 0:
+        return ProcessorsManagerImpl(on_logic_triggered, **manager_kwargs)
+    return await ProcessorsManagerPoolImpl.create(
+        on_logic_triggered, workers_count, **manager_kwargs
+    )
@@ -1,18 +1,50 @@
-from typing import Set
+from __future__ import annotations
+
+from typing import Any, Callable, Coroutine
 
 from aiogram import Bot, Dispatcher, filters, types
 
+from ..model.processor_models import KLineData
+from ..services.processor import LogicType, ProcessorId
+from ..services_impl.telegram_outbox import TelegramOutbox
+
 
 class TelegramClient:
     _bot: Bot
-    _dp: Dispatcher
-    _user_id = _user_id
+    _user_id: int
+    _outbox: TelegramOutbox  # Alerts never wait for Telegram limits
 
-    def __init__(self, bot: Bot, user_id: int) -> None:
+    def __init__(
+        self, bot: Bot, user_id: int, outbox: TelegramOutbox | None = None
+    ) -> None:
         self._bot = bot
-        self._dp = Dispatcher(bot)
         self._user_id = user_id
-        self._dp.filters_factory.bind(filters.IDFilter(self._user_id))
-        self._dp.register_message_handler()
+        self._outbox = outbox or TelegramOutbox(bot)
+
+    @property
+    def outbox(self) -> TelegramOutbox:
+        return self._outbox
+
+    # Handler gets messages of the configured user only
+    def register_message_handler(
+        self,
+        dp: Dispatcher,
+        handler: Callable[[types.Message], Coroutine[Any, Any, Any]],
+        **kwargs: Any,
+    ) -> None:
+        dp.register_message_handler(
+            handler, filters.IDFilter(user_id=self._user_id), **kwargs
+        )
+
+    # Pass as processors `on_logic_triggered`
+    async def send_logic_triggered(
+        self, processor_id: ProcessorId, logic_type: LogicType, data: KLineData
+    ) -> None:
+        await self._outbox.send(
+            self._user_id,
+            f"{logic_type.value} {processor_id.symbol} {processor_id.interval.value} "
+            f"close {data.close_price} volume {data.base_volume_asset}",
+        )
 
-    # async def
+    async def stop(self) -> None:
+        await self._outbox.stop()
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Final, List
+
+import aiohttp
+from aiogram import Bot
+from aiogram.utils.exceptions import NetworkError, RetryAfter, TelegramAPIError
+from loguru import logger
+
+from ..model.telegram_models import OutboxStats
+from ..utils.latency_histogram import LatencyHistogram
+from ..utils.token_bucket import TokenBucket
+
+ChatIdType = int | str
+
+
+@dataclass(slots=True, eq=False)
+class _Alert:
+    text: str
+    enqueued_at: float  # Monotonic seconds
+
+
+@dataclass(slots=True, eq=False)
+class _Chat:
+    bucket: TokenBucket
+    pending: Deque[_Alert] = field(default_factory=deque)
+    task: asyncio.Task | None = None  # Sends while alerts are pending
+
+
+class TelegramOutbox:
+    # Queue of alerts in front of `Bot.send_message`. Sends are limited per
+    # chat and globally by token buckets. Alerts that piled up while a chat
+    # waited for its turn go out as one digest message, so a burst over
+    # hundreds of symbols costs a few messages per chat instead of a backlog.
+    # Flood control replies are retried after the `retry_after` they carry
+    MAX_MESSAGE_LENGTH: Final[int] = 4096
+
+    _bot: Bot
+    _chat_rate: float  # Messages per second to a single chat
+    _chat_burst: float
+    _global_bucket: TokenBucket
+    _max_retries: int  # For network errors, flood control is always retried
+    _retry_delay: float
+    _chats: Dict[ChatIdType, _Chat]
+    _is_idle: asyncio.Event  # Nothing pending and nothing being sent
+    _lag: LatencyHistogram  # Nanoseconds from queuing to delivery
+    _queued: int = 0
+    _pending: int = 0
+    _sent_messages: int = 0
+    _sent_alerts: int = 0
+    _digests: int = 0
+    _retries: int = 0
+    _failed: int = 0
+
+    def __init__(
+        self,
+        bot: Bot,
+        chat_rate: float = 1,
+        chat_burst: float = 1,
+        global_rate: float = 30,
+        max_retries: int = 3,
+        retry_delay: float = 1,
+    ) -> None:
+        self._bot = bot
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._global_bucket = TokenBucket(global_rate)
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._chats = dict()
+        self._is_idle = asyncio.Event()
+        self._is_idle.set()
+        self._lag = LatencyHistogram()
+
+    # Never waits, delivery happens in background
+    async def send(self, chat_id: ChatIdType, text: str) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat(
+                TokenBucket(self._chat_rate, self._chat_burst)
+            )
+        chat.pending.append(_Alert(text, time.monotonic()))
+        self._queued += 1
+        self._pending += 1
+        if chat.task is None:
+            self._is_idle.clear()
+            chat.task = asyncio.create_task(self._run_chat(chat_id, chat))
+
+    def _take_batch(self, chat: _Chat) -> List[_Alert]:
+        # Oldest alerts that fit one message
+        header_length = len(self._get_digest_header(len(chat.pending)))
+        batch = [chat.pending.popleft()]
+        length = len(batch[0].text) + header_length
+        while chat.pending:
+            length += len(chat.pending[0].text) + 1
+            if length > self.MAX_MESSAGE_LENGTH:
+                break
+            batch.append(chat.pending.popleft())
+        return batch
+
+    @staticmethod
+    def _get_digest_header(count: int) -> str:
+        return f"{count} alerts\n"
+
+    def _format(self, batch: List[_Alert]) -> str:
+        if len(batch) == 1:
+            text = batch[0].text
+        else:
+            text = self._get_digest_header(len(batch)) + "\n".join(
+                alert.text for alert in batch
+            )
+        return text[: self.MAX_MESSAGE_LENGTH]
+
+    async def _run_chat(self, chat_id: ChatIdType, chat: _Chat) -> None:
+        network_errors = 0
+        try:
+            while chat.pending:
+                await chat.bucket.acquire()
+                await self._global_bucket.acquire()
+                # Taken after the wait, alerts queued meanwhile join the digest
+                batch = self._take_batch(chat)
+                try:
+                    await self._bot.send_message(chat_id, self._format(batch))
+                except RetryAfter as e:
+                    logger.warning(f"Flood control for chat {chat_id}, {e}")
+                    self._retries += 1
+                    chat.pending.extendleft(reversed(batch))
+                    await asyncio.sleep(e.timeout)
+                    continue
+                except (NetworkError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    network_errors += 1
+                    if network_errors <= self._max_retries:
+                        logger.warning(f"Failed to send to chat {chat_id}, retry {e}")
+                        self._retries += 1
+                        chat.pending.extendleft(reversed(batch))
+                        await asyncio.sleep(self._retry_delay * network_errors)
+                        continue
+                    logger.error(f"Dropped {len(batch)} alerts for chat {chat_id} {e}")
+                    self._failed += len(batch)
+                    self._pending -= len(batch)
+                    network_errors = 0
+                    continue
+                except TelegramAPIError as e:
+                    logger.error(f"Dropped {len(batch)} alerts for chat {chat_id} {e}")
+                    self._failed += len(batch)
+                    self._pending -= len(batch)
+                    continue
+
+                network_errors = 0
+                sent_at = time.monotonic()
+                for alert in batch:
+                    self._lag.record(int((sent_at - alert.enqueued_at) * 1e9))
+                self._pending -= len(batch)
+                self._sent_messages += 1
+                self._sent_alerts += len(batch)
+                if len(batch) > 1:
+                    self._digests += 1
+        finally:
+            chat.task = None
+            if all(other.task is None for other in self._chats.values()):
+                self._is_idle.set()
+
+    async def join(self) -> None:
+        await self._is_idle.wait()
+
+    async def stop(self) -> None:
+        for chat in self._chats.values():
+            if chat.task is not None:
+                chat.task.cancel()
+
+    def get_stats(self) -> OutboxStats:
+        now = time.monotonic()
+        return OutboxStats(
+            queued=self._queued,
+            pending=self._pending,
+            sent_messages=self._sent_messages,
+            sent_alerts=self._sent_alerts,
+            digests=self._digests,
+            retries=self._retries,
+            failed=self._failed,
+            oldest_pending_age=max(
+                (
+                    now - chat.pending[0].enqueued_at
+                    for chat in self._chats.values()
+                    if chat.pending
+                ),
+                default=0.0,
+            ),
+            lag_p50=self._lag.get_percentile(50) / 1e9,
+            lag_p99=self._lag.get_percentile(99) / 1e9,
+            lag_max=self._lag.max / 1e9,
+        )
@@ -0,0 +1,10 @@
+import sys
+import types
+from pathlib import Path
+
+# Modules import each other relatively, so the checkout is loaded as package
+# `trading_service` whatever its directory is called
+_ROOT = Path(__file__).resolve().parent.parent
+_package = types.ModuleType("trading_service")
+_package.__path__ = [str(_ROOT)]
+sys.modules.setdefault("trading_service", _package)
@@ -0,0 +1,100 @@
+import pytest
+
+from trading_service.model.processor_models import KLineInterval
+from trading_service.services.processor import LogicType, ProcessorId
+from trading_service.utils.alert_deduplicator import AlertDeduplicator
+
+PROCESSOR_ID = ProcessorId("BTCUSDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+LOGIC = LogicType.HIGH_VOLUME_RAISE
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_same_candle_fires_once():
+    deduplicator = AlertDeduplicator(hysteresis=False, clock=Clock())
+
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 0)
+    assert not deduplicator.should_fire(PROCESSOR_ID, LOGIC, 0)
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 60_000)
+    assert deduplicator.get_stats().duplicates == 1
+
+
+def test_cooldown_suppresses_until_it_passes():
+    clock = Clock()
+    deduplicator = AlertDeduplicator({LOGIC: 10}, hysteresis=False, clock=clock)
+
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 0)
+    clock.now = 9.9
+    assert not deduplicator.should_fire(PROCESSOR_ID, LOGIC, 60_000)
+    clock.now = 10
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 120_000)
+    assert deduplicator.get_stats().cooling_down == 1
+
+
+def test_hysteresis_holds_until_reset():
+    deduplicator = AlertDeduplicator(clock=Clock())
+
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 0)
+    assert not deduplicator.should_fire(PROCESSOR_ID, LOGIC, 60_000)
+    deduplicator.reset(PROCESSOR_ID, LOGIC)
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 120_000)
+    # Fire disarms it again
+    assert not deduplicator.should_fire(PROCESSOR_ID, LOGIC, 180_000)
+    assert deduplicator.get_stats().held == 2
+
+
+def test_hysteresis_and_cooldown_both_apply():
+    clock = Clock()
+    deduplicator = AlertDeduplicator(default_cooldown=10, clock=clock)
+
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 0)
+    deduplicator.reset(PROCESSOR_ID, LOGIC)
+    clock.now = 5
+    assert not deduplicator.should_fire(PROCESSOR_ID, LOGIC, 60_000)
+    clock.now = 10
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 120_000)
+
+
+def test_entry_is_kept_while_touched_and_expires_after_ttl():
+    clock = Clock()
+    deduplicator = AlertDeduplicator(ttl=100, clock=clock)
+
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 0)
+    clock.now = 99
+    assert not deduplicator.should_fire(PROCESSOR_ID, LOGIC, 60_000)
+    clock.now = 198
+    assert not deduplicator.should_fire(PROCESSOR_ID, LOGIC, 120_000)
+    clock.now = 298
+    # Expired, forgets it is held
+    assert deduplicator.should_fire(PROCESSOR_ID, LOGIC, 180_000)
+    assert deduplicator.get_stats().evicted == 1
+
+
+def test_max_entries_evicts_least_recently_touched():
+    deduplicator = AlertDeduplicator(max_entries=2, clock=Clock())
+    processor_ids = [
+        ProcessorId(symbol, KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+        for symbol in ("BTCUSDT", "ETHUSDT", "BNBUSDT")
+    ]
+
+    for processor_id in processor_ids:
+        assert deduplicator.should_fire(processor_id, LOGIC, 0)
+
+    stats = deduplicator.get_stats()
+    assert (stats.entries, stats.evicted) == (2, 1)
+    assert deduplicator.should_fire(processor_ids[0], LOGIC, 60_000)
+    assert not deduplicator.should_fire(processor_ids[2], LOGIC, 60_000)
+
+
+@pytest.mark.parametrize(
+    "cooldowns, default_cooldown", [({LOGIC: 120}, 0), (None, 120), ({}, 120)]
+)
+def test_ttl_shorter_than_cooldown_is_rejected(cooldowns, default_cooldown):
+    with pytest.raises(ValueError):
+        AlertDeduplicator(cooldowns, default_cooldown, ttl=60)
@@ -0,0 +1,153 @@
+import asyncio
+from typing import Any, Set
+
+from trading_service.benchmarks.synthetic_binance_server import SyntheticBinanceServer
+from trading_service.model.binance_client_models import EventType, SubscriptionState
+from trading_service.services_impl.binance_client_impl import (
+    BinanceClientWebsocketStreamManagerImpl,
+)
+from trading_service.utils.stream_registry import StreamRegistry
+
+BTC = "btcusdt@kline_1m"
+ETH = "ethusdt@kline_1m"
+BNB = "bnbusdt@kline_1m"
+XRP = "xrpusdt@kline_1m"
+
+
+async def on_k_line(data) -> None:
+    pass
+
+
+async def create_client(
+    server: SyntheticBinanceServer, **kwargs: Any
+) -> BinanceClientWebsocketStreamManagerImpl:
+    client = await BinanceClientWebsocketStreamManagerImpl.create(
+        {EventType.KLINE: on_k_line},
+        connection_url=await server.start(),
+        max_messages_per_second=100,
+        reconcile_interval=None,
+        registry=StreamRegistry(),
+        **kwargs,
+    )
+    await client.start()
+    return client
+
+
+def get_server_streams(server: SyntheticBinanceServer) -> Set[str]:
+    return set().union(*server._subscriptions.values())
+
+
+def test_rejected_merged_frame_is_retried_request_by_request():
+    async def run() -> None:
+        server = SyntheticBinanceServer(
+            ticks_per_second=0.01, max_streams_per_connection=3
+        )
+        client = await create_client(server)
+        try:
+            assert await client.subscribe({BTC, ETH}) == [True, True]
+            # Queued in the same loop iteration, so packed into one frame that
+            # is over the limit, only the first stream fits on its own
+            results = await asyncio.gather(
+                client.subscribe({BNB}), client.subscribe({XRP})
+            )
+
+            assert results == [[True], [False]]
+            assert client.get_control_plane_stats().frames_sent == 4
+            assert client.get_subscription_states() == {
+                BTC: SubscriptionState.SUBSCRIBED,
+                ETH: SubscriptionState.SUBSCRIBED,
+                BNB: SubscriptionState.SUBSCRIBED,
+                XRP: SubscriptionState.FAILED,
+            }
+            assert get_server_streams(server) == {BTC, ETH, BNB}
+
+            # Failed stream is forgotten without a request
+            assert await client.unsubscribe({XRP}) == [True]
+            assert client.get_control_plane_stats().frames_sent == 4
+            assert XRP not in client.get_subscription_states()
+        finally:
+            await client.stop()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_request_without_reply_is_retried_after_timeout():
+    async def run() -> None:
+        server = SyntheticBinanceServer(ticks_per_second=0.01)
+        client = await create_client(server, request_timeout=0.2, request_retries=1)
+        try:
+            server.dropped_replies = 1
+            assert await client.subscribe({BTC}) == [True]
+            assert client.get_control_plane_stats().frames_sent == 2
+
+            server.dropped_replies = 2
+            assert await client.subscribe({ETH}) == [False]
+            assert client.get_control_plane_stats().frames_sent == 4
+            assert client.get_subscription_states()[ETH] == SubscriptionState.FAILED
+        finally:
+            await client.stop()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_unsubscribe_while_subscribe_is_in_flight():
+    async def run() -> None:
+        server = SyntheticBinanceServer(ticks_per_second=0.01)
+        client = await create_client(server)
+        try:
+            server.reply_delay = 0.2
+            subscribe = asyncio.create_task(client.subscribe({BTC}))
+            await asyncio.sleep(0.05)
+            assert client.get_subscription_states() == {
+                BTC: SubscriptionState.SUBSCRIBING
+            }
+
+            unsubscribe = asyncio.create_task(client.unsubscribe({BTC}))
+            await asyncio.sleep(0)
+            assert client.get_subscription_states() == {
+                BTC: SubscriptionState.UNSUBSCRIBING
+            }
+
+            # Reply to SUBSCRIBE does not bring the stream back
+            assert await subscribe == [False]
+            assert client.get_subscription_states() == {
+                BTC: SubscriptionState.UNSUBSCRIBING
+            }
+            assert await unsubscribe == [True]
+            assert client.get_subscription_states() == {}
+            assert get_server_streams(server) == set()
+        finally:
+            await client.stop()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_reconcile_adopts_and_repairs_streams():
+    async def run() -> None:
+        server = SyntheticBinanceServer(ticks_per_second=0.01)
+        client = await create_client(server, request_timeout=0.2, request_retries=0)
+        try:
+            assert await client.subscribe({BTC, ETH}) == [True, True]
+            # Timed out SUBSCRIBE that went through on the server
+            server.dropped_replies = 1
+            assert await client.subscribe({BNB}) == [False]
+            (websocket,) = server._subscriptions
+            server._unsubscribe(websocket, ETH)
+            server._subscribe(websocket, XRP)
+
+            await client._reconcile()
+
+            assert client.get_subscription_states() == {
+                stream: SubscriptionState.SUBSCRIBED for stream in (BTC, ETH, BNB)
+            }
+            assert get_server_streams(server) == {BTC, ETH, BNB}
+            stats = client.get_control_plane_stats()
+            assert (stats.reconciles, stats.repaired_streams) == (1, 3)
+        finally:
+            await client.stop()
+            await server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Set
+
+from trading_service.benchmarks.synthetic_binance_server import SyntheticBinanceServer
+from trading_service.model.binance_client_models import EventType
+from trading_service.services_impl.binance_client_pool_impl import (
+    BinanceClientWebsocketStreamManagerPoolImpl,
+)
+
+STREAMS = {f"s{i}usdt@kline_1m" for i in range(8)}
+
+
+async def on_k_line(data) -> None:
+    pass
+
+
+def assert_pool_matches_server(
+    pool: BinanceClientWebsocketStreamManagerPoolImpl, server: SyntheticBinanceServer
+) -> None:
+    mapped: Set[str] = set(pool._stream_to_shard)
+    assert sum(pool.get_streams_by_connection()) == len(mapped)
+    server_streams = [streams for streams in server._subscriptions.values()]
+    assert sorted(len(streams) for streams in server_streams if streams) == sorted(
+        load for load in pool.get_streams_by_connection() if load
+    )
+    assert set().union(*server_streams) == mapped
+
+
+def test_unsubscribe_during_rebalance_is_not_lost():
+    async def run() -> None:
+        server = SyntheticBinanceServer(ticks_per_second=0.01)
+        url = await server.start()
+        # All initial streams fit the first connection, the second one is empty
+        pool = await BinanceClientWebsocketStreamManagerPoolImpl.create(
+            {EventType.KLINE: on_k_line},
+            connection_url=url,
+            connections=2,
+            max_streams_per_connection=16,
+            streams=set(STREAMS),
+            rebalance_spread=None,
+            reconcile_interval=None,
+        )
+        await pool.start()
+        try:
+            assert pool.get_streams_by_connection() == [8, 0]
+            removed = set(sorted(STREAMS)[:5])
+            rebalance = asyncio.create_task(pool.rebalance())
+            await asyncio.sleep(0)
+            assert await pool.unsubscribe(removed) == [True] * len(removed)
+            await rebalance
+
+            assert set(pool._stream_to_shard) == STREAMS - removed
+            assert_pool_matches_server(pool, server)
+        finally:
+            await pool.stop()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_subscribe_during_rebalance_is_assigned_once():
+    async def run() -> None:
+        server = SyntheticBinanceServer(ticks_per_second=0.01)
+        url = await server.start()
+        pool = await BinanceClientWebsocketStreamManagerPoolImpl.create(
+            {EventType.KLINE: on_k_line},
+            connection_url=url,
+            connections=2,
+            max_streams_per_connection=16,
+            streams=set(STREAMS),
+            rebalance_spread=None,
+            reconcile_interval=None,
+        )
+        await pool.start()
+        try:
+            added = {"new0usdt@kline_1m", "new1usdt@kline_1m"}
+            rebalance = asyncio.create_task(pool.rebalance())
+            await asyncio.sleep(0)
+            results = await asyncio.gather(
+                pool.subscribe(added | {sorted(STREAMS)[0]}), pool.subscribe(added)
+            )
+            assert all(all(result) for result in results)
+            assert await rebalance == 4
+
+            assert set(pool._stream_to_shard) == STREAMS | added
+            assert_pool_matches_server(pool, server)
+        finally:
+            await pool.stop()
+            await server.stop()
+
+    asyncio.run(run())
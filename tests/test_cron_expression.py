@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from trading_service.utils.cron_expression import CronExpression
+
+# Saturday, 2022-01-01 00:00 UTC
+START = int(datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp())
+MINUTE = 60
+DAY = 86_400
+
+
+def get_timestamp(*args: int) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+@pytest.mark.parametrize(
+    "expression, moment, is_matching",
+    [
+        # Either restricted day field matches: 1st of month or a Monday
+        ("0 0 1 * mon", (2022, 2, 1), True),
+        ("0 0 1 * mon", (2022, 2, 7), True),
+        ("0 0 1 * mon", (2022, 2, 8), False),
+        # Unrestricted day of month leaves day of week alone
+        ("0 0 * * mon", (2022, 2, 1), False),
+        ("0 0 * * mon", (2022, 2, 7), True),
+        # And the other way round
+        ("0 0 13 * *", (2022, 5, 13), True),
+        ("0 0 13 * *", (2022, 5, 14), False),
+        # 7 and 0 are both Sunday
+        ("0 0 * * 7", (2022, 2, 6), True),
+        ("0 0 * * 0", (2022, 2, 6), True),
+        ("0 0 * * 6-7", (2022, 2, 6), True),
+        ("0 0 * * mon-fri", (2022, 2, 5), False),
+        ("0 0 * jan-mar *", (2022, 3, 31), True),
+        ("0 0 * jan-mar *", (2022, 4, 1), False),
+        ("0 0 29 2 *", (2024, 2, 29), True),
+        ("0 12 * * *", (2022, 1, 1, 12), True),
+        ("0 12 * * *", (2022, 1, 1, 12, 0, 1), False),
+        ("0 12 * * * 30", (2022, 1, 1, 12, 0, 30), True),
+    ],
+)
+def test_matches(expression, moment, is_matching):
+    assert CronExpression(expression).matches(get_timestamp(*moment)) is is_matching
+
+
+@pytest.mark.parametrize(
+    "field, minutes",
+    [
+        ("*/15", {0, 15, 30, 45}),
+        ("5/20", {5, 25, 45}),
+        ("10-30/10", {10, 20, 30}),
+        ("1,2,58-59", {1, 2, 58, 59}),
+        ("0-4/3,50", {0, 3, 50}),
+        ("7", {7}),
+    ],
+)
+def test_minute_ranges_and_steps(field, minutes):
+    expression = CronExpression(f"{field} * * * *")
+
+    assert {
+        minute for minute in range(60) if expression.matches(START + minute * MINUTE)
+    } == minutes
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "* * *",
+        "* * * * * * *",
+        "60 * * * *",
+        "* 24 * * *",
+        "* * 0 * *",
+        "* * * 13 *",
+        "* * * * 8",
+        "*/0 * * * *",
+        "5-1 * * * *",
+        "x * * * *",
+        "* * * * sat-sun",
+        "* * * foo *",
+    ],
+)
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_never_matching_expression_is_rejected_on_search():
+    with pytest.raises(ValueError):
+        CronExpression("0 0 31 2 *").get_next(START)
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "*/7 * * * *",
+        "30 */5 * * *",
+        "0 9-17/4 * * mon-fri",
+        "15 0 1,15 * wed",
+        "0 0 28-31 * *",
+        "0 0 * feb,mar sun",
+    ],
+)
+def test_get_next_is_first_match_after(expression):
+    cron = CronExpression(expression)
+    # Every matching minute over 70 days, found one by one
+    end = START + 70 * DAY
+    matching = [
+        timestamp for timestamp in range(START, end, MINUTE) if cron.matches(timestamp)
+    ]
+
+    timestamp = START - 1
+    for expected in matching:
+        timestamp = cron.get_next(timestamp)
+        assert timestamp == expected
+    assert cron.get_next(matching[-1]) >= end
+    # Strictly after, also from between two matches
+    assert cron.get_next(matching[0]) == matching[1]
+    assert cron.get_next(matching[0] + 1) == matching[1]
+
+
+def test_get_next_crosses_years():
+    cron = CronExpression("0 0 29 2 *")
+
+    assert cron.get_next(START) == get_timestamp(2024, 2, 29)
+    assert cron.get_next(get_timestamp(2024, 2, 29)) == get_timestamp(2028, 2, 29)
+
+
+def test_six_field_expression_steps_seconds():
+    cron = CronExpression("* * * * * */20")
+
+    assert cron.get_next(START) == START + 20
+    assert cron.get_next(START + 40) == START + 60
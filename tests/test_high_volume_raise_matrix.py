@@ -0,0 +1,89 @@
+import asyncio
+import random
+from typing import Dict
+
+from trading_service.model.processor_models import (
+    HighRiseType,
+    KLineData,
+    KLineInterval,
+    ProcessorConfig,
+    ProcessorHighRiseConfig,
+)
+from trading_service.services.processor import LogicType, ProcessorId
+from trading_service.services_impl.processor_impl import ProcessorImpl
+from trading_service.utils.high_volume_raise_matrix import HighVolumeRaiseMatrix
+
+INTERVAL = KLineInterval.K_LINE_INTERVAL_1_MINUTE
+CONFIGS = [
+    ProcessorConfig(ProcessorHighRiseConfig({3, 5}, volume_rise_ratio=2.0)),
+    ProcessorConfig(
+        ProcessorHighRiseConfig(
+            {4}, check_type=HighRiseType.DOWN, volume_rise_ratio=1.5
+        )
+    ),
+    ProcessorConfig(
+        ProcessorHighRiseConfig(
+            {2, 8}, check_type=HighRiseType.BOTH, volume_rise_ratio=3.0
+        )
+    ),
+    ProcessorConfig(ProcessorHighRiseConfig({1, 3})),  # Never triggers
+]
+
+
+def get_candle(symbol: str, minute: int, rnd: random.Random) -> KLineData:
+    open_price = float(rnd.randint(90, 110))
+    # Whole volumes keep window sums exact in both implementations
+    volume = float(rnd.randint(1, 10) * (rnd.choice([1, 1, 1, 5])))
+    return KLineData(
+        start_time=minute * 60_000,
+        symbol=symbol,
+        interval=INTERVAL,
+        open_price=open_price,
+        close_price=open_price + rnd.choice([-1.0, 0.0, 1.0]),
+        high_price=open_price + 2,
+        low_price=open_price - 2,
+        base_volume_asset=volume,
+        is_kline_closed=True,
+    )
+
+
+def test_matrix_matches_scalar_logic():
+    async def run() -> None:
+        rnd = random.Random(11)
+        matrix = HighVolumeRaiseMatrix(capacity=2)
+        processors: Dict[ProcessorId, ProcessorImpl] = dict()
+        for i in range(12):
+            processor_id = ProcessorId(f"SYMBOL{i}USDT", INTERVAL)
+            config = CONFIGS[i % len(CONFIGS)]
+            processors[processor_id] = ProcessorImpl(
+                processor_id.symbol,
+                INTERVAL,
+                {LogicType.HIGH_VOLUME_RAISE},
+                config,
+                evaluate_logics=False,
+            )
+            matrix.add(processor_id, config)
+            matrix.set_enabled(processor_id, True)
+
+        triggers = 0
+        for minute in range(200):
+            if minute == 100:
+                # Last row moves into the freed one
+                removed = next(iter(processors))
+                del processors[removed]
+                matrix.remove(removed)
+            for processor_id, processor in processors.items():
+                data = get_candle(processor_id.symbol, minute, rnd)
+                await processor.update_data(data)
+                matrix.update_closed(processor_id, data)
+
+            triggered = set(matrix.evaluate(processors))
+            for processor_id, processor in processors.items():
+                assert (processor_id in triggered) == (
+                    await processor._high_volume_raise()
+                ), (processor_id, minute)
+            triggers += len(triggered)
+
+        assert triggers > 0
+
+    asyncio.run(run())
@@ -0,0 +1,187 @@
+import asyncio
+import random
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from trading_service.model.processor_models import KLineData, KLineInterval
+from trading_service.utils.k_line_journal import K_LINE_RECORD_DTYPE, KLineJournal
+
+INTERVAL = KLineInterval.K_LINE_INTERVAL_1_MINUTE
+MINUTE = 60_000
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
+# Header and 64 records
+SEGMENT_SIZE = 65 * K_LINE_RECORD_DTYPE.itemsize
+
+
+def get_k_lines() -> List[KLineData]:
+    # Open candle revisions and closes of interleaved streams
+    rnd = random.Random(7)
+    k_lines = list()
+    for minute in range(60):
+        for symbol in SYMBOLS:
+            for revision in range(rnd.randint(1, 3)):
+                k_lines.append(
+                    KLineData(
+                        start_time=minute * MINUTE,
+                        symbol=symbol,
+                        interval=INTERVAL,
+                        open_price=float(minute),
+                        close_price=float(revision),
+                        high_price=float(minute),
+                        low_price=float(minute),
+                        base_volume_asset=1.0,
+                        is_kline_closed=revision == 0,
+                    )
+                )
+    return k_lines
+
+
+async def write_journal(directory: Path, k_lines: List[KLineData]) -> KLineJournal:
+    journal = await KLineJournal.create(
+        directory=str(directory),
+        segment_size=SEGMENT_SIZE,
+        index_interval=4,
+        batch_size=50,
+        max_age=None,
+        max_size=None,
+    )
+    for data in k_lines:
+        journal.append(data)
+    await journal.flush()
+    return journal
+
+
+def get_expected(
+    k_lines: List[KLineData], symbol: str, low: int, high: int
+) -> List[tuple]:
+    return [
+        (data.start_time, data.close_price)
+        for data in k_lines
+        if data.symbol == symbol and low <= data.start_time <= high
+    ]
+
+
+def to_tuples(records: np.ndarray) -> List[tuple]:
+    return list(zip(records["start_time"].tolist(), records["close_price"].tolist()))
+
+
+def test_read_returns_stream_records_in_range(tmp_path: Path):
+    k_lines = get_k_lines()
+
+    async def check() -> None:
+        journal = await write_journal(tmp_path, k_lines)
+        try:
+            assert len(journal._segments) > 2
+            for symbol in SYMBOLS:
+                assert to_tuples(journal.read(symbol, INTERVAL)) == get_expected(
+                    k_lines, symbol, 0, 60 * MINUTE
+                )
+                for low, high in [(0, 0), (5, 17), (20, 21), (59, 59), (61, 70)]:
+                    records = journal.read(
+                        symbol, INTERVAL, low * MINUTE, high * MINUTE
+                    )
+                    assert to_tuples(records) == get_expected(
+                        k_lines, symbol, low * MINUTE, high * MINUTE
+                    )
+            assert not len(journal.read("XRPUSDT", INTERVAL))
+        finally:
+            await journal.close()
+
+    asyncio.run(check())
+
+
+def test_index_is_rebuilt_on_open(tmp_path: Path):
+    k_lines = get_k_lines()
+
+    async def check() -> None:
+        await (await write_journal(tmp_path, k_lines)).close()
+        journal = await write_journal(tmp_path, [])
+        try:
+            records = journal.read("ETHUSDT", INTERVAL, 10 * MINUTE, 30 * MINUTE)
+            assert to_tuples(records) == get_expected(
+                k_lines, "ETHUSDT", 10 * MINUTE, 30 * MINUTE
+            )
+        finally:
+            await journal.close()
+
+    asyncio.run(check())
+
+
+def test_read_last_closed_keeps_one_record_per_start_time(tmp_path: Path):
+    k_lines = get_k_lines()
+
+    async def check() -> None:
+        journal = await write_journal(tmp_path, k_lines)
+        try:
+            history = journal.read_last_closed(
+                [("BTCUSDT", INTERVAL), ("XRPUSDT", INTERVAL)], 10
+            )
+        finally:
+            await journal.close()
+
+        records = history[("BTCUSDT", INTERVAL)]
+        assert records["start_time"].tolist() == [i * MINUTE for i in range(50, 60)]
+        assert records["is_kline_closed"].all()
+        assert ("XRPUSDT", INTERVAL) not in history
+
+    asyncio.run(check())
+
+
+def get_k_line(start_time: int) -> KLineData:
+    return KLineData(
+        start_time=start_time,
+        symbol="BTCUSDT",
+        interval=INTERVAL,
+        open_price=1.0,
+        close_price=float(start_time),
+        high_price=1.0,
+        low_price=1.0,
+        base_volume_asset=1.0,
+        is_kline_closed=True,
+    )
+
+
+def test_read_finds_record_appended_out_of_order(tmp_path: Path):
+    start_times = [*range(100, 120), 5, *range(120, 130)]
+
+    async def check() -> None:
+        journal = await write_journal(
+            tmp_path, [get_k_line(start_time) for start_time in start_times]
+        )
+        try:
+            assert len(journal._segments) == 1
+            assert journal.read("BTCUSDT", INTERVAL, 0, 10)["start_time"].tolist() == [
+                5
+            ]
+            records = journal.read("BTCUSDT", INTERVAL, 110, 121)
+            assert records["start_time"].tolist() == [*range(110, 122)]
+        finally:
+            await journal.close()
+
+    asyncio.run(check())
+
+
+def test_old_segments_are_removed_without_new_appends(tmp_path: Path):
+    async def check() -> None:
+        journal = await KLineJournal.create(
+            directory=str(tmp_path),
+            segment_size=SEGMENT_SIZE,
+            flush_interval=0.05,
+            max_age=0.2,
+            max_size=None,
+        )
+        try:
+            for start_time in range(100):
+                journal.append(get_k_line(start_time))
+            await journal.flush()
+            assert len(journal._segments) == 2
+
+            await asyncio.sleep(0.5)
+            assert len(journal._segments) == 1
+            assert len(list(tmp_path.glob("*.journal"))) == 1
+        finally:
+            await journal.close()
+
+    asyncio.run(check())
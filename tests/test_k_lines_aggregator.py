@@ -0,0 +1,153 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from trading_service.model.processor_models import KLineData, KLineInterval
+from trading_service.services_impl.k_lines_aggregator import KLinesAggregator
+from trading_service.services_impl.k_lines_binance_listener import (
+    KLinesBinanceListener,
+)
+from trading_service.utils.binance_utils import BinanceKLineIntervalUtil
+from trading_service.utils.stream_registry import StreamRegistry
+
+MINUTE = 60_000
+# Monday, 2022-08-01 00:00 UTC
+MONDAY = 1_659_312_000_000
+
+
+def get_minute(start_time: int, price: float, is_closed: bool = True) -> KLineData:
+    return KLineData(
+        start_time=start_time,
+        symbol="BTCUSDT",
+        interval=KLineInterval.K_LINE_INTERVAL_1_MINUTE,
+        open_price=price,
+        close_price=price,
+        high_price=price + 1,
+        low_price=price - 1,
+        base_volume_asset=1.0,
+        is_kline_closed=is_closed,
+    )
+
+
+def aggregate(
+    minutes: List[KLineData],
+    intervals=frozenset({KLineInterval.K_LINE_INTERVAL_5_MINUTE}),
+    **kwargs,
+) -> List[KLineData]:
+    emitted: List[KLineData] = []
+
+    async def on_k_line(data: KLineData) -> None:
+        emitted.append(data)
+
+    async def push_all() -> None:
+        aggregator = KLinesAggregator(
+            on_k_line,
+            intervals,
+            registry=StreamRegistry(),
+            **kwargs,
+        )
+        for minute in minutes:
+            await aggregator.push(minute)
+
+    asyncio.run(push_all())
+    return emitted
+
+
+@pytest.mark.parametrize(
+    "interval, time, bounds",
+    [
+        ("5m", MONDAY + 4 * MINUTE, (MONDAY, MONDAY + 5 * MINUTE)),
+        ("5m", MONDAY + 5 * MINUTE, (MONDAY + 5 * MINUTE, MONDAY + 10 * MINUTE)),
+        ("1h", MONDAY - 1, (MONDAY - 3_600_000, MONDAY)),
+        ("1w", MONDAY, (MONDAY, MONDAY + 604_800_000)),
+        ("1w", MONDAY - 1, (MONDAY - 604_800_000, MONDAY)),
+        # 2022-12-15 to 2023-01-01
+        ("1M", 1_671_062_400_000, (1_669_852_800_000, 1_672_531_200_000)),
+        # Leap February of 2024
+        ("1M", 1_709_164_800_000, (1_706_745_600_000, 1_709_251_200_000)),
+    ],
+)
+def test_get_bounds(interval, time, bounds):
+    assert BinanceKLineIntervalUtil.get_bounds(interval, time) == bounds
+
+
+def test_candle_closes_with_its_last_minute():
+    emitted = aggregate([get_minute(MONDAY + i * MINUTE, i) for i in range(6)])
+
+    candles = [data for data in emitted if data.interval == "5m"]
+    assert [data.start_time for data in candles] == [MONDAY] * 5 + [MONDAY + 5 * MINUTE]
+    assert [data.is_kline_closed for data in candles] == [False] * 4 + [True, False]
+    closed = candles[4]
+    assert (closed.open_price, closed.close_price) == (0, 4)
+    assert (closed.high_price, closed.low_price) == (5, -1)
+    assert closed.base_volume_asset == 5
+
+
+def test_minutes_are_emitted_only_if_requested():
+    emitted = aggregate(
+        [get_minute(MONDAY, 1)],
+        {
+            KLineInterval.K_LINE_INTERVAL_1_MINUTE,
+            KLineInterval.K_LINE_INTERVAL_5_MINUTE,
+        },
+    )
+
+    assert [data.interval for data in emitted] == ["1m", "5m"]
+    assert [data.interval for data in aggregate([get_minute(MONDAY, 1)])] == ["5m"]
+
+
+def test_next_candle_closes_candle_with_missed_last_minute():
+    emitted = aggregate(
+        [
+            get_minute(MONDAY, 1),
+            get_minute(MONDAY + 4 * MINUTE, 2, is_closed=False),
+            get_minute(MONDAY + 5 * MINUTE, 3, is_closed=False),
+        ]
+    )
+
+    candles = [data for data in emitted if data.interval == "5m"]
+    assert [(data.start_time, data.is_kline_closed) for data in candles] == [
+        (MONDAY, False),
+        (MONDAY, False),
+        (MONDAY, True),
+        (MONDAY + 5 * MINUTE, False),
+    ]
+    assert candles[2].close_price == 2
+
+
+def test_candle_started_before_first_minute_is_partial():
+    minutes = [get_minute(MONDAY + i * MINUTE, i) for i in range(2, 6)]
+
+    assert [
+        data.start_time for data in aggregate(minutes) if data.interval == "5m"
+    ] == [MONDAY + 5 * MINUTE]
+    partial = [
+        data for data in aggregate(minutes, emit_partial=True) if data.interval == "5m"
+    ]
+    assert partial[0].start_time == MONDAY
+
+
+def test_older_minutes_are_skipped():
+    emitted = aggregate(
+        [get_minute(MONDAY, 0), get_minute(MONDAY + MINUTE, 1), get_minute(MONDAY, 2)]
+    )
+
+    assert [data.close_price for data in emitted] == [0, 1]
+
+
+def test_listener_streams_only_1m_with_aggregation():
+    listener = KLinesBinanceListener()
+
+    assert listener._get_streams(["BTCUSDT"]) == {"btcusdt@kline_1m"}
+
+
+def test_listener_rejects_native_intervals_with_aggregation():
+    with pytest.raises(ValueError):
+        asyncio.run(
+            KLinesBinanceListener.create(
+                None,
+                aggregate_intervals={KLineInterval.K_LINE_INTERVAL_5_MINUTE},
+                intervals={KLineInterval.K_LINE_INTERVAL_5_MINUTE},
+            )
+        )
@@ -0,0 +1,102 @@
+import asyncio
+from pathlib import Path
+from typing import List
+
+from trading_service.model.processor_models import KLineData, KLineInterval
+from trading_service.services_impl import k_lines_binance_listener
+from trading_service.services_impl.binance_rest_client_impl import (
+    BinanceRestClientImpl,
+)
+from trading_service.services_impl.k_lines_binance_listener import (
+    KLinesBinanceListener,
+)
+from trading_service.utils.k_line_journal import KLineJournal
+
+MINUTE = 60_000
+ONE_MINUTE = KLineInterval.K_LINE_INTERVAL_1_MINUTE
+FIVE_MINUTES = KLineInterval.K_LINE_INTERVAL_5_MINUTE
+
+
+class FakeWebsocketClient:
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "FakeWebsocketClient":
+        return cls()
+
+
+def get_minute(minute: int) -> KLineData:
+    return KLineData(
+        start_time=minute * MINUTE,
+        symbol="BTCUSDT",
+        interval=ONE_MINUTE,
+        open_price=float(minute),
+        close_price=float(minute + 1),
+        high_price=float(minute + 2),
+        low_price=float(minute),
+        base_volume_asset=1.0,
+        is_kline_closed=True,
+    )
+
+
+def test_rest_backfill_is_opt_in(monkeypatch):
+    monkeypatch.setattr(
+        k_lines_binance_listener,
+        "BinanceClientWebsocketStreamManagerImpl",
+        FakeWebsocketClient,
+    )
+
+    async def run() -> None:
+        listener = await KLinesBinanceListener.create(None)
+        assert listener._rest_client is None
+
+        listener = await KLinesBinanceListener.create(None, backfill=True)
+        assert isinstance(listener._rest_client, BinanceRestClientImpl)
+
+        rest_client = BinanceRestClientImpl()
+        listener = await KLinesBinanceListener.create(None, rest_client=rest_client)
+        assert listener._rest_client is rest_client
+
+    asyncio.run(run())
+
+
+def test_aggregated_closed_candles_are_journaled(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(
+        k_lines_binance_listener,
+        "BinanceClientWebsocketStreamManagerImpl",
+        FakeWebsocketClient,
+    )
+    received: List[KLineData] = list()
+
+    async def on_k_line(data: KLineData) -> None:
+        received.append(data)
+
+    async def run() -> None:
+        journal = await KLineJournal.create(
+            directory=str(tmp_path), max_age=None, max_size=None
+        )
+        listener = await KLinesBinanceListener.create(
+            on_k_line,
+            journal=journal,
+            aggregate_intervals={ONE_MINUTE, FIVE_MINUTES},
+        )
+        try:
+            for minute in range(12):
+                await listener._publish_new_k_line(get_minute(minute))
+            await journal.flush()
+            history = journal.read_last_closed(
+                [("BTCUSDT", ONE_MINUTE), ("BTCUSDT", FIVE_MINUTES)], 100
+            )
+            candles = journal.read("BTCUSDT", FIVE_MINUTES)
+        finally:
+            await journal.close()
+
+        # Minutes once, closed 5 minute candles only, open revisions are not
+        assert history[("BTCUSDT", ONE_MINUTE)]["start_time"].tolist() == [
+            minute * MINUTE for minute in range(12)
+        ]
+        assert candles["start_time"].tolist() == [0, 5 * MINUTE]
+        assert candles["base_volume_asset"].tolist() == [5.0, 5.0]
+        assert candles["close_price"].tolist() == [5.0, 10.0]
+        assert candles["is_kline_closed"].all()
+        assert any(data.interval == FIVE_MINUTES for data in received)
+
+    asyncio.run(run())
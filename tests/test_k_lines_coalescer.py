@@ -0,0 +1,112 @@
+import asyncio
+from typing import List, Tuple
+
+from trading_service.model.processor_models import KLineData, KLineInterval
+from trading_service.services_impl.k_lines_coalescer import KLinesCoalescer
+from trading_service.utils.stream_registry import StreamRegistry
+
+MINUTE = 60_000
+
+
+def get_k_line(
+    symbol: str, minute: int, volume: float, is_closed: bool = False
+) -> KLineData:
+    return KLineData(
+        start_time=minute * MINUTE,
+        symbol=symbol,
+        interval=KLineInterval.K_LINE_INTERVAL_1_MINUTE,
+        open_price=1.0,
+        close_price=1.0,
+        high_price=1.0,
+        low_price=1.0,
+        base_volume_asset=volume,
+        is_kline_closed=is_closed,
+    )
+
+
+def coalesce(k_lines: List[KLineData]) -> Tuple[List[tuple], KLinesCoalescer]:
+    delivered: List[tuple] = list()
+
+    async def on_k_line(data: KLineData) -> None:
+        delivered.append(
+            (data.symbol, data.start_time // MINUTE, data.base_volume_asset)
+        )
+
+    async def run() -> KLinesCoalescer:
+        coalescer = KLinesCoalescer(on_k_line, StreamRegistry())
+        # Pushed before delivery starts, as if the consumer was behind
+        for data in k_lines:
+            await coalescer.push(data)
+        await coalescer.start()
+        await coalescer.join()
+        await coalescer.stop()
+        return coalescer
+
+    return delivered, asyncio.run(run())
+
+
+def test_latest_open_update_wins_and_closes_are_kept():
+    delivered, coalescer = coalesce(
+        [
+            get_k_line("BTCUSDT", 0, 1),
+            get_k_line("ETHUSDT", 0, 1),
+            get_k_line("BTCUSDT", 0, 2),
+            get_k_line("BTCUSDT", 0, 3, is_closed=True),
+            get_k_line("BTCUSDT", 1, 1),
+            get_k_line("ETHUSDT", 0, 2),
+            get_k_line("BTCUSDT", 1, 2),
+        ]
+    )
+
+    # Streams in order of their first pending update
+    assert delivered == [
+        ("BTCUSDT", 0, 3),
+        ("BTCUSDT", 1, 2),
+        ("ETHUSDT", 0, 2),
+    ]
+    stats = coalescer.get_stats()
+    assert (stats.received, stats.delivered, stats.collapsed) == (7, 3, 4)
+    assert (stats.pending_streams, stats.pending_closed) == (0, 0)
+
+
+def test_closed_candles_go_before_the_open_one():
+    delivered, coalescer = coalesce(
+        [
+            get_k_line("BTCUSDT", 0, 1, is_closed=True),
+            get_k_line("BTCUSDT", 2, 1),
+            # Late close of an older candle keeps the newer open update
+            get_k_line("BTCUSDT", 1, 5, is_closed=True),
+            get_k_line("BTCUSDT", 2, 2),
+        ]
+    )
+
+    assert delivered == [
+        ("BTCUSDT", 0, 1),
+        ("BTCUSDT", 1, 5),
+        ("BTCUSDT", 2, 2),
+    ]
+    assert coalescer.get_stats().collapsed == 1
+
+
+def test_updates_pushed_during_delivery_are_collapsed():
+    async def run() -> None:
+        delivered: List[float] = list()
+        coalescer: KLinesCoalescer | None = None
+
+        async def on_k_line(data: KLineData) -> None:
+            delivered.append(data.base_volume_asset)
+            if len(delivered) == 1:
+                # Consumer is busy while the producer keeps pushing
+                for volume in (2, 3, 4):
+                    await coalescer.push(get_k_line("BTCUSDT", 0, volume))
+
+        coalescer = KLinesCoalescer(on_k_line, StreamRegistry())
+        await coalescer.start()
+        await coalescer.push(get_k_line("BTCUSDT", 0, 1))
+        await asyncio.wait_for(coalescer.join(), 1)
+        await coalescer.stop()
+
+        assert delivered == [1, 4]
+        assert coalescer.get_stats().collapsed == 2
+
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+import asyncio
+from typing import List
+
+from trading_service.model.processor_models import (
+    KLineData,
+    KLineInterval,
+    OverflowPolicy,
+)
+from trading_service.services.processor import ProcessorId
+from trading_service.services_impl.k_lines_router import KLinesRouter
+from trading_service.utils.stream_registry import StreamRegistry
+
+PROCESSOR_ID = ProcessorId("BTCUSDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+
+
+class RecordingProcessor:
+    def __init__(self) -> None:
+        self.batches: List[List[KLineData]] = list()
+
+    async def update_data_batch(self, data: List[KLineData]) -> None:
+        self.batches.append(data)
+
+
+def get_k_line(start_time: int) -> KLineData:
+    return KLineData(
+        start_time=start_time,
+        symbol=PROCESSOR_ID.symbol,
+        interval=PROCESSOR_ID.interval,
+        open_price=1.0,
+        close_price=1.0,
+        high_price=1.0,
+        low_price=1.0,
+        base_volume_asset=1.0,
+        is_kline_closed=True,
+    )
+
+
+def test_blocked_producer_gives_up_when_processor_is_removed():
+    async def run() -> None:
+        router = KLinesRouter(
+            workers_count=1,
+            max_queue_size=1,
+            overflow_policy=OverflowPolicy.BLOCK,
+            registry=StreamRegistry(),
+        )
+        processor = RecordingProcessor()
+        router.add_processor(PROCESSOR_ID, processor)
+        assert await router.route(get_k_line(0))
+
+        blocked = asyncio.create_task(router.route(get_k_line(1)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        router.remove_processor(PROCESSOR_ID)
+        assert not await asyncio.wait_for(blocked, 1)
+
+        # Workers started now find nothing of the removed processor
+        await router.start()
+        await asyncio.sleep(0.01)
+        await router.stop()
+        assert [data for batch in processor.batches for data in batch] == []
+        stats = router.get_stats()
+        assert (stats.routed, stats.unrouted, stats.queue_depth) == (1, 1, 0)
+
+    asyncio.run(run())
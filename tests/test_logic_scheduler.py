@@ -0,0 +1,82 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List
+
+from trading_service.model.processor_models import KLineInterval
+from trading_service.services.processor import ProcessorId
+from trading_service.services_impl.logic_scheduler import LogicScheduler
+
+START = int(datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp())
+BTC = ProcessorId("BTCUSDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+ETH = ProcessorId("ETHUSDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+
+
+async def on_due(processor_ids: List[ProcessorId]) -> None:
+    pass
+
+
+def get_scheduler() -> LogicScheduler:
+    return LogicScheduler(on_due, now=START)
+
+
+def test_processors_fire_at_their_expression_ticks():
+    scheduler = get_scheduler()
+    scheduler.add_processor(BTC, "*/5 * * * *")
+    scheduler.add_processor(ETH, "0 * * * *")
+
+    assert scheduler.advance(START + 299) == []
+    assert scheduler.advance(START + 300) == [BTC]
+    assert Counter(scheduler.advance(START + 3600)) == {BTC: 11, ETH: 1}
+    assert scheduler.advance(START + 3600) == []
+
+
+def test_expression_is_rescheduled_after_hours_long_gap():
+    scheduler = get_scheduler()
+    scheduler.add_processor(BTC, "0 0 * * *")
+
+    assert scheduler.advance(START + 3 * 86_400) == [BTC] * 3
+
+
+def test_processors_of_same_expression_share_a_timer():
+    scheduler = get_scheduler()
+    scheduler.add_processor(BTC, "* * * * *")
+    scheduler.add_processor(ETH, "* * * * *")
+
+    assert sorted(scheduler.advance(START + 60), key=str) == [BTC, ETH]
+    assert scheduler.get_stats().expressions == 1
+
+
+def test_processor_moves_to_new_expression_and_is_removed():
+    scheduler = get_scheduler()
+    scheduler.add_processor(BTC, "* * * * *")
+    scheduler.add_processor(BTC, "*/2 * * * *")
+
+    assert scheduler.advance(START + 60) == []
+    assert scheduler.advance(START + 120) == [BTC]
+    stats = scheduler.get_stats()
+    assert (stats.expressions, stats.scheduled_processors) == (1, 1)
+
+    scheduler.remove_processor(BTC)
+    assert scheduler.advance(START + 240) == []
+    assert scheduler.get_stats().expressions == 0
+
+
+def test_start_skips_missed_ticks():
+    fired: List[List[ProcessorId]] = list()
+
+    async def record(processor_ids: List[ProcessorId]) -> None:
+        fired.append(processor_ids)
+
+    async def run() -> None:
+        # Created a minute before start, that minute is skipped
+        scheduler = LogicScheduler(record, now=int(time.time()) - 60)
+        scheduler.add_processor(BTC, "* * * * * *")
+        await scheduler.start()
+        await asyncio.sleep(1.1)
+        await scheduler.stop()
+
+    asyncio.run(run())
+    assert 1 <= len(fired) <= 2
+    assert all(processor_ids == [BTC] for processor_ids in fired)
@@ -0,0 +1,174 @@
+import asyncio
+import queue
+from typing import Any, List
+
+from trading_service.model.processor_models import (
+    KLineData,
+    KLineInterval,
+    OverflowPolicy,
+)
+from trading_service.services.processor import LogicType, ProcessorId
+from trading_service.services_impl.processors_manager_pool_impl import (
+    ProcessorsManagerPoolImpl,
+    _ShardCommand,
+)
+
+
+class FakeQueue(queue.Queue):
+    def cancel_join_thread(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FakeProcess:
+    exitcode: int | None = None
+
+    def __init__(self, **kwargs: Any) -> None:
+        self.started = False
+
+    def start(self) -> None:
+        self.started = True
+
+    def is_alive(self) -> bool:
+        return self.started and self.exitcode is None
+
+
+class FakeContext:
+    # Workers are never run, tests acknowledge batches themselves
+    Queue = FakeQueue
+    Process = FakeProcess
+
+
+def create_pool(**kwargs: Any) -> ProcessorsManagerPoolImpl:
+    pool = ProcessorsManagerPoolImpl(None, 1, dict(), **kwargs)
+    pool._context = FakeContext()
+    pool._start_worker(0)
+    return pool
+
+
+def k_line(start_time: int) -> KLineData:
+    return KLineData(
+        start_time=start_time,
+        symbol="BTCUSDT",
+        interval=KLineInterval.K_LINE_INTERVAL_1_MINUTE,
+        open_price=1.0,
+        close_price=1.0,
+        high_price=1.0,
+        low_price=1.0,
+        base_volume_asset=1.0,
+        is_kline_closed=True,
+    )
+
+
+def sent(pool: ProcessorsManagerPoolImpl, shard: int = 0) -> List[Any]:
+    commands = list()
+    while not pool._commands[shard].empty():
+        commands.append(pool._commands[shard].get_nowait())
+    return commands
+
+
+def sent_start_times(pool: ProcessorsManagerPoolImpl) -> List[List[int]]:
+    return [
+        [item[0] for item in args]
+        for command, args in sent(pool)
+        if command == _ShardCommand.K_LINES
+    ]
+
+
+def fill(pool: ProcessorsManagerPoolImpl, count: int) -> None:
+    async def run() -> None:
+        for start_time in range(count):
+            await pool.update_data(k_line(start_time))
+
+    asyncio.run(run())
+
+
+def test_k_lines_wait_for_acknowledged_batches():
+    pool = create_pool(batch_size=1, max_pending_batches=1, max_buffered=8)
+    fill(pool, 3)
+    assert sent_start_times(pool) == [[0]]
+
+    pool._on_batch_done(0)
+    assert sent_start_times(pool) == [[1, 2]]
+    assert pool.dropped == 0
+
+
+def test_drop_newest_keeps_buffered_k_lines():
+    pool = create_pool(
+        batch_size=1,
+        max_pending_batches=1,
+        max_buffered=2,
+        overflow_policy=OverflowPolicy.DROP_NEWEST,
+    )
+    fill(pool, 5)
+    assert pool.dropped == 2
+
+    pool._on_batch_done(0)
+    assert sent_start_times(pool) == [[0], [1, 2]]
+
+
+def test_drop_oldest_keeps_latest_k_lines():
+    pool = create_pool(
+        batch_size=1,
+        max_pending_batches=1,
+        max_buffered=2,
+        overflow_policy=OverflowPolicy.DROP_OLDEST,
+    )
+    fill(pool, 5)
+    assert pool.dropped == 2
+
+    pool._on_batch_done(0)
+    assert sent_start_times(pool) == [[0], [3, 4]]
+
+
+def test_block_waits_for_room_in_buffer():
+    async def run() -> None:
+        pool = create_pool(batch_size=1, max_pending_batches=1, max_buffered=2)
+        for start_time in range(3):
+            await pool.update_data(k_line(start_time))
+
+        blocked = asyncio.create_task(pool.update_data(k_line(3)))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        pool._on_batch_done(0)
+        await asyncio.wait_for(blocked, 1)
+        assert pool.dropped == 0
+        pool._on_batch_done(0)
+        assert sent_start_times(pool) == [[0], [1, 2], [3]]
+
+    asyncio.run(run())
+
+
+def test_dead_worker_is_restarted_with_its_processors():
+    async def run() -> None:
+        pool = create_pool(batch_size=1, max_pending_batches=1, monitor_interval=0.01)
+        processor_id = ProcessorId("BTCUSDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+        await pool.create_processor(
+            "BTCUSDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE, set()
+        )
+        await pool.add_logic(LogicType.HIGH_VOLUME_RAISE, processor_id)
+        # First batch is lost with the worker, second one was never sent
+        await pool.update_data(k_line(0))
+        await pool.update_data(k_line(1))
+        dead_worker, dead_commands = pool._workers[0], pool._commands[0]
+        dead_worker.exitcode = -9
+
+        monitor = asyncio.create_task(pool._monitor_workers())
+        await asyncio.sleep(0.05)
+        monitor.cancel()
+
+        assert pool.restarts == 1
+        assert pool._workers[0] is not dead_worker
+        assert pool._commands[0] is not dead_commands
+        commands = sent(pool)
+        assert [command for command, _ in commands] == [
+            _ShardCommand.CREATE_PROCESSOR,
+            _ShardCommand.ADD_LOGIC,
+            _ShardCommand.K_LINES,
+        ]
+        assert [item[0] for item in commands[-1][1]] == [1]
+
+    asyncio.run(run())
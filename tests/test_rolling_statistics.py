@@ -0,0 +1,119 @@
+import math
+import random
+from typing import List
+
+import pytest
+
+from trading_service.utils.rolling_statistics import RollingStatistics, RollingWindow
+
+LENGTHS = (1, 3, 5)
+
+
+def assert_matches(statistics: RollingStatistics, values: List[float]) -> None:
+    for length in LENGTHS:
+        window = values[-length:]
+        assert statistics.count(length) == len(window)
+        assert statistics.is_full(length) == (len(window) == length)
+        if not window:
+            assert math.isnan(statistics.mean(length))
+            assert math.isnan(statistics.max(length))
+            continue
+
+        mean = sum(window) / len(window)
+        assert statistics.sum(length) == pytest.approx(sum(window))
+        assert statistics.mean(length) == pytest.approx(mean)
+        assert statistics.variance(length) == pytest.approx(
+            sum((value - mean) ** 2 for value in window) / len(window), abs=1e-9
+        )
+        assert statistics.max(length) == max(window)
+        assert statistics.min(length) == min(window)
+
+
+def test_windows_match_brute_force_over_revised_candles():
+    rnd = random.Random(3)
+    statistics = RollingStatistics(LENGTHS)
+    committed: List[float] = list()
+    provisional = None  # (start time, value)
+    start_time = 0
+    assert_matches(statistics, committed)
+    for _ in range(500):
+        value = float(rnd.randrange(10))
+        action = rnd.random()
+        if action < 0.5:
+            # Revision of the open candle
+            assert statistics.update(start_time, value, False)
+            provisional = (start_time, value)
+        elif action < 0.8:
+            assert statistics.update(start_time, value, True)
+            committed.append(value)
+            provisional = None
+            start_time += 1
+        elif action < 0.9:
+            # Close of the open candle was missed, next candle starts
+            if provisional is not None:
+                committed.append(provisional[1])
+                provisional = None
+                start_time += 1
+            assert statistics.update(start_time, value, False)
+            provisional = (start_time, value)
+        elif committed:
+            # Late frame of a committed candle is ignored
+            assert not statistics.update(start_time - 1, value, rnd.random() < 0.5)
+
+        values = committed + ([provisional[1]] if provisional else [])
+        assert_matches(statistics, values)
+        assert statistics.latest == (values[-1] if values else None)
+
+
+def test_provisional_value_replaces_oldest_of_full_window():
+    window = RollingWindow(3)
+    for value in (9.0, 1.0, 2.0):
+        window.commit(value)
+
+    assert window.max() == 9.0
+    # 9 is evicted by the provisional value, max comes from the rest
+    assert window.max(0.0) == 2.0
+    assert window.min(0.0) == 0.0
+    assert window.sum(5.0) == 8.0
+    assert window.count(5.0) == 3
+
+
+def test_length_must_be_positive():
+    with pytest.raises(ValueError):
+        RollingWindow(0)
+
+
+def test_variance_does_not_drift_after_scale_change():
+    rnd = random.Random(5)
+    statistics = RollingStatistics([20])
+    for start_time in range(1000):
+        statistics.update(start_time, 1e9 * rnd.random(), True)
+    prices = [30_000 + rnd.uniform(-0.01, 0.01) for _ in range(30)]
+    for start_time, price in enumerate(prices, 1000):
+        statistics.update(start_time, price, True)
+
+    window = prices[-20:]
+    mean = sum(window) / 20
+    expected = sum((price - mean) ** 2 for price in window) / 20
+    assert statistics.variance(20) == pytest.approx(expected, rel=1e-6)
+    # Provisional revision of the open candle keeps precision too
+    statistics.update(2000, 30_000.02, False)
+    window = window[1:] + [30_000.02]
+    mean = sum(window) / 20
+    expected = sum((price - mean) ** 2 for price in window) / 20
+    assert statistics.variance(20) == pytest.approx(expected, rel=1e-6)
+
+
+def test_variance_stays_exact_over_long_run():
+    rnd = random.Random(9)
+    window = RollingWindow(50)
+    price = 100.0
+    for _ in range(100_000):
+        price *= 1 + rnd.gauss(0, 0.01)
+        window.commit(price)
+
+    values = list(window._values)
+    mean = sum(values) / len(values)
+    expected = sum((value - mean) ** 2 for value in values) / len(values)
+    assert window.variance() == pytest.approx(expected, rel=1e-9)
+    assert window.mean() == pytest.approx(mean, rel=1e-12)
@@ -0,0 +1,78 @@
+from typing import Iterator
+
+import numpy as np
+import pytest
+
+from trading_service.model.processor_models import KLineData, KLineInterval
+from trading_service.services.processor import ProcessorId
+from trading_service.utils.shared_k_line_store import SharedKLineStore
+from trading_service.utils.stream_registry import StreamRegistry
+
+PROCESSOR_ID = ProcessorId("BTCUSDT", KLineInterval.K_LINE_INTERVAL_1_MINUTE)
+
+
+def get_k_line(start_time: int, close_price: float) -> KLineData:
+    return KLineData(
+        start_time=start_time,
+        symbol=PROCESSOR_ID.symbol,
+        interval=PROCESSOR_ID.interval,
+        open_price=close_price,
+        close_price=close_price,
+        high_price=close_price,
+        low_price=close_price,
+        base_volume_asset=1.0,
+        is_kline_closed=True,
+    )
+
+
+@pytest.fixture
+def store() -> Iterator[SharedKLineStore]:
+    store = SharedKLineStore.create(slots=4, capacity=3, registry=StreamRegistry())
+    yield store
+    store.close()
+
+
+def test_read_window_keeps_last_candles_oldest_first(store: SharedKLineStore):
+    for i in range(5):
+        assert store.write(get_k_line(i * 60_000, float(i)))
+
+    window, is_last_closed = store.read_window(PROCESSOR_ID)
+
+    assert window.close_prices.tolist() == [2.0, 3.0, 4.0]
+    assert window.start_times.tolist() == [120_000, 180_000, 240_000]
+    assert is_last_closed
+    assert store.read_window(PROCESSOR_ID, 2)[0].close_prices.tolist() == [3.0, 4.0]
+
+
+def test_write_updates_last_candle_and_skips_older(store: SharedKLineStore):
+    store.write(get_k_line(60_000, 1.0))
+    store.write(get_k_line(60_000, 2.0))
+
+    assert not store.write(get_k_line(0, 3.0))
+    assert store.read_window(PROCESSOR_ID)[0].close_prices.tolist() == [2.0]
+
+
+def test_attached_reader_sees_writes(store: SharedKLineStore):
+    reader = SharedKLineStore.attach(store.name, track=True)
+    try:
+        assert reader.read_window(PROCESSOR_ID) is None
+        store.write(get_k_line(0, 1.0))
+        window, _ = reader.read_window(PROCESSOR_ID)
+        assert window.close_prices.tolist() == [1.0]
+    finally:
+        reader.close()
+
+
+def test_get_window_raises_while_slot_is_written(store: SharedKLineStore):
+    store.write(get_k_line(0, 1.0))
+    slot = store.get_slot(PROCESSOR_ID)
+    sequence = store.get_sequence(slot)
+
+    # Writer died between the two sequence increments
+    store._sequences[slot] = sequence + 1
+    with pytest.raises(TimeoutError):
+        store.get_window(slot)
+
+    store._sequences[slot] = sequence + 2
+    assert store.get_window(slot)[0] == sequence + 2
+    assert np.array_equal(store.read_window(PROCESSOR_ID)[0].close_prices, [1.0])
@@ -0,0 +1,65 @@
+from trading_service.model.processor_models import KLineData, KLineInterval
+from trading_service.services.processor import ProcessorId
+from trading_service.utils.stream_registry import INTERVALS, StreamRegistry
+
+ONE_MINUTE = KLineInterval.K_LINE_INTERVAL_1_MINUTE
+FOUR_HOURS = KLineInterval.K_LINE_INTERVAL_4_HOUR
+
+
+def test_ids_are_stable_and_case_insensitive():
+    registry = StreamRegistry()
+    btc = registry.get_stream_id("BTCUSDT", ONE_MINUTE)
+    eth = registry.get_stream_id("ethusdt", "1m")
+
+    assert btc != eth
+    assert registry.get_stream_id("btcusdt", "1m") == btc
+    assert registry.get_stream_id("ETHUSDT", ONE_MINUTE) == eth
+    assert registry.register_stream("btcusdt@kline_1m") == btc
+    assert registry.find_stream_id("btcusdt@kline_1m") == btc
+    # Ids are never reused, new symbols get the next one
+    assert registry.get_stream_id("BNBUSDT", ONE_MINUTE) == 2 * len(INTERVALS)
+    assert registry.symbols_count == 3
+    assert registry.get_stream_id("BTCUSDT", ONE_MINUTE) == btc
+
+
+def test_stream_id_gives_back_symbol_and_interval():
+    registry = StreamRegistry()
+    stream_id = registry.get_stream_id("btcusdt", FOUR_HOURS)
+
+    assert registry.get_symbol(stream_id) == "BTCUSDT"
+    assert registry.get_interval(stream_id) == FOUR_HOURS
+    assert registry.get_processor_id(stream_id) == ProcessorId("BTCUSDT", FOUR_HOURS)
+    assert registry.get_processor_id(stream_id) is registry.get_processor_id(stream_id)
+    one_minute = StreamRegistry.replace_interval(stream_id, ONE_MINUTE)
+    assert one_minute == registry.get_stream_id("BTCUSDT", ONE_MINUTE)
+    assert stream_id < registry.streams_count
+
+
+def test_find_symbol_stream_id_does_not_register_unknown_symbols():
+    registry = StreamRegistry()
+    stream_id = registry.get_stream_id("BTCUSDT", ONE_MINUTE)
+
+    assert registry.find_symbol_stream_id("BTCUSDT", ONE_MINUTE) == stream_id
+    assert registry.find_symbol_stream_id("btcusdt", "1m") == stream_id
+    assert registry.find_symbol_stream_id("XRPUSDT", ONE_MINUTE) is None
+    assert registry.find_stream_id("xrpusdt@kline_1m") is None
+    assert registry.symbols_count == 1
+
+
+def test_resolve_keeps_id_on_k_line():
+    registry = StreamRegistry()
+    data = KLineData(
+        start_time=0,
+        symbol="BTCUSDT",
+        interval=ONE_MINUTE,
+        open_price=1.0,
+        close_price=1.0,
+        high_price=1.0,
+        low_price=1.0,
+        base_volume_asset=1.0,
+        is_kline_closed=True,
+    )
+
+    stream_id = registry.resolve(data)
+    assert data.stream_id == stream_id == registry.get_stream_id("BTCUSDT", "1m")
+    assert registry.resolve(data) == stream_id
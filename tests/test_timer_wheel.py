@@ -0,0 +1,78 @@
+import random
+from typing import Dict, List
+
+import pytest
+
+from trading_service.utils.timer_wheel import HierarchicalTimerWheel
+
+# Small levels, so timers cascade through all of them and the overflow
+SIZES = (4, 3, 2)
+TOP_SPAN = 4 * 3 * 2
+
+
+def run_until(wheel: HierarchicalTimerWheel, to: int) -> Dict[str, int]:
+    fired_at: Dict[str, int] = dict()
+    while wheel.now < to:
+        for key in wheel.tick():
+            assert key not in fired_at
+            fired_at[key] = wheel.now
+    return fired_at
+
+
+@pytest.mark.parametrize("now", [0, 1, 3, 4, 11, 12, 23, 24, 25])
+def test_every_due_tick_fires_exactly_then(now: int):
+    wheel: HierarchicalTimerWheel[str] = HierarchicalTimerWheel(now, SIZES)
+    dues = {f"timer{due}": due for due in range(now + 1, now + 3 * TOP_SPAN + 2)}
+    for key, due in dues.items():
+        wheel.schedule(key, due)
+
+    assert run_until(wheel, now + 4 * TOP_SPAN) == dues
+    assert len(wheel) == 0
+
+
+def test_timer_scheduled_at_or_before_now_fires_on_next_tick():
+    wheel: HierarchicalTimerWheel[str] = HierarchicalTimerWheel(10, SIZES)
+    wheel.schedule("past", 3)
+    wheel.schedule("now", 10)
+
+    assert sorted(wheel.advance(11)) == ["now", "past"]
+
+
+def test_cancel_and_reschedule():
+    wheel: HierarchicalTimerWheel[str] = HierarchicalTimerWheel(0, SIZES)
+    wheel.schedule("cancelled", 30)
+    wheel.schedule("moved", 50)
+    wheel.schedule("moved", 5)
+
+    assert wheel.cancel("cancelled")
+    assert not wheel.cancel("cancelled")
+    assert "moved" in wheel and "cancelled" not in wheel
+    assert run_until(wheel, 60) == {"moved": 5}
+
+
+def test_random_schedules_match_brute_force():
+    rnd = random.Random(11)
+    wheel: HierarchicalTimerWheel[int] = HierarchicalTimerWheel(7, SIZES)
+    expected: Dict[int, int] = dict()
+    fired: List[tuple] = list()
+    for _ in range(300):
+        action = rnd.random()
+        key = rnd.randrange(50)
+        if action < 0.6:
+            due = wheel.now + rnd.randrange(-2, 3 * TOP_SPAN)
+            wheel.schedule(key, due)
+            expected[key] = max(due, wheel.now + 1)
+        elif action < 0.7:
+            assert wheel.cancel(key) == (key in expected)
+            expected.pop(key, None)
+        else:
+            for _ in range(rnd.randrange(1, 10)):
+                for fired_key in wheel.tick():
+                    fired.append((fired_key, wheel.now))
+                    assert expected.pop(fired_key) == wheel.now
+        assert len(wheel) == len(expected)
+
+    while expected:
+        for fired_key in wheel.tick():
+            assert expected.pop(fired_key) == wheel.now
+    assert fired
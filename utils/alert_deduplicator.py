@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+from ..model.processor_models import DeduplicatorStats
+from ..services.processor import LogicType, ProcessorId
+
+
+@dataclass(slots=True, eq=False)
+class _Entry:
+    start_time: int  # Candle of the last fire
+    fired_at: float
+    touched_at: float  # Last fire or suppressed fire, drives expiry
+    is_armed: bool = False  # Condition was false since the last fire
+
+
+class AlertDeduplicator:
+    # Decides whether a logic trigger becomes an alert. Per (ProcessorId,
+    # LogicType) a trigger is suppressed when the same candle already fired,
+    # within the cooldown of its logic, or, with hysteresis, until `reset`
+    # reports the condition was false. Entries are kept in touch order, so
+    # expired ones are dropped from the front in amortized O(1) and
+    # `max_entries` bounds memory regardless of the symbols count. Entries
+    # evicted by `max_entries` lose cooldown and hysteresis, so it should be
+    # above the count of (ProcessorId, LogicType) pairs that fire
+    _cooldowns: Dict[LogicType, float]  # Seconds between fires per logic
+    _default_cooldown: float
+    _hysteresis: bool
+    _ttl: float  # Entry untouched this long is forgotten
+    _max_entries: int
+    _clock: Callable[[], float]
+    _entries: OrderedDict[Tuple[ProcessorId, LogicType], _Entry]
+    _fired: int = 0
+    _duplicates: int = 0
+    _cooling_down: int = 0
+    _held: int = 0
+    _evicted: int = 0
+
+    def __init__(
+        self,
+        cooldowns: Dict[LogicType, float] | None = None,
+        default_cooldown: float = 0,
+        hysteresis: bool = True,
+        ttl: float = 3600,
+        max_entries: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ttl <= 0 or max_entries <= 0:
+            raise ValueError(
+                f"ttl and max_entries must be positive, got {ttl} and {max_entries}"
+            )
+        # Entry forgotten within its cooldown would let the logic fire again
+        max_cooldown = max((cooldowns or {}).values(), default=0)
+        max_cooldown = max(max_cooldown, default_cooldown)
+        if ttl < max_cooldown:
+            raise ValueError(
+                f"ttl must not be less than any cooldown, got {ttl} and {max_cooldown}"
+            )
+
+        self._cooldowns = dict(cooldowns or {})
+        self._default_cooldown = default_cooldown
+        self._hysteresis = hysteresis
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        entries = self._entries
+        while entries:
+            entry = next(iter(entries.values()))
+            if entry.touched_at + self._ttl > now and len(entries) <= self._max_entries:
+                break
+            entries.popitem(last=False)
+            self._evicted += 1
+
+    def should_fire(
+        self, processor_id: ProcessorId, logic_type: LogicType, start_time: int
+    ) -> bool:
+        now = self._clock()
+        self._evict(now)
+        key = (processor_id, logic_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = _Entry(start_time, now, now)
+            self._evict(now)
+            self._fired += 1
+            return True
+
+        entry.touched_at = now
+        self._entries.move_to_end(key)
+        if entry.start_time == start_time:
+            self._duplicates += 1
+            return False
+        if self._hysteresis and not entry.is_armed:
+            self._held += 1
+            return False
+        if now - entry.fired_at < self._cooldowns.get(
+            logic_type, self._default_cooldown
+        ):
+            self._cooling_down += 1
+            return False
+
+        entry.start_time = start_time
+        entry.fired_at = now
+        entry.is_armed = False
+        self._fired += 1
+        return True
+
+    # Condition of the logic was evaluated false
+    def reset(self, processor_id: ProcessorId, logic_type: LogicType) -> None:
+        entry = self._entries.get((processor_id, logic_type))
+        if entry is not None:
+            entry.is_armed = True
+
+    def get_stats(self) -> DeduplicatorStats:
+        self._evict(self._clock())
+        return DeduplicatorStats(
+            entries=len(self._entries),
+            fired=self._fired,
+            duplicates=self._duplicates,
+            cooling_down=self._cooling_down,
+            held=self._held,
+            evicted=self._evicted,
+        )
@@ -1,23 +1,56 @@
 import asyncio
+from typing import Any, Dict
 
 from ..model.binance_client_models import EventType, KLineData
 from ..model.binance_client_models import KLineDataModel as BinanceKLineData
 from ..model.binance_client_models import KLineInterval
 from ..model.processor_models import KLineData as ProcessorKLineData
-from ..model.processor_models import KLineInterval as ProcessorKLineInterval
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
 
 
-def binance_to_processor_kline_data(data: BinanceKLineData) -> ProcessorKLineData:
+# Symbol is the interned registry copy and `stream_id` is set
+def binance_to_processor_kline_data(
+    data: BinanceKLineData, registry: StreamRegistry = STREAM_REGISTRY
+) -> ProcessorKLineData:
+    stream_id = registry.get_stream_id(data.data.symbol, data.data.interval)
     return ProcessorKLineData(
         data.data.start_time,
-        data.data.symbol,
-        ProcessorKLineInterval(data.data.interval.value),
+        registry.get_symbol(stream_id),
+        data.data.interval,
         data.data.open_price,
         data.data.close_price,
         data.data.high_price,
         data.data.low_price,
         data.data.base_asset_volume,
         data.data.is_kline_closed,
+        data.event_time,
+        stream_id,
+    )
+
+
+# Fast decode path: builds processor model straight from the decoded websocket
+# frame without pydantic validation. Expects kline frame `{"e": "kline", "k": {...}}`.
+# Known `stream_id` of the stream saves symbol and interval lookups
+def raw_to_processor_kline_data(
+    raw_message: Dict[str, Any],
+    stream_id: int | None = None,
+    registry: StreamRegistry = STREAM_REGISTRY,
+) -> ProcessorKLineData:
+    k_line = raw_message["k"]
+    if stream_id is None:
+        stream_id = registry.get_stream_id(k_line["s"], k_line["i"])
+    return ProcessorKLineData(
+        k_line["t"],
+        registry.get_symbol(stream_id),
+        registry.get_interval(stream_id),
+        float(k_line["o"]),
+        float(k_line["c"]),
+        float(k_line["h"]),
+        float(k_line["l"]),
+        float(k_line["v"]),
+        k_line["x"],
+        raw_message.get("E", 0),
+        stream_id,
     )
 
 
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import Final
+from datetime import datetime, timezone
+from typing import Any, Dict, Final, List, Tuple
+
+from ..config import config
 
 
 class BinanceStreamNameUtil:
@@ -30,3 +33,135 @@ class BinanceStreamNameUtil:
             )
 
         return f"{symbol}@kline_{interval}"
+
+    @classmethod
+    def parse_k_line_stream(cls, stream: str) -> Tuple[str, str]:
+        symbol, _, interval = stream.partition("@kline_")
+        if not symbol or interval not in cls.K_LINE_INTERVALS:
+            raise ValueError(f"Invalid k-line stream {stream}")
+
+        return symbol, interval
+
+    # Combined stream endpoint subscribes streams from the URL on connect and
+    # wraps every event as `{"stream": ..., "data": ...}`
+    @staticmethod
+    def get_combined_stream_url(connection_url: str, streams: List[str]) -> str:
+        base_url = connection_url.rstrip("/")
+        if base_url.endswith("/ws"):
+            base_url = base_url[: -len("/ws")]
+        return f"{base_url}/stream?streams={'/'.join(streams)}"
+
+    # Groups of streams each fitting one combined stream connection
+    @classmethod
+    def split_combined_streams(
+        cls,
+        connection_url: str,
+        streams: List[str],
+        max_streams: int = 1024,
+        max_url_length: int = config.BINANCE_COMBINED_STREAM_MAX_URL_LENGTH,
+    ) -> List[List[str]]:
+        base_length = len(cls.get_combined_stream_url(connection_url, []))
+        groups: List[List[str]] = list()
+        group: List[str] = list()
+        length = base_length
+        for stream in streams:
+            added_length = len(stream) + (1 if group else 0)
+            if group and (
+                len(group) >= max_streams or length + added_length > max_url_length
+            ):
+                groups.append(group)
+                group, length, added_length = list(), base_length, len(stream)
+            if length + added_length > max_url_length:
+                raise ValueError(f"Stream {stream} does not fit combined stream URL")
+            group.append(stream)
+            length += added_length
+        if group:
+            groups.append(group)
+
+        return groups
+
+
+class BinanceKLineIntervalUtil:
+    MINUTE_MILLISECONDS: Final[int] = 60_000
+    # Intervals with fixed length are aligned to the unix epoch
+    INTERVAL_MILLISECONDS: Final[Dict[str, int]] = {
+        "1m": 60_000,
+        "3m": 180_000,
+        "5m": 300_000,
+        "15m": 900_000,
+        "30m": 1_800_000,
+        "1h": 3_600_000,
+        "2h": 7_200_000,
+        "4h": 14_400_000,
+        "6h": 21_600_000,
+        "8h": 28_800_000,
+        "12h": 43_200_000,
+        "1d": 86_400_000,
+        "3d": 259_200_000,
+    }
+    WEEK_MILLISECONDS: Final[int] = 604_800_000
+    # Weeks start on Monday, the epoch was a Thursday
+    WEEK_OFFSET_MILLISECONDS: Final[int] = 4 * 86_400_000
+
+    # Open time and next open time of the candle containing `time`, UTC
+    @classmethod
+    def get_bounds(cls, interval: str, time: int) -> Tuple[int, int]:
+        length = cls.INTERVAL_MILLISECONDS.get(interval)
+        if length is not None:
+            open_time = time - time % length
+            return open_time, open_time + length
+
+        if interval == "1w":
+            open_time = (
+                time - (time - cls.WEEK_OFFSET_MILLISECONDS) % cls.WEEK_MILLISECONDS
+            )
+            return open_time, open_time + cls.WEEK_MILLISECONDS
+
+        if interval == "1M":
+            moment = datetime.fromtimestamp(time / 1000, tz=timezone.utc)
+            open_at = datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+            if moment.month == 12:
+                next_open_at = datetime(moment.year + 1, 1, 1, tzinfo=timezone.utc)
+            else:
+                next_open_at = datetime(
+                    moment.year, moment.month + 1, 1, tzinfo=timezone.utc
+                )
+            return (
+                int(open_at.timestamp()) * 1000,
+                int(next_open_at.timestamp()) * 1000,
+            )
+
+        raise ValueError(f"Invalid interval {interval}")
+
+
+class BinanceKLineUtil:
+    # Converts k-line from REST `/api/v3/klines` into websocket kline event shape
+    @staticmethod
+    def rest_k_line_to_event(
+        symbol: str, interval: str, k_line: List[Any], now: int
+    ) -> Dict[str, Any]:
+        symbol = symbol.upper()
+        return {
+            "e": "kline",
+            "E": min(now, k_line[6]),
+            "s": symbol,
+            "k": {
+                "t": k_line[0],
+                "T": k_line[6],
+                "s": symbol,
+                "i": interval,
+                "f": -1,
+                "L": -1,
+                "o": k_line[1],
+                "c": k_line[4],
+                "h": k_line[2],
+                "l": k_line[3],
+                "v": k_line[5],
+                "n": k_line[8],
+                "x": k_line[6] < now,
+                "q": k_line[7],
+                "V": k_line[9],
+                "Q": k_line[10],
+                "B": "0",
+            },
+        }
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+from ..model.processor_models import KLineData
+
+
+class CandleWindow(NamedTuple):
+    # Contiguous read-only views, oldest candle first
+    open_prices: np.ndarray
+    high_prices: np.ndarray
+    low_prices: np.ndarray
+    close_prices: np.ndarray
+    volumes: np.ndarray
+    start_times: np.ndarray
+
+
+class CandleRingBuffer:
+    OPEN: int = 0
+    HIGH: int = 1
+    LOW: int = 2
+    CLOSE: int = 3
+    VOLUME: int = 4
+
+    _capacity: int
+    # Every slot is written twice, at `i` and `i + capacity`, so the last N
+    # candles are always one contiguous slice no matter where the head is
+    _values: np.ndarray  # float64 (5, 2 * capacity)
+    _start_times: np.ndarray  # int64 (2 * capacity)
+    _head: int = -1  # Slot of the latest candle
+    _count: int = 0
+    _is_head_closed: bool = False
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+
+        self._capacity = capacity
+        self._values = np.zeros((5, 2 * capacity), dtype=np.float64)
+        self._start_times = np.zeros(2 * capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def is_last_closed(self) -> bool:
+        return self._is_head_closed
+
+    @property
+    def last_start_time(self) -> int | None:
+        return int(self._start_times[self._head]) if self._count else None
+
+    def _write(self, slot: int, data: KLineData) -> None:
+        values = (
+            data.open_price,
+            data.high_price,
+            data.low_price,
+            data.close_price,
+            data.base_volume_asset,
+        )
+        self._values[:, slot] = values
+        self._values[:, slot + self._capacity] = values
+        self._start_times[slot] = data.start_time
+        self._start_times[slot + self._capacity] = data.start_time
+
+    # Returns False if data is older than the latest candle and was skipped
+    def update(self, data: KLineData) -> bool:
+        if self._count:
+            last_start_time = self._start_times[self._head]
+            if data.start_time < last_start_time:
+                return False
+            if data.start_time == last_start_time:
+                # Revision of the latest candle, overwrite in place
+                self._write(self._head, data)
+                self._is_head_closed = data.is_kline_closed
+                return True
+
+        self._head = (self._head + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+        self._write(self._head, data)
+        self._is_head_closed = data.is_kline_closed
+
+        return True
+
+    # Replaces content with closed candles given oldest first, keeps the
+    # latest ones that fit
+    def load(self, window: CandleWindow) -> None:
+        count = min(len(window.start_times), self._capacity)
+        columns = (
+            window.open_prices,
+            window.high_prices,
+            window.low_prices,
+            window.close_prices,
+            window.volumes,
+        )
+        for column, values in enumerate(columns):
+            self._values[column, :count] = values[len(values) - count :]
+            self._values[column, self._capacity : self._capacity + count] = values[
+                len(values) - count :
+            ]
+        start_times = window.start_times[len(window.start_times) - count :]
+        self._start_times[:count] = start_times
+        self._start_times[self._capacity : self._capacity + count] = start_times
+        self._count = count
+        self._head = count - 1
+        self._is_head_closed = count > 0
+
+    # Keeps the latest candles that fit into new capacity
+    def resize(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+
+        count = min(self._count, capacity)
+        window = self._slice(count)
+        values = np.zeros((5, 2 * capacity), dtype=np.float64)
+        start_times = np.zeros(2 * capacity, dtype=np.int64)
+        values[:, :count] = self._values[:, window]
+        values[:, capacity : capacity + count] = self._values[:, window]
+        start_times[:count] = self._start_times[window]
+        start_times[capacity : capacity + count] = self._start_times[window]
+
+        self._capacity = capacity
+        self._values = values
+        self._start_times = start_times
+        self._count = count
+        self._head = count - 1
+
+    def _slice(self, n: int | None) -> slice:
+        n = self._count if n is None else min(n, self._count)
+        end = self._head + self._capacity + 1
+        return slice(end - n, end)
+
+    def get_column(self, column: int, n: int | None = None) -> np.ndarray:
+        view = self._values[column, self._slice(n)]
+        view.flags.writeable = False
+        return view
+
+    def get_start_times(self, n: int | None = None) -> np.ndarray:
+        view = self._start_times[self._slice(n)]
+        view.flags.writeable = False
+        return view
+
+    def get_window(self, n: int | None = None) -> CandleWindow:
+        window = self._slice(n)
+        views = [self._values[column, window] for column in range(5)]
+        views.append(self._start_times[window])
+        for view in views:
+            view.flags.writeable = False
+
+        return CandleWindow(*views)
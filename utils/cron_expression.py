@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, FrozenSet, List, Tuple
+
+_MONTH_NAMES: Dict[str, int] = {
+    name: number
+    for number, name in enumerate(
+        (
+            "jan",
+            "feb",
+            "mar",
+            "apr",
+            "may",
+            "jun",
+            "jul",
+            "aug",
+            "sep",
+            "oct",
+            "nov",
+            "dec",
+        ),
+        start=1,
+    )
+}
+_DAY_OF_WEEK_NAMES: Dict[str, int] = {
+    name: number
+    for number, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))
+}
+
+# (low, high, names) in croniter six field order:
+# minute hour day_of_month month day_of_week second
+_FIELDS: List[Tuple[int, int, Dict[str, int]]] = [
+    (0, 59, {}),
+    (0, 23, {}),
+    (1, 31, {}),
+    (1, 12, _MONTH_NAMES),
+    (0, 7, _DAY_OF_WEEK_NAMES),
+    (0, 59, {}),
+]
+
+# Calendars repeat every 400 years, but a valid expression matches far sooner
+_MAX_SEARCH_DAYS = 366 * 8
+
+
+def _parse_value(value: str, names: Dict[str, int]) -> int:
+    value = value.lower()
+    if value in names:
+        return names[value]
+    if not value.isdigit():
+        raise ValueError(f"Invalid cron value {value!r}")
+    return int(value)
+
+
+def _parse_field(
+    expression: str, low: int, high: int, names: Dict[str, int]
+) -> FrozenSet[int]:
+    values = set()
+    for part in expression.split(","):
+        range_part, _, step_part = part.partition("/")
+        if step_part and not step_part.isdigit() or step_part == "0":
+            raise ValueError(f"Invalid cron step {part!r}")
+        step = int(step_part) if step_part else 1
+
+        if range_part == "*":
+            start, end = low, high
+        elif "-" in range_part:
+            start_part, end_part = range_part.split("-", 1)
+            start, end = _parse_value(start_part, names), _parse_value(end_part, names)
+        else:
+            start = _parse_value(range_part, names)
+            end = high if step_part else start
+
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron value out of range [{low}, {high}] in {part!r}")
+        values.update(range(start, end + 1, step))
+
+    return frozenset(values)
+
+
+class CronExpression:
+    # Six field expression compiled to value sets once, matching the order
+    # croniter uses: minute hour day_of_month month day_of_week second.
+    # Times are UTC, like k-line times
+    _expression: str
+    _minutes: FrozenSet[int]
+    _hours: FrozenSet[int]
+    _days_of_month: FrozenSet[int]
+    _months: FrozenSet[int]
+    _days_of_week: FrozenSet[int]  # 0 is Sunday
+    _seconds: FrozenSet[int]
+    # Like cron, if both day fields are restricted a day matches either one
+    _is_day_of_month_restricted: bool
+    _is_day_of_week_restricted: bool
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) == 5:
+            fields.append("0")
+        if len(fields) != 6:
+            raise ValueError(
+                f"Cron expression must have 5 or 6 fields, got {expression!r}"
+            )
+
+        self._expression = expression
+        (
+            self._minutes,
+            self._hours,
+            self._days_of_month,
+            self._months,
+            days_of_week,
+            self._seconds,
+        ) = (
+            _parse_field(field, low, high, names)
+            for field, (low, high, names) in zip(fields, _FIELDS)
+        )
+        self._days_of_week = frozenset(day % 7 for day in days_of_week)
+        self._is_day_of_month_restricted = fields[2] != "*"
+        self._is_day_of_week_restricted = fields[4] != "*"
+
+    @property
+    def expression(self) -> str:
+        return self._expression
+
+    def _is_day_matching(self, moment: datetime) -> bool:
+        is_day_of_month = moment.day in self._days_of_month
+        is_day_of_week = (moment.weekday() + 1) % 7 in self._days_of_week
+        if self._is_day_of_month_restricted and self._is_day_of_week_restricted:
+            return is_day_of_month or is_day_of_week
+        return is_day_of_month and is_day_of_week
+
+    def matches(self, timestamp: int) -> bool:
+        moment = datetime.fromtimestamp(timestamp, timezone.utc)
+        return (
+            moment.second in self._seconds
+            and moment.minute in self._minutes
+            and moment.hour in self._hours
+            and moment.month in self._months
+            and self._is_day_matching(moment)
+        )
+
+    # First matching unix second strictly after `timestamp`
+    def get_next(self, timestamp: int) -> int:
+        moment = datetime.fromtimestamp(timestamp + 1, timezone.utc)
+        limit = moment + timedelta(days=_MAX_SEARCH_DAYS)
+        # Every mismatching field skips to the start of its next value
+        while moment < limit:
+            if moment.month not in self._months:
+                moment = (moment.replace(day=1) + timedelta(days=32)).replace(
+                    day=1, hour=0, minute=0, second=0
+                )
+            elif not self._is_day_matching(moment):
+                moment = (moment + timedelta(days=1)).replace(
+                    hour=0, minute=0, second=0
+                )
+            elif moment.hour not in self._hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0, second=0)
+            elif moment.minute not in self._minutes:
+                moment = (moment + timedelta(minutes=1)).replace(second=0)
+            elif moment.second not in self._seconds:
+                moment += timedelta(seconds=1)
+            else:
+                return int(moment.timestamp())
+
+        raise ValueError(f"Cron expression {self._expression!r} never matches")
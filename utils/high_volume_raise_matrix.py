@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from ..model.processor_models import HighRiseType, KLineData, ProcessorConfig
+from ..services.processor import ProcessorId
+
+
+class HighVolumeRaiseMatrix:
+    # Closed candle volumes of every processor of one interval as a
+    # (processors x window) matrix, so HIGH_VOLUME_RAISE is evaluated for all
+    # symbols that closed a candle with a single set of array operations.
+    # Every row is a ring, `_positions` points to the slot of the next candle
+    _ids: List[ProcessorId]  # Row -> processor
+    _rows: Dict[ProcessorId, int]
+    _width: int
+    _lengths: List[int]  # Distinct window lengths used by any row
+    _volumes: np.ndarray  # float64 (capacity, width)
+    _positions: np.ndarray  # int64 (capacity)
+    _counts: np.ndarray  # int64 (capacity), closed candles seen
+    _open_prices: np.ndarray  # float64 (capacity), of the latest closed candle
+    _close_prices: np.ndarray  # float64 (capacity)
+    _ratios: np.ndarray  # float64 (capacity), `volume_rise_ratio`
+    _check_types: np.ndarray  # int8 (capacity), `HighRiseType` value
+    _required: np.ndarray  # bool (capacity, len(lengths)), row uses length
+    _enabled: np.ndarray  # bool (capacity), HIGH_VOLUME_RAISE is running
+    _last_data: List[KLineData | None]  # Latest closed candle by row
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._ids = list()
+        self._rows = dict()
+        self._width = 1
+        self._lengths = list()
+        self._last_data = list()
+        self._volumes = np.zeros((capacity, self._width), dtype=np.float64)
+        self._positions = np.zeros(capacity, dtype=np.int64)
+        self._counts = np.zeros(capacity, dtype=np.int64)
+        self._open_prices = np.zeros(capacity, dtype=np.float64)
+        self._close_prices = np.zeros(capacity, dtype=np.float64)
+        self._ratios = np.zeros(capacity, dtype=np.float64)
+        self._check_types = np.zeros(capacity, dtype=np.int8)
+        self._required = np.zeros((capacity, 0), dtype=bool)
+        self._enabled = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, processor_id: ProcessorId) -> bool:
+        return processor_id in self._rows
+
+    def _grow_rows(self) -> None:
+        capacity = 2 * len(self._positions)
+        for name in (
+            "_volumes",
+            "_positions",
+            "_counts",
+            "_open_prices",
+            "_close_prices",
+            "_ratios",
+            "_check_types",
+            "_required",
+            "_enabled",
+        ):
+            array: np.ndarray = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[: len(array)] = array
+            setattr(self, name, grown)
+
+    def _grow_width(self, width: int) -> None:
+        # Rewrites every ring oldest-to-newest starting at slot 0
+        rows = len(self._ids)
+        order = (
+            self._positions[:rows, None] + np.arange(self._width)[None, :]
+        ) % self._width
+        volumes = np.zeros((len(self._volumes), width), dtype=np.float64)
+        kept = np.minimum(self._counts[:rows], self._width)
+        linear = np.take_along_axis(self._volumes[:rows], order, axis=1)
+        for row in range(rows):
+            volumes[row, : kept[row]] = linear[row, self._width - kept[row] :]
+        self._positions[:rows] = kept % width
+        self._counts[:rows] = kept
+        self._volumes = volumes
+        self._width = width
+
+    def _add_length(self, length: int) -> int:
+        self._lengths.append(length)
+        required = np.zeros((len(self._required), len(self._lengths)), dtype=bool)
+        required[:, :-1] = self._required
+        self._required = required
+        if length > self._width:
+            self._grow_width(length)
+
+        return len(self._lengths) - 1
+
+    def add(self, processor_id: ProcessorId, config: ProcessorConfig) -> None:
+        if processor_id in self._rows:
+            self.set_config(processor_id, config)
+            return
+
+        if len(self._ids) == len(self._positions):
+            self._grow_rows()
+
+        row = len(self._ids)
+        self._ids.append(processor_id)
+        self._rows[processor_id] = row
+        self._last_data.append(None)
+        self._volumes[row] = 0
+        self._positions[row] = 0
+        self._counts[row] = 0
+        self._enabled[row] = False
+        self.set_config(processor_id, config)
+
+    def remove(self, processor_id: ProcessorId) -> None:
+        row = self._rows.pop(processor_id, None)
+        if row is None:
+            return
+
+        # Move the last row into the freed one
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            for array in (
+                self._volumes,
+                self._positions,
+                self._counts,
+                self._open_prices,
+                self._close_prices,
+                self._ratios,
+                self._check_types,
+                self._required,
+                self._enabled,
+            ):
+                array[row] = array[last]
+            self._ids[row] = moved_id
+            self._last_data[row] = self._last_data[last]
+            self._rows[moved_id] = row
+        self._ids.pop()
+        self._last_data.pop()
+
+    def set_config(self, processor_id: ProcessorId, config: ProcessorConfig) -> None:
+        row = self._rows[processor_id]
+        high_rise_config = config.high_rise_config
+        self._ratios[row] = high_rise_config.volume_rise_ratio
+        self._check_types[row] = high_rise_config.check_type.value
+        self._required[row] = False
+        for length in high_rise_config.process_intervals:
+            column = (
+                self._lengths.index(length)
+                if length in self._lengths
+                else self._add_length(length)
+            )
+            self._required[row, column] = True
+
+    def set_enabled(self, processor_id: ProcessorId, is_enabled: bool) -> None:
+        self._enabled[self._rows[processor_id]] = is_enabled
+
+    def update_closed(self, processor_id: ProcessorId, data: KLineData) -> None:
+        row = self._rows[processor_id]
+        position = self._positions[row]
+        self._volumes[row, position] = data.base_volume_asset
+        self._positions[row] = (position + 1) % self._width
+        self._counts[row] += 1
+        self._open_prices[row] = data.open_price
+        self._close_prices[row] = data.close_price
+        self._last_data[row] = data
+
+    # Volumes of closed candles oldest first, replaces ring content
+    def load_closed(self, processor_id: ProcessorId, volumes: np.ndarray) -> None:
+        row = self._rows[processor_id]
+        kept = volumes[len(volumes) - min(len(volumes), self._width) :]
+        self._volumes[row] = 0
+        self._volumes[row, : len(kept)] = kept
+        self._positions[row] = len(kept) % self._width
+        self._counts[row] = len(volumes)
+
+    def get_last_data(self, processor_id: ProcessorId) -> KLineData | None:
+        return self._last_data[self._rows[processor_id]]
+
+    def evaluate(self, processor_ids: Iterable[ProcessorId]) -> List[ProcessorId]:
+        rows = np.fromiter(
+            (self._rows[id] for id in processor_ids if id in self._rows),
+            dtype=np.int64,
+        )
+        if not len(rows):
+            return []
+
+        volumes = self._volumes[rows]
+        positions = self._positions[rows]
+        counts = self._counts[rows]
+        current = volumes[np.arange(len(rows)), (positions - 1) % self._width]
+        ratios = self._ratios[rows]
+
+        open_prices = self._open_prices[rows]
+        close_prices = self._close_prices[rows]
+        check_types = self._check_types[rows]
+        triggered = self._enabled[rows] & np.where(
+            check_types == HighRiseType.UP.value,
+            close_prices > open_prices,
+            np.where(
+                check_types == HighRiseType.DOWN.value,
+                close_prices < open_prices,
+                close_prices != open_prices,
+            ),
+        )
+
+        # Same rule as ProcessorImpl: latest volume against the average of the
+        # other `length - 1` candles of every window the row is configured with
+        for column, length in enumerate(self._lengths):
+            required = self._required[rows, column]
+            if length < 2:
+                triggered &= ~required
+                continue
+            previous = (positions[:, None] - 1 - np.arange(1, length)[None, :]) % (
+                self._width
+            )
+            average = np.take_along_axis(volumes, previous, axis=1).mean(axis=1)
+            is_raised = (counts >= length) & (current >= average * ratios)
+            triggered &= is_raised | ~required
+
+        return [self._ids[row] for row in rows[triggered]]
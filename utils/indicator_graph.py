@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, Dict, Final, Iterable, NamedTuple, Set, Tuple
+
+from ..model.processor_models import KLineData
+from ..utils.candle_ring_buffer import CandleWindow
+from ..utils.rolling_statistics import RollingStatistics
+
+
+class IndicatorKind:
+    # Plain ints keep indicator keys cheap to hash
+    # Read from rolling windows of a column
+    LATEST: Final[int] = 0  # Value of the latest candle, open or closed
+    COUNT: Final[int] = 1
+    SUM: Final[int] = 2
+    VARIANCE: Final[int] = 3
+    MAX: Final[int] = 4
+    MIN: Final[int] = 5
+    # Computed from other indicators
+    MEAN: Final[int] = 6
+    STD: Final[int] = 7
+    MEAN_BEFORE_LATEST: Final[int] = 8  # Window without the latest candle
+
+
+class Indicator(NamedTuple):
+    kind: int  # IndicatorKind
+    column: int  # CandleRingBuffer column
+    length: int = 1  # Window length in candles, windows end at the latest one
+
+
+# Values of the columns by CandleRingBuffer column index
+_COLUMN_GETTERS: Final[Tuple[Callable[[KLineData], float], ...]] = (
+    lambda data: data.open_price,
+    lambda data: data.high_price,
+    lambda data: data.low_price,
+    lambda data: data.close_price,
+    lambda data: data.base_volume_asset,
+)
+
+_WINDOW_KINDS: Final[Set[int]] = {
+    IndicatorKind.COUNT,
+    IndicatorKind.SUM,
+    IndicatorKind.VARIANCE,
+    IndicatorKind.MAX,
+    IndicatorKind.MIN,
+}
+
+
+def get_dependencies(indicator: Indicator) -> Tuple[Indicator, ...]:
+    kind, column, length = indicator
+    if kind == IndicatorKind.MEAN:
+        return (
+            Indicator(IndicatorKind.SUM, column, length),
+            Indicator(IndicatorKind.COUNT, column, length),
+        )
+    if kind == IndicatorKind.STD:
+        return (Indicator(IndicatorKind.VARIANCE, column, length),)
+    if kind == IndicatorKind.MEAN_BEFORE_LATEST:
+        return (
+            Indicator(IndicatorKind.SUM, column, length),
+            Indicator(IndicatorKind.LATEST, column),
+        )
+    return ()
+
+
+class IndicatorGraph:
+    # Indicators declared by logics and their dependencies, each distinct one
+    # is a single node however many logics need it. Rolling windows are kept
+    # per column for the union of window lengths. Values are computed on the
+    # first read after a candle update and cached until the next update
+    _declared: Set[Indicator]
+    # Declared ones and everything they depend on, with their dependencies
+    _nodes: Dict[Indicator, Tuple[Indicator, ...]]
+    _statistics: Dict[int, RollingStatistics]  # By column
+    _cache: Dict[Indicator, float]
+    _last_committed_start_time: int | None = None
+    computations: int = 0  # Indicator values computed, cache misses
+
+    def __init__(self, indicators: Iterable[Indicator]) -> None:
+        self._declared = set(indicators)
+        self._nodes = dict()
+        pending = list(self._declared)
+        while pending:
+            indicator = pending.pop()
+            if indicator not in self._nodes:
+                dependencies = get_dependencies(indicator)
+                self._nodes[indicator] = dependencies
+                pending.extend(dependencies)
+
+        lengths_by_column: Dict[int, Set[int]] = dict()
+        for kind, column, length in self._nodes:
+            lengths = lengths_by_column.setdefault(column, set())
+            if kind in _WINDOW_KINDS:
+                lengths.add(length)
+        self._statistics = {
+            column: RollingStatistics(lengths)
+            for column, lengths in lengths_by_column.items()
+        }
+        self._cache = dict()
+
+    @property
+    def indicators(self) -> Set[Indicator]:
+        return set(self._declared)
+
+    @property
+    def nodes(self) -> Set[Indicator]:
+        return set(self._nodes)
+
+    @property
+    def max_length(self) -> int:
+        return max((length for _, _, length in self._nodes), default=1)
+
+    # Returns False if data belongs to an already closed candle
+    def update(self, data: KLineData) -> bool:
+        if (
+            self._last_committed_start_time is not None
+            and data.start_time <= self._last_committed_start_time
+        ):
+            return False
+
+        for column, statistics in self._statistics.items():
+            statistics.update(
+                data.start_time, _COLUMN_GETTERS[column](data), data.is_kline_closed
+            )
+        if data.is_kline_closed:
+            self._last_committed_start_time = data.start_time
+        self._cache.clear()
+
+        return True
+
+    # Replays candles given oldest first, the last one may be still open
+    def load(self, window: CandleWindow, is_last_closed: bool) -> None:
+        columns = (
+            window.open_prices,
+            window.high_prices,
+            window.low_prices,
+            window.close_prices,
+            window.volumes,
+        )
+        start_times = window.start_times.tolist()
+        for column, statistics in self._statistics.items():
+            for i, (start_time, value) in enumerate(
+                zip(start_times, columns[column].tolist())
+            ):
+                is_closed = i < len(start_times) - 1 or is_last_closed
+                statistics.update(start_time, value, is_closed)
+        closed_count = len(start_times) - (0 if is_last_closed else 1)
+        if closed_count > 0:
+            self._last_committed_start_time = start_times[closed_count - 1]
+        self._cache.clear()
+
+    def get(self, indicator: Indicator) -> float:
+        value = self._cache.get(indicator)
+        if value is None:
+            if indicator not in self._nodes:
+                raise KeyError(f"Indicator {indicator} was not declared")
+            value = self._cache[indicator] = self._compute(indicator)
+            self.computations += 1
+        return value
+
+    def _compute(self, indicator: Indicator) -> float:
+        kind, column, length = indicator
+        statistics = self._statistics[column]
+        if kind == IndicatorKind.LATEST:
+            latest = statistics.latest
+            return math.nan if latest is None else latest
+        if kind == IndicatorKind.COUNT:
+            return float(statistics.count(length))
+        if kind == IndicatorKind.SUM:
+            return statistics.sum(length)
+        if kind == IndicatorKind.VARIANCE:
+            return statistics.variance(length)
+        if kind == IndicatorKind.MAX:
+            return statistics.max(length)
+        if kind == IndicatorKind.MIN:
+            return statistics.min(length)
+
+        dependencies = [self.get(dependency) for dependency in self._nodes[indicator]]
+        if kind == IndicatorKind.MEAN:
+            total, count = dependencies
+            return total / count if count else math.nan
+        if kind == IndicatorKind.STD:
+            return math.sqrt(dependencies[0])
+        if kind == IndicatorKind.MEAN_BEFORE_LATEST:
+            total, latest = dependencies
+            return (total - latest) / (length - 1) if length > 1 else math.nan
+
+        raise ValueError(f"Unknown indicator kind {kind}")
@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import asyncio
+import mmap
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Final, Iterator, List, Tuple, Type
+
+import numpy as np
+from loguru import logger
+
+from ..config import config
+from ..model.processor_models import KLineData, KLineInterval
+
+K_LINE_RECORD_DTYPE: Final[np.dtype] = np.dtype(
+    {
+        "names": [
+            "start_time",
+            "received_at",  # Unix milliseconds when the frame was journaled
+            "open_price",
+            "high_price",
+            "low_price",
+            "close_price",
+            "base_volume_asset",
+            "stream_id",
+            "is_kline_closed",
+        ],
+        "formats": ["<i8", "<i8", "<f8", "<f8", "<f8", "<f8", "<f8", "<u4", "u1"],
+        "offsets": [0, 8, 16, 24, 32, 40, 48, 56, 60],
+        "itemsize": 64,
+    }
+)
+
+_MAGIC: Final[bytes] = b"KLJOURN1"
+_HEADER_SIZE: Final[int] = K_LINE_RECORD_DTYPE.itemsize  # Magic, records count
+_SEGMENT_SUFFIX: Final[str] = ".journal"
+_STREAMS_FILE_NAME: Final[str] = "streams.txt"
+
+
+@dataclass(slots=True)
+class _StreamIndex:
+    # Positions of every record of the stream within a segment, so reads
+    # gather only its rows. Start time of every `index_interval`-th of them
+    # bounds the positions range a time range read looks at, unless a record
+    # came after a later candle and reads filter all positions
+    positions: array = field(default_factory=lambda: array("q"))
+    start_times: List[int] = field(default_factory=list)
+    min_start_time: int = 0
+    max_start_time: int = 0
+    is_ordered: bool = True  # Start times do not decrease
+
+
+@dataclass(slots=True, eq=False)
+class _Segment:
+    path: str
+    memory: mmap.mmap
+    count: np.ndarray  # int64 (1), records count in the file header
+    records: np.ndarray  # K_LINE_RECORD_DTYPE (capacity)
+    streams: Dict[int, _StreamIndex] = field(default_factory=dict)
+    last_received_at: int = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.memory)
+
+    def close(self) -> None:
+        self.count = self.records = None
+        self.memory.close()
+
+
+class KLineJournal:
+    # Append-only record of received k-lines in fixed size memory mapped
+    # segment files. Records of all streams are interleaved, an index per
+    # stream and segment keeps their positions, with a sparse start time
+    # index over them, so a read gathers only rows of its stream. Appends are
+    # collected and written in batches by a single writer thread, so the event
+    # loop never waits for the disk
+    _directory: str
+    _segment_size: int
+    _index_interval: int
+    _batch_size: int
+    _flush_interval: float
+    _closed_only: bool
+    _max_age: float | None  # Seconds, segments are deleted as a whole
+    _max_size: int | None  # Bytes over all segments
+
+    _stream_ids: Dict[Tuple[str, KLineInterval], int]
+    _new_streams: List[Tuple[str, KLineInterval]]  # Not in streams file yet
+    _pending: List[tuple]  # Records not handed to the writer yet
+    _segments: List[_Segment]  # Oldest first, last one is appended to
+    _lock: threading.Lock  # Guards segments between writer and readers
+    _executor: ThreadPoolExecutor  # Single thread keeps batches in order
+    _flush_task: asyncio.Task | None = None
+    _write_futures: List[asyncio.Future]
+    _next_segment_number: int = 0
+
+    def __init__(
+        self,
+        directory: str = config.K_LINE_JOURNAL_DIRECTORY,
+        segment_size: int = config.K_LINE_JOURNAL_SEGMENT_SIZE,
+        index_interval: int = 64,
+        batch_size: int = 1024,
+        flush_interval: float = 0.5,
+        closed_only: bool = False,
+        max_age: float | None = config.K_LINE_JOURNAL_MAX_AGE,
+        max_size: int | None = config.K_LINE_JOURNAL_MAX_SIZE,
+    ) -> None:
+        if segment_size < 2 * _HEADER_SIZE:
+            raise ValueError(f"segment_size is too small, got {segment_size}")
+
+        self._directory = directory
+        self._segment_size = segment_size
+        self._index_interval = index_interval
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._closed_only = closed_only
+        self._max_age = max_age
+        self._max_size = max_size
+        self._stream_ids = dict()
+        self._new_streams = list()
+        self._pending = list()
+        self._segments = list()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="k-line-journal")
+        self._write_futures = list()
+
+    @classmethod
+    async def create(cls: Type[KLineJournal], **kwargs) -> KLineJournal:
+        this = cls(**kwargs)
+        await asyncio.get_running_loop().run_in_executor(this._executor, this._open)
+        this._flush_task = asyncio.create_task(this._run_flusher())
+
+        return this
+
+    def _open(self) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        streams_path = os.path.join(self._directory, _STREAMS_FILE_NAME)
+        if os.path.exists(streams_path):
+            with open(streams_path) as streams_file:
+                for line in streams_file:
+                    symbol, interval = line.split()
+                    key = (symbol, KLineInterval(interval))
+                    self._stream_ids[key] = len(self._stream_ids)
+
+        numbers = sorted(
+            int(name[: -len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self._directory)
+            if name.endswith(_SEGMENT_SUFFIX)
+        )
+        for number in numbers:
+            segment = self._map_segment(self._get_segment_path(number))
+            if segment is not None:
+                self._rebuild_index(segment)
+                self._segments.append(segment)
+        self._next_segment_number = numbers[-1] + 1 if numbers else 0
+        logger.info(
+            f"Opened k-line journal {self._directory} with {len(self._segments)} "
+            f"segments and {len(self._stream_ids)} streams"
+        )
+
+    def _get_segment_path(self, number: int) -> str:
+        return os.path.join(self._directory, f"{number:08d}{_SEGMENT_SUFFIX}")
+
+    def _map_segment(self, path: str) -> _Segment | None:
+        with open(path, "r+b") as segment_file:
+            memory = mmap.mmap(segment_file.fileno(), 0)
+        if memory[: len(_MAGIC)] != _MAGIC:
+            logger.warning(f"Skipping {path}, it is not a k-line journal segment")
+            memory.close()
+            return None
+
+        capacity = (len(memory) - _HEADER_SIZE) // K_LINE_RECORD_DTYPE.itemsize
+        return _Segment(
+            path,
+            memory,
+            np.ndarray((1,), dtype=np.int64, buffer=memory, offset=len(_MAGIC)),
+            np.ndarray(
+                (capacity,),
+                dtype=K_LINE_RECORD_DTYPE,
+                buffer=memory,
+                offset=_HEADER_SIZE,
+            ),
+        )
+
+    def _new_segment(self) -> _Segment:
+        path = self._get_segment_path(self._next_segment_number)
+        self._next_segment_number += 1
+        with open(path, "w+b") as segment_file:
+            segment_file.truncate(self._segment_size)
+            segment_file.write(_MAGIC)
+
+        return self._map_segment(path)
+
+    def _rebuild_index(self, segment: _Segment) -> None:
+        records = segment.records[: int(segment.count[0])]
+        if not len(records):
+            return
+
+        self._index_records(segment, records, 0)
+        segment.last_received_at = int(records["received_at"].max())
+
+    # Records were written to the segment starting at `position`
+    def _index_records(
+        self, segment: _Segment, records: np.ndarray, position: int
+    ) -> None:
+        streams = segment.streams
+        for record_position, (stream_id, start_time) in enumerate(
+            zip(records["stream_id"].tolist(), records["start_time"].tolist()),
+            position,
+        ):
+            index = streams.get(stream_id)
+            if index is None:
+                index = streams[stream_id] = _StreamIndex(
+                    min_start_time=start_time, max_start_time=start_time
+                )
+            if len(index.positions) % self._index_interval == 0:
+                index.start_times.append(start_time)
+            index.positions.append(record_position)
+            if start_time < index.max_start_time:
+                index.is_ordered = False
+                if start_time < index.min_start_time:
+                    index.min_start_time = start_time
+            else:
+                index.max_start_time = start_time
+
+    def _get_stream_id(self, symbol: str, interval: KLineInterval) -> int:
+        key = (symbol, interval)
+        stream_id = self._stream_ids.get(key)
+        if stream_id is None:
+            stream_id = self._stream_ids[key] = len(self._stream_ids)
+            self._new_streams.append(key)
+        return stream_id
+
+    def append(self, data: KLineData) -> None:
+        if self._closed_only and not data.is_kline_closed:
+            return
+
+        self._pending.append(
+            (
+                data.start_time,
+                time.time_ns() // 1_000_000,
+                data.open_price,
+                data.high_price,
+                data.low_price,
+                data.close_price,
+                data.base_volume_asset,
+                self._get_stream_id(data.symbol, data.interval),
+                data.is_kline_closed,
+            )
+        )
+        if len(self._pending) >= self._batch_size:
+            self._submit()
+
+    async def update_data(self, data: KLineData) -> None:
+        self.append(data)
+
+    def _submit(self) -> None:
+        if not self._pending and not self._new_streams:
+            return
+
+        records = np.array(self._pending, dtype=K_LINE_RECORD_DTYPE)
+        new_streams = self._new_streams
+        self._pending = list()
+        self._new_streams = list()
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._write_batch, records, new_streams
+        )
+        self._write_futures = [
+            write_future
+            for write_future in self._write_futures
+            if not write_future.done()
+        ]
+        self._write_futures.append(future)
+
+    # Waits until every appended record is in the mapped segments
+    async def flush(self) -> None:
+        self._submit()
+        if self._write_futures:
+            await asyncio.gather(*self._write_futures)
+            self._write_futures.clear()
+
+    async def _run_flusher(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+                if self._max_age is not None:
+                    # Segments age out while no new one is rolled over to
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._apply_retention_locked
+                    )
+            except Exception as e:
+                logger.exception(f"Failed to write k-line journal batch {e}")
+
+    def _write_batch(
+        self, records: np.ndarray, new_streams: List[Tuple[str, KLineInterval]]
+    ) -> None:
+        if new_streams:
+            # Streams are known on disk before records that refer to them
+            streams_path = os.path.join(self._directory, _STREAMS_FILE_NAME)
+            with open(streams_path, "a") as streams_file:
+                streams_file.writelines(
+                    f"{symbol} {interval.value}\n" for symbol, interval in new_streams
+                )
+
+        written = 0
+        while written < len(records):
+            with self._lock:
+                if not self._segments or self._is_full(self._segments[-1]):
+                    self._roll_over()
+                written += self._write_to_segment(self._segments[-1], records[written:])
+
+    def _is_full(self, segment: _Segment) -> bool:
+        return int(segment.count[0]) == len(segment.records)
+
+    def _roll_over(self) -> None:
+        if self._segments:
+            self._segments[-1].memory.flush()
+        self._segments.append(self._new_segment())
+        self._apply_retention()
+
+    def _apply_retention_locked(self) -> None:
+        with self._lock:
+            self._apply_retention()
+
+    def _apply_retention(self) -> None:
+        now = time.time_ns() // 1_000_000
+        total_size = sum(segment.size for segment in self._segments)
+        # Segment being written is always kept
+        while len(self._segments) > 1:
+            oldest = self._segments[0]
+            is_too_old = (
+                self._max_age is not None
+                and oldest.last_received_at < now - self._max_age * 1000
+            )
+            is_too_big = self._max_size is not None and total_size > self._max_size
+            if not is_too_old and not is_too_big:
+                break
+
+            self._segments.pop(0)
+            total_size -= oldest.size
+            oldest.close()
+            os.remove(oldest.path)
+            logger.info(f"Removed k-line journal segment {oldest.path}")
+
+    def _write_to_segment(self, segment: _Segment, records: np.ndarray) -> int:
+        position = int(segment.count[0])
+        records = records[: len(segment.records) - position]
+        segment.records[position : position + len(records)] = records
+        self._index_records(segment, records, position)
+        segment.last_received_at = max(
+            segment.last_received_at, int(records["received_at"].max())
+        )
+        # Count goes last, records before it are complete after a crash
+        segment.count[0] = position + len(records)
+
+        return len(records)
+
+    # Last `count` closed candles of every stream, oldest first, one record per
+    # start time. Segments are scanned newest first and each only once for
+    # all streams, stopping when every stream has enough candles
+    def read_last_closed(
+        self, streams: List[Tuple[str, KLineInterval]], count: int
+    ) -> Dict[Tuple[str, KLineInterval], np.ndarray]:
+        keys_by_id = {
+            self._stream_ids[key]: key for key in streams if key in self._stream_ids
+        }
+        chunks: Dict[int, List[np.ndarray]] = {
+            stream_id: [] for stream_id in keys_by_id
+        }
+        needed = set(keys_by_id)
+        with self._lock:
+            for segment in reversed(self._segments):
+                if not needed:
+                    break
+
+                for stream_id in [id for id in needed if id in segment.streams]:
+                    positions = np.frombuffer(
+                        segment.streams[stream_id].positions[:], dtype=np.int64
+                    )
+                    records = segment.records[positions]
+                    records = records[records["is_kline_closed"] == 1]
+                    if not len(records):
+                        continue
+
+                    chunks[stream_id].append(records)
+                    collected = np.concatenate(chunks[stream_id])
+                    if (
+                        len(collected) >= count
+                        and len(np.unique(collected["start_time"])) >= count
+                    ):
+                        needed.discard(stream_id)
+
+        result: Dict[Tuple[str, KLineInterval], np.ndarray] = dict()
+        for stream_id, key in keys_by_id.items():
+            if not chunks[stream_id]:
+                result[key] = np.empty(0, dtype=K_LINE_RECORD_DTYPE)
+                continue
+
+            records = np.concatenate(chunks[stream_id][::-1])
+            # Latest record of every start time, ordered by start time
+            reversed_records = records[::-1]
+            _, latest = np.unique(reversed_records["start_time"], return_index=True)
+            result[key] = reversed_records[latest][-count:]
+
+        return result
+
+    # Records of all streams in journal order, copied segment by segment
+    def iterate_segments(self) -> Iterator[np.ndarray]:
+        for segment in list(self._segments):
+            with self._lock:
+                if segment.records is None:
+                    continue
+                records = segment.records[: int(segment.count[0])].copy()
+            yield records
+
+    # Stream id is the position in the list
+    def get_streams(self) -> List[Tuple[str, KLineInterval]]:
+        return list(self._stream_ids)
+
+    # Records of one stream with `start_time <= k-line start <= end_time` in
+    # journal order, which includes every revision of open candles
+    def read(
+        self,
+        symbol: str,
+        interval: KLineInterval,
+        start_time: int | None = None,
+        end_time: int | None = None,
+    ) -> np.ndarray:
+        stream_id = self._stream_ids.get((symbol, interval))
+        if stream_id is None:
+            return np.empty(0, dtype=K_LINE_RECORD_DTYPE)
+
+        low = np.iinfo(np.int64).min if start_time is None else start_time
+        high = np.iinfo(np.int64).max if end_time is None else end_time
+        chunks: List[np.ndarray] = list()
+        with self._lock:
+            for segment in self._segments:
+                index = segment.streams.get(stream_id)
+                if (
+                    index is None
+                    or index.max_start_time < low
+                    or index.min_start_time > high
+                ):
+                    continue
+
+                begin, end = 0, len(index.positions)
+                if index.is_ordered:
+                    # Sample `i` is start time of the record at `positions[i * n]`
+                    first = bisect_left(index.start_times, low) - 1
+                    begin = max(first, 0) * self._index_interval
+                    last = bisect_right(index.start_times, high)
+                    end = last * self._index_interval
+                # Slices are copies, array can still grow while they are used
+                positions = np.frombuffer(index.positions[begin:end], dtype=np.int64)
+                records = segment.records[positions]
+                mask = (records["start_time"] >= low) & (records["start_time"] <= high)
+                chunks.append(records[mask])
+
+        if not chunks:
+            return np.empty(0, dtype=K_LINE_RECORD_DTYPE)
+        return np.concatenate(chunks)
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._close_segments
+        )
+        self._executor.shutdown()
+
+    def _close_segments(self) -> None:
+        with self._lock:
+            for segment in self._segments:
+                segment.memory.flush()
+                segment.close()
+            self._segments.clear()
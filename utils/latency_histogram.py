@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import math
+from typing import Iterator, List, Tuple
+
+
+class LatencyHistogram:
+    # Log-linear buckets like HdrHistogram: values below 2 ** significant_bits
+    # are exact, above them every power of 2 range is split into
+    # 2 ** (significant_bits - 1) equal buckets, so the relative error is at
+    # most 2 ** (1 - significant_bits). Values are integers, nanoseconds here
+    _significant_bits: int
+    _sub_buckets: int  # 2 ** significant_bits
+    _max_value: int  # Larger values are counted as this one
+    _counts: List[int]  # Grows up to the bucket of the largest value seen
+    count: int = 0
+    total: int = 0
+    min: int = 0
+    max: int = 0
+
+    def __init__(self, significant_bits: int = 8, max_value: int = 3_600 * 10**9):
+        if not 2 <= significant_bits <= 16:
+            raise ValueError(
+                f"significant_bits must be in [2, 16], got {significant_bits}"
+            )
+        if max_value <= 0:
+            raise ValueError(f"max_value must be positive, got {max_value}")
+
+        self._significant_bits = significant_bits
+        self._sub_buckets = 1 << significant_bits
+        self._max_value = max_value
+        self._counts = [0] * self._sub_buckets
+
+    def _get_index(self, value: int) -> int:
+        if value < self._sub_buckets:
+            return value
+        shift = value.bit_length() - self._significant_bits
+        return (shift << (self._significant_bits - 1)) + (value >> shift)
+
+    def _get_bounds(self, index: int) -> Tuple[int, int]:
+        # Lowest and highest value counted in the bucket
+        if index < self._sub_buckets:
+            return index, index
+        shift = (index >> (self._significant_bits - 1)) - 1
+        low = (index - (shift << (self._significant_bits - 1))) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+        elif value > self._max_value:
+            value = self._max_value
+
+        index = self._get_index(value)
+        counts = self._counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def get_percentile(self, percentile: float) -> int:
+        if not 0 <= percentile <= 100:
+            raise ValueError(f"percentile must be in [0, 100], got {percentile}")
+        if not self.count:
+            return 0
+
+        target = max(1, math.ceil(self.count * percentile / 100))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                # Highest equivalent value, but never beyond what was recorded
+                return max(self.min, min(self._get_bounds(index)[1], self.max))
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    # Not empty buckets as (lowest value, highest value, count)
+    def iterate_buckets(self) -> Iterator[Tuple[int, int, int]]:
+        for index, count in enumerate(self._counts):
+            if count:
+                yield *self._get_bounds(index), count
+
+    def merge(self, other: LatencyHistogram) -> None:
+        if other._significant_bits != self._significant_bits:
+            raise ValueError("Histograms with different precision cannot be merged")
+        if not other.count:
+            return
+
+        if len(other._counts) > len(self._counts):
+            self._counts.extend([0] * (len(other._counts) - len(self._counts)))
+        for index, count in enumerate(other._counts):
+            self._counts[index] += count
+        self.min = min(self.min, other.min) if self.count else other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def reset(self) -> None:
+        self._counts = [0] * self._sub_buckets
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
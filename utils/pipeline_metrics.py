@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import time
+from enum import Enum
+from typing import Dict, List, Tuple
+
+from ..model.processor_models import LatencyStats, PipelineStats
+from ..utils.latency_histogram import LatencyHistogram
+
+
+class PipelineStage(str, Enum):
+    DECODE = "decode"  # json.loads of a frame
+    PARSE = "parse"  # pydantic model or fast decode to processor k-line
+    MAP = "map"  # Binance model to processor k-line
+    JOURNAL = "journal"
+    PROCESS = "process"  # Listener callback, routing and processors included
+    LOGIC = "logic"  # Logics evaluation of a processor or an interval batch
+    TOTAL = "total"  # Frame receive to the end of its dispatch
+    LOOP_LAG = "loop_lag"  # Event loop delay before a ready task runs
+
+
+class PipelineMetrics:
+    # Latency histograms per stage, exchange lag and per stream message
+    # counts of the k-lines pipeline. Instrumented code takes it as optional
+    # argument and only checks for None when it is not passed.
+    # Durations are nanoseconds from `time.perf_counter_ns`
+    _stages: Dict[PipelineStage, LatencyHistogram]
+    _exchange_lag: LatencyHistogram
+    _stream_counts: Dict[Tuple[str, str], int]  # By (symbol, interval)
+    _stream_first_seen: Dict[Tuple[str, str], float]  # Monotonic seconds
+    _significant_bits: int
+
+    def __init__(self, significant_bits: int = 8) -> None:
+        self._significant_bits = significant_bits
+        self.reset()
+
+    def reset(self) -> None:
+        self._stages = {
+            stage: LatencyHistogram(self._significant_bits) for stage in PipelineStage
+        }
+        self._exchange_lag = LatencyHistogram(self._significant_bits)
+        self._stream_counts = dict()
+        self._stream_first_seen = dict()
+
+    def record(self, stage: PipelineStage, duration: int) -> None:
+        self._stages[stage].record(duration)
+
+    # Called once per received event frame
+    def record_event(self, raw_message: dict) -> None:
+        event_time = raw_message.get("E")
+        if event_time:
+            # Clocks are not synchronized, negative lag is counted as zero
+            self._exchange_lag.record(time.time_ns() - event_time * 1_000_000)
+
+        k_line = raw_message.get("k")
+        if k_line is not None:
+            key = (k_line["s"], k_line["i"])
+            count = self._stream_counts.get(key)
+            if count is None:
+                self._stream_first_seen[key] = time.monotonic()
+                count = 0
+            self._stream_counts[key] = count + 1
+
+    def get_histogram(self, stage: PipelineStage) -> LatencyHistogram:
+        return self._stages[stage]
+
+    @property
+    def exchange_lag(self) -> LatencyHistogram:
+        return self._exchange_lag
+
+    def get_stream_counts(self) -> Dict[Tuple[str, str], int]:
+        return dict(self._stream_counts)
+
+    # Average since the first message of every stream
+    def get_stream_rates(self) -> Dict[Tuple[str, str], float]:
+        now = time.monotonic()
+        return {
+            key: count / max(now - self._stream_first_seen[key], 1.0)
+            for key, count in self._stream_counts.items()
+        }
+
+    @staticmethod
+    def _get_latency_stats(histogram: LatencyHistogram) -> LatencyStats:
+        return LatencyStats(
+            count=histogram.count,
+            mean=histogram.mean / 1e9,
+            p50=histogram.get_percentile(50) / 1e9,
+            p99=histogram.get_percentile(99) / 1e9,
+            max=histogram.max / 1e9,
+        )
+
+    def get_stats(self) -> PipelineStats:
+        return PipelineStats(
+            stages={
+                stage.value: self._get_latency_stats(histogram)
+                for stage, histogram in self._stages.items()
+                if histogram.count
+            },
+            exchange_lag=self._get_latency_stats(self._exchange_lag),
+            stream_rates={
+                f"{symbol.lower()}@kline_{interval}": rate
+                for (symbol, interval), rate in sorted(self.get_stream_rates().items())
+            },
+        )
+
+    def to_prometheus(
+        self,
+        prefix: str = "trading",
+        quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99, 0.999, 1.0),
+    ) -> str:
+        lines: List[str] = list()
+
+        def add_summary(name: str, labels: str, histogram: LatencyHistogram) -> None:
+            separator = "," if labels else ""
+            for quantile in quantiles:
+                value = histogram.get_percentile(quantile * 100) / 1e9
+                lines.append(
+                    f'{name}{{{labels}{separator}quantile="{quantile}"}} {value:.9f}'
+                )
+            braces = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{braces} {histogram.total / 1e9:.9f}")
+            lines.append(f"{name}_count{braces} {histogram.count}")
+
+        name = f"{prefix}_pipeline_stage_seconds"
+        lines.append(f"# HELP {name} Duration of k-lines pipeline stages")
+        lines.append(f"# TYPE {name} summary")
+        for stage, histogram in self._stages.items():
+            add_summary(name, f'stage="{stage.value}"', histogram)
+
+        name = f"{prefix}_exchange_lag_seconds"
+        lines.append(f"# HELP {name} Event time of a frame to its receive")
+        lines.append(f"# TYPE {name} summary")
+        add_summary(name, "", self._exchange_lag)
+
+        name = f"{prefix}_stream_messages_total"
+        lines.append(f"# HELP {name} Received k-line messages by stream")
+        lines.append(f"# TYPE {name} counter")
+        for (symbol, interval), count in sorted(self._stream_counts.items()):
+            lines.append(f'{name}{{symbol="{symbol}",interval="{interval}"}} {count}')
+
+        return "\n".join(lines) + "\n"
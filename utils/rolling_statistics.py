@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, Dict, Final, Iterable, List, Tuple
+
+
+# Squared deviations sum below this share of the largest squared deviation
+# its updates went through has lost most digits to cancellation
+_RESYNC_RATIO: Final[float] = 1e-9
+
+
+def _add(count: int, total: float, m2: float, value: float) -> Tuple[float, float]:
+    # Welford update of the squared deviations sum, mean is `total / count`
+    if not count:
+        return value, 0.0
+    delta = value - total / count
+    total += value
+    return total, m2 + delta * (value - total / (count + 1))
+
+
+def _remove(count: int, total: float, m2: float, value: float) -> Tuple[float, float]:
+    if count == 1:
+        return 0.0, 0.0
+    mean = total / count
+    total -= value
+    return total, m2 - (value - total / (count - 1)) * (value - mean)
+
+
+class RollingWindow:
+    # Statistics over last `length` values where the newest one may be
+    # provisional (candle still open). Committed values are kept in a running
+    # sum, Welford squared deviations sum and monotonic deques, the provisional
+    # one is combined at query time, so revising it retracts the previous
+    # provisional value in O(1). Sums are recomputed from the window once
+    # updates of a far larger scale cancelled out, e.g. after a price regime
+    # change, so they do not drift in a long running process
+    _length: int
+    _values: Deque[float]  # Last `length` committed values
+    _sum: float = 0.0
+    _m2: float = 0.0  # Sum of squared deviations from the mean
+    _scale: float = 0.0  # Largest squared deviation since the last recompute
+    _max_deque: Deque[Tuple[int, float]]  # (index, value), values decreasing
+    _min_deque: Deque[Tuple[int, float]]  # (index, value), values increasing
+    _index: int = 0  # Index of the next committed value
+
+    def __init__(self, length: int) -> None:
+        if length <= 0:
+            raise ValueError(f"length must be positive, got {length}")
+
+        self._length = length
+        self._values = deque()
+        self._max_deque = deque()
+        self._min_deque = deque()
+
+    @property
+    def length(self) -> int:
+        return self._length
+
+    def _recompute(self) -> None:
+        self._sum = math.fsum(self._values)
+        mean = self._sum / len(self._values)
+        self._m2 = math.fsum((value - mean) ** 2 for value in self._values)
+        self._scale = self._m2
+
+    def commit(self, value: float) -> None:
+        values = self._values
+        total, m2, scale = self._sum, self._m2, self._scale
+        count = len(values)
+        if count == self._length:
+            old = values.popleft()
+            mean = total / count
+            total -= old
+            count -= 1
+            delta = old - mean
+            m2 -= (old - total / count) * delta if count else m2
+            if delta * delta > scale:
+                scale = delta * delta
+        if count:
+            delta = value - total / count
+            total += value
+            m2 += delta * (value - total / (count + 1))
+            if delta * delta > scale:
+                scale = delta * delta
+        else:
+            total, m2 = value, 0.0
+        values.append(value)
+        self._sum, self._m2, self._scale = total, m2, scale
+        if m2 < scale * (count + 1) * _RESYNC_RATIO:
+            self._recompute()
+
+        oldest_index = self._index - self._length + 1
+        while self._max_deque and self._max_deque[-1][1] <= value:
+            self._max_deque.pop()
+        self._max_deque.append((self._index, value))
+        while self._max_deque[0][0] < oldest_index:
+            self._max_deque.popleft()
+        while self._min_deque and self._min_deque[-1][1] >= value:
+            self._min_deque.pop()
+        self._min_deque.append((self._index, value))
+        while self._min_deque[0][0] < oldest_index:
+            self._min_deque.popleft()
+
+        self._index += 1
+
+    def _is_evicted_by_provisional(self, index: int) -> bool:
+        # Provisional value takes the place of the oldest committed one
+        return len(self._values) == self._length and index == self._index - self._length
+
+    def count(self, provisional: float | None = None) -> int:
+        if provisional is None:
+            return len(self._values)
+        return min(len(self._values) + 1, self._length)
+
+    def is_full(self, provisional: float | None = None) -> bool:
+        return self.count(provisional) == self._length
+
+    def sum(self, provisional: float | None = None) -> float:
+        if provisional is None:
+            return self._sum
+        if len(self._values) == self._length:
+            return self._sum - self._values[0] + provisional
+        return self._sum + provisional
+
+    def mean(self, provisional: float | None = None) -> float:
+        count = self.count(provisional)
+        return self.sum(provisional) / count if count else math.nan
+
+    def variance(self, provisional: float | None = None) -> float:
+        count = self.count(provisional)
+        if not count:
+            return math.nan
+
+        m2 = self._m2
+        if provisional is not None:
+            total = self._sum
+            committed = len(self._values)
+            if committed == self._length:
+                total, m2 = _remove(committed, total, m2, self._values[0])
+                committed -= 1
+            _, m2 = _add(committed, total, m2, provisional)
+        # Rounding may leave it slightly below zero
+        return max(0.0, m2 / count)
+
+    def _extremum(
+        self, monotonic_deque: Deque[Tuple[int, float]], provisional: float | None
+    ) -> List[float]:
+        # Second deque item is the extremum of values after the first one, so
+        # dropping the evicted oldest value stays O(1)
+        candidates: List[float] = list()
+        if monotonic_deque:
+            index, value = monotonic_deque[0]
+            if provisional is None or not self._is_evicted_by_provisional(index):
+                candidates.append(value)
+            elif len(monotonic_deque) > 1:
+                candidates.append(monotonic_deque[1][1])
+        if provisional is not None:
+            candidates.append(provisional)
+
+        return candidates
+
+    def max(self, provisional: float | None = None) -> float:
+        candidates = self._extremum(self._max_deque, provisional)
+        return max(candidates) if candidates else math.nan
+
+    def min(self, provisional: float | None = None) -> float:
+        candidates = self._extremum(self._min_deque, provisional)
+        return min(candidates) if candidates else math.nan
+
+
+class RollingStatistics:
+    # Keeps every configured window over one stream of per-candle values.
+    # `update` follows k-line frames: open candle revisions replace the
+    # provisional value, close commits it into all windows
+    _windows: Dict[int, RollingWindow]
+    _provisional: float | None = None
+    _provisional_start_time: int | None = None
+    _last_committed: float | None = None
+    _last_committed_start_time: int | None = None
+
+    def __init__(self, window_lengths: Iterable[int]) -> None:
+        self._windows = {
+            length: RollingWindow(length) for length in set(window_lengths)
+        }
+
+    @property
+    def window_lengths(self) -> List[int]:
+        return sorted(self._windows)
+
+    @property
+    def provisional(self) -> float | None:
+        return self._provisional
+
+    @property
+    def latest(self) -> float | None:
+        return self._last_committed if self._provisional is None else self._provisional
+
+    def get_window(self, length: int) -> RollingWindow:
+        return self._windows[length]
+
+    def _commit(self, start_time: int, value: float) -> None:
+        for window in self._windows.values():
+            window.commit(value)
+        self._last_committed = value
+        self._last_committed_start_time = start_time
+
+    # Returns False if value belongs to an already committed candle
+    def update(self, start_time: int, value: float, is_closed: bool) -> bool:
+        if (
+            self._last_committed_start_time is not None
+            and start_time <= self._last_committed_start_time
+        ):
+            return False
+
+        if (
+            self._provisional_start_time is not None
+            and self._provisional_start_time < start_time
+        ):
+            # Close frame of previous candle was missed, commit its last revision
+            self._commit(self._provisional_start_time, self._provisional)
+
+        if is_closed:
+            self._commit(start_time, value)
+            self._provisional = None
+            self._provisional_start_time = None
+        else:
+            self._provisional = value
+            self._provisional_start_time = start_time
+
+        return True
+
+    # Windows end at the latest candle, either provisional or the last committed
+    def sum(self, length: int) -> float:
+        return self._windows[length].sum(self._provisional)
+
+    def mean(self, length: int) -> float:
+        return self._windows[length].mean(self._provisional)
+
+    def variance(self, length: int) -> float:
+        return self._windows[length].variance(self._provisional)
+
+    def std(self, length: int) -> float:
+        return math.sqrt(self.variance(length))
+
+    def max(self, length: int) -> float:
+        return self._windows[length].max(self._provisional)
+
+    def min(self, length: int) -> float:
+        return self._windows[length].min(self._provisional)
+
+    def count(self, length: int) -> int:
+        return self._windows[length].count(self._provisional)
+
+    def is_full(self, length: int) -> bool:
+        return self._windows[length].is_full(self._provisional)
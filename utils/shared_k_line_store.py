@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import sys
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Final, List, Tuple, Type
+
+import numpy as np
+
+from ..model.processor_models import KLineData, KLineInterval
+from ..services.processor import ProcessorId
+from ..utils.candle_ring_buffer import CandleRingBuffer, CandleWindow
+from ..utils.stream_registry import STREAM_REGISTRY, StreamRegistry
+
+_MAGIC: Final[int] = 0x4B4C494E45530001
+_HEADER_SIZE: Final[int] = 8  # int64 items: magic, slots, capacity, used slots
+_SYMBOL_SIZE: Final[int] = 24
+_INTERVAL_SIZE: Final[int] = 8
+# Seqlock readers spin that many times, then yield the CPU between retries
+_SPINS: Final[int] = 100
+_RETRIES: Final[int] = 10_000
+
+
+def _get_layout(slots: int, capacity: int) -> List[Tuple[str, np.dtype, tuple]]:
+    # Every array starts at a multiple of 8 bytes
+    return [
+        ("_header", np.dtype(np.int64), (_HEADER_SIZE,)),
+        ("_sequences", np.dtype(np.int64), (slots,)),
+        ("_heads", np.dtype(np.int64), (slots,)),
+        ("_counts", np.dtype(np.int64), (slots,)),
+        ("_is_closed", np.dtype(np.int64), (slots,)),
+        ("_symbols", np.dtype(f"S{_SYMBOL_SIZE}"), (slots,)),
+        ("_intervals", np.dtype(f"S{_INTERVAL_SIZE}"), (slots,)),
+        ("_values", np.dtype(np.float64), (slots, 5, 2 * capacity)),
+        ("_start_times", np.dtype(np.int64), (slots, 2 * capacity)),
+    ]
+
+
+class SharedKLineStore:
+    # Ring buffer per (symbol, interval) in one shared memory segment, laid out
+    # like CandleRingBuffer, so any process reads the last N candles as
+    # contiguous NumPy views over the segment without copying.
+    # Only one process writes. Every slot has a seqlock: sequence is odd while
+    # the slot is written, readers retry if it was odd or changed during read
+    OPEN: int = CandleRingBuffer.OPEN
+    HIGH: int = CandleRingBuffer.HIGH
+    LOW: int = CandleRingBuffer.LOW
+    CLOSE: int = CandleRingBuffer.CLOSE
+    VOLUME: int = CandleRingBuffer.VOLUME
+
+    _memory: SharedMemory
+    _is_owner: bool  # Unlinks the segment on close
+    _slots: int
+    _capacity: int
+    _slot_by_id: Dict[ProcessorId, int]  # Local copy of slots key table
+    # Slots of written streams, ids are local to the registry of the process
+    _slot_by_stream_id: Dict[int, int]
+    _registry: StreamRegistry
+    _header: np.ndarray
+    _sequences: np.ndarray
+    _heads: np.ndarray  # Slot of the latest candle within the ring
+    _counts: np.ndarray
+    _is_closed: np.ndarray
+    _symbols: np.ndarray
+    _intervals: np.ndarray
+    _values: np.ndarray  # float64 (slots, 5, 2 * capacity)
+    _start_times: np.ndarray  # int64 (slots, 2 * capacity)
+
+    def __init__(
+        self,
+        memory: SharedMemory,
+        is_owner: bool,
+        is_writable: bool = True,
+        registry: StreamRegistry = STREAM_REGISTRY,
+    ) -> None:
+        self._memory = memory
+        self._is_owner = is_owner
+        header = np.ndarray((_HEADER_SIZE,), dtype=np.int64, buffer=memory.buf)
+        if header[0] != _MAGIC:
+            raise ValueError(f"Shared memory {memory.name} is not a k-line store")
+
+        self._slots = int(header[1])
+        self._capacity = int(header[2])
+        offset = 0
+        for name, dtype, shape in _get_layout(self._slots, self._capacity):
+            array = np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)
+            if not is_writable:
+                array.flags.writeable = False
+            setattr(self, name, array)
+            offset += array.nbytes
+        self._slot_by_id = dict()
+        self._slot_by_stream_id = dict()
+        self._registry = registry
+        self._refresh_index()
+
+    @classmethod
+    def create(
+        cls: Type[SharedKLineStore],
+        slots: int = 1024,
+        capacity: int = 512,
+        name: str | None = None,
+        registry: StreamRegistry = STREAM_REGISTRY,
+    ) -> SharedKLineStore:
+        if slots <= 0 or capacity <= 0:
+            raise ValueError(
+                f"slots and capacity must be positive, got {slots} and {capacity}"
+            )
+
+        size = sum(
+            dtype.itemsize * int(np.prod(shape))
+            for _, dtype, shape in _get_layout(slots, capacity)
+        )
+        memory = SharedMemory(name, create=True, size=size)
+        header = np.ndarray((_HEADER_SIZE,), dtype=np.int64, buffer=memory.buf)
+        header[:] = 0
+        header[1] = slots
+        header[2] = capacity
+        header[0] = _MAGIC
+
+        return cls(memory, is_owner=True, registry=registry)
+
+    @classmethod
+    def attach(
+        cls: Type[SharedKLineStore],
+        name: str,
+        is_writable: bool = False,
+        registry: StreamRegistry = STREAM_REGISTRY,
+        track: bool = False,
+    ) -> SharedKLineStore:
+        # Tracker of the attaching process would unlink the segment when that
+        # process exits. Children of the creator share its tracker, where
+        # unregistering drops the creator's record, so they pass `track=True`
+        if sys.version_info >= (3, 13):
+            memory = SharedMemory(name, track=track)
+        else:
+            memory = SharedMemory(name)
+            if not track:
+                resource_tracker.unregister(memory._name, "shared_memory")
+
+        return cls(memory, is_owner=False, is_writable=is_writable, registry=registry)
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def _refresh_index(self) -> None:
+        for slot in range(len(self._slot_by_id), int(self._header[3])):
+            processor_id = ProcessorId(
+                self._symbols[slot].decode(),
+                KLineInterval(self._intervals[slot].decode()),
+            )
+            self._slot_by_id[processor_id] = slot
+
+    def get_slot(self, processor_id: ProcessorId) -> int | None:
+        slot = self._slot_by_id.get(processor_id)
+        if slot is None and len(self._slot_by_id) != self._header[3]:
+            # Writer added slots since the last lookup
+            self._refresh_index()
+            slot = self._slot_by_id.get(processor_id)
+        return slot
+
+    def get_processor_ids(self) -> List[ProcessorId]:
+        self._refresh_index()
+        return list(self._slot_by_id)
+
+    def add_slot(self, processor_id: ProcessorId) -> int:
+        slot = self._slot_by_id.get(processor_id)
+        if slot is not None:
+            return slot
+
+        slot = int(self._header[3])
+        if slot == self._slots:
+            raise ValueError(f"All {self._slots} slots are used")
+
+        self._symbols[slot] = processor_id.symbol.encode()
+        self._intervals[slot] = processor_id.interval.value.encode()
+        self._heads[slot] = -1
+        self._counts[slot] = 0
+        # Readers see the key before the slot is counted as used
+        self._header[3] = slot + 1
+        self._slot_by_id[processor_id] = slot
+
+        return slot
+
+    # Returns False if data is older than the latest candle and was skipped
+    def write(self, data: KLineData) -> bool:
+        stream_id = self._registry.resolve(data)
+        slot = self._slot_by_stream_id.get(stream_id)
+        if slot is None:
+            slot = self._slot_by_stream_id[stream_id] = self.add_slot(
+                self._registry.get_processor_id(stream_id)
+            )
+
+        head = int(self._heads[slot])
+        count = int(self._counts[slot])
+        if count:
+            last_start_time = self._start_times[slot, head]
+            if data.start_time < last_start_time:
+                return False
+            if data.start_time != last_start_time:
+                head = (head + 1) % self._capacity
+                count = min(count + 1, self._capacity)
+        else:
+            head, count = 0, 1
+
+        values = (
+            data.open_price,
+            data.high_price,
+            data.low_price,
+            data.close_price,
+            data.base_volume_asset,
+        )
+        sequence = self._sequences[slot]
+        self._sequences[slot] = sequence + 1
+        self._values[slot, :, head] = values
+        self._values[slot, :, head + self._capacity] = values
+        self._start_times[slot, head] = data.start_time
+        self._start_times[slot, head + self._capacity] = data.start_time
+        self._heads[slot] = head
+        self._counts[slot] = count
+        self._is_closed[slot] = data.is_kline_closed
+        self._sequences[slot] = sequence + 2
+
+        return True
+
+    async def update_data(self, data: KLineData) -> None:
+        self.write(data)
+
+    def get_sequence(self, slot: int) -> int:
+        return int(self._sequences[slot])
+
+    # Even sequence of the slot, raises TimeoutError if the writer holds it
+    # for too long, e.g. it died in the middle of a write
+    def _wait_sequence(self, slot: int) -> int:
+        for retry in range(_RETRIES):
+            sequence = int(self._sequences[slot])
+            if sequence % 2 == 0:
+                return sequence
+            if retry >= _SPINS:
+                time.sleep(0)
+        raise TimeoutError(f"Slot {slot} of {self.name} is still being written")
+
+    # Views are valid only if `is_unchanged(slot, sequence)` holds after use
+    def get_window(
+        self, slot: int, n: int | None = None
+    ) -> Tuple[int, CandleWindow, bool]:
+        sequence = self._wait_sequence(slot)
+
+        count = int(self._counts[slot])
+        n = count if n is None else min(n, count)
+        end = int(self._heads[slot]) + self._capacity + 1
+        window = slice(end - n, end)
+        values = self._values[slot]
+        views = CandleWindow(
+            values[self.OPEN, window],
+            values[self.HIGH, window],
+            values[self.LOW, window],
+            values[self.CLOSE, window],
+            values[self.VOLUME, window],
+            self._start_times[slot, window],
+        )
+        for view in views:
+            view.flags.writeable = False
+
+        return sequence, views, bool(self._is_closed[slot])
+
+    def is_unchanged(self, slot: int, sequence: int) -> bool:
+        return self._sequences[slot] == sequence
+
+    # Consistent copy of the last `n` candles, oldest first
+    def read_window(
+        self, processor_id: ProcessorId, n: int | None = None
+    ) -> Tuple[CandleWindow, bool] | None:
+        slot = self.get_slot(processor_id)
+        if slot is None:
+            return None
+
+        for retry in range(_RETRIES):
+            sequence, views, is_last_closed = self.get_window(slot, n)
+            window = CandleWindow(*(view.copy() for view in views))
+            if self.is_unchanged(slot, sequence):
+                return window, is_last_closed
+            if retry >= _SPINS:
+                time.sleep(0)
+        raise TimeoutError(f"Slot {slot} of {self.name} keeps changing")
+
+    def close(self) -> None:
+        # Views keep the buffer exported, drop them before closing
+        for name, _, _ in _get_layout(self._slots, self._capacity):
+            setattr(self, name, None)
+        self._memory.close()
+        if self._is_owner:
+            self._memory.unlink()
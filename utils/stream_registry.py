@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import sys
+from typing import Dict, Final, List, Tuple
+
+from ..model.processor_models import KLineData, KLineInterval
+from ..services.processor import ProcessorId
+from ..utils.binance_utils import BinanceStreamNameUtil
+
+INTERVALS: Final[Tuple[KLineInterval, ...]] = tuple(KLineInterval)
+# Interval is a str enum, both members and plain values find their id
+INTERVAL_IDS: Final[Dict[str, int]] = {
+    interval.value: i for i, interval in enumerate(INTERVALS)
+}
+
+
+class StreamRegistry:
+    # Dense integer ids of symbols and k-line streams, given out when a stream
+    # is subscribed or a processor is added. Stream id is
+    # `symbol_id * len(INTERVALS) + interval_id`, so tables keyed by stream
+    # are plain lists and the interval of a symbol is a sum. Symbols are
+    # interned once and k-lines carry that copy instead of the one decoded
+    # from every frame. Ids are never reused
+    _symbol_ids: Dict[str, int]  # By symbol as received and upper case
+    _symbols: List[str]  # Upper case, by symbol id
+    _stream_ids_by_name: Dict[str, int]  # By stream name, `btcusdt@kline_1m`
+    _processor_ids: List[ProcessorId | None]  # By stream id, built on first use
+
+    def __init__(self) -> None:
+        self._symbol_ids = dict()
+        self._symbols = list()
+        self._stream_ids_by_name = dict()
+        self._processor_ids = list()
+
+    @property
+    def symbols_count(self) -> int:
+        return len(self._symbols)
+
+    # Every stream id is less than that
+    @property
+    def streams_count(self) -> int:
+        return len(self._symbols) * len(INTERVALS)
+
+    def get_symbol_id(self, symbol: str) -> int:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            upper_symbol = sys.intern(symbol.upper())
+            symbol_id = self._symbol_ids.get(upper_symbol)
+            if symbol_id is None:
+                symbol_id = len(self._symbols)
+                self._symbols.append(upper_symbol)
+                self._symbol_ids[upper_symbol] = symbol_id
+            self._symbol_ids[sys.intern(symbol)] = symbol_id
+        return symbol_id
+
+    def get_stream_id(self, symbol: str, interval: KLineInterval | str) -> int:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.get_symbol_id(symbol)
+        return symbol_id * len(INTERVALS) + INTERVAL_IDS[interval]
+
+    # Like `get_stream_id`, but None instead of a new id for an unknown symbol
+    def find_symbol_stream_id(
+        self, symbol: str, interval: KLineInterval | str
+    ) -> int | None:
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._symbol_ids.get(symbol.upper())
+            if symbol_id is None:
+                return None
+        return symbol_id * len(INTERVALS) + INTERVAL_IDS[interval]
+
+    # Registers k-line stream name for `find_stream_id`
+    def register_stream(self, stream: str) -> int:
+        stream_id = self._stream_ids_by_name.get(stream)
+        if stream_id is None:
+            symbol, interval = BinanceStreamNameUtil.parse_k_line_stream(stream)
+            stream_id = self._stream_ids_by_name[
+                sys.intern(stream)
+            ] = self.get_stream_id(symbol, interval)
+        return stream_id
+
+    def find_stream_id(self, stream: str) -> int | None:
+        return self._stream_ids_by_name.get(stream)
+
+    def get_symbol(self, stream_id: int) -> str:
+        return self._symbols[stream_id // len(INTERVALS)]
+
+    def get_interval(self, stream_id: int) -> KLineInterval:
+        return INTERVALS[stream_id % len(INTERVALS)]
+
+    # Stream of the same symbol with another interval
+    @staticmethod
+    def replace_interval(stream_id: int, interval: KLineInterval | str) -> int:
+        return stream_id - stream_id % len(INTERVALS) + INTERVAL_IDS[interval]
+
+    def get_processor_id(self, stream_id: int) -> ProcessorId:
+        processor_ids = self._processor_ids
+        if stream_id >= len(processor_ids):
+            processor_ids.extend([None] * (self.streams_count - len(processor_ids)))
+        processor_id = processor_ids[stream_id]
+        if processor_id is None:
+            processor_id = processor_ids[stream_id] = ProcessorId(
+                self.get_symbol(stream_id), self.get_interval(stream_id)
+            )
+        return processor_id
+
+    # Id of k-lines built without one is resolved once and kept on them
+    def resolve(self, data: KLineData) -> int:
+        stream_id = data.stream_id
+        if stream_id < 0:
+            stream_id = data.stream_id = self.get_stream_id(data.symbol, data.interval)
+        return stream_id
+
+
+# Shared by the pipeline of the process, ids of different registries differ
+STREAM_REGISTRY: Final[StreamRegistry] = StreamRegistry()
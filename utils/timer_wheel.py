@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import Dict, Generic, Hashable, List, Sequence, Tuple, TypeVar
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+
+
+class HierarchicalTimerWheel(Generic[KeyType]):
+    # Timers are due at integer ticks. Level 0 has a slot per tick, every next
+    # level a slot per full turn of the previous one; timers further away than
+    # all levels wait in overflow. When a level slot comes up its timers are
+    # cascaded to lower levels, so scheduling, cancelling and firing are O(1)
+    # per timer whatever the number of timers
+    _sizes: List[int]
+    _units: List[int]  # Ticks per slot by level
+    _levels: List[List[Dict[KeyType, int]]]  # Level -> slot -> key -> due tick
+    _overflow: Dict[KeyType, int]
+    _locations: Dict[KeyType, Tuple[int, int]]  # (level, slot), overflow level
+    _now: int
+
+    def __init__(self, now: int, sizes: Sequence[int] = (60, 60, 24)) -> None:
+        self._sizes = list(sizes)
+        self._units = list()
+        unit = 1
+        for size in self._sizes:
+            self._units.append(unit)
+            unit *= size
+        self._levels = [[dict() for _ in range(size)] for size in self._sizes]
+        self._overflow = dict()
+        self._locations = dict()
+        self._now = now
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def __contains__(self, key: KeyType) -> bool:
+        return key in self._locations
+
+    @property
+    def now(self) -> int:
+        return self._now
+
+    def _place(self, key: KeyType, due: int) -> None:
+        delta = due - self._now
+        for level, (size, unit) in enumerate(zip(self._sizes, self._units)):
+            if delta < size * unit:
+                slot = (due // unit) % size
+                self._levels[level][slot][key] = due
+                self._locations[key] = (level, slot)
+                return
+
+        self._overflow[key] = due
+        self._locations[key] = (len(self._sizes), 0)
+
+    # Timers due at or before current tick fire on next `advance`
+    def schedule(self, key: KeyType, due: int) -> None:
+        self.cancel(key)
+        self._place(key, max(due, self._now + 1))
+
+    def cancel(self, key: KeyType) -> bool:
+        location = self._locations.pop(key, None)
+        if location is None:
+            return False
+
+        level, slot = location
+        if level == len(self._sizes):
+            del self._overflow[key]
+        else:
+            del self._levels[level][slot][key]
+        return True
+
+    def _cascade(self, timers: Dict[KeyType, int]) -> None:
+        for key, due in timers.items():
+            self._place(key, due)
+
+    # Moves to next tick, returns timers due at it
+    def tick(self) -> List[KeyType]:
+        self._now += 1
+        now = self._now
+        top_span = self._sizes[-1] * self._units[-1]
+        if now % top_span == 0 and self._overflow:
+            overflow, self._overflow = self._overflow, dict()
+            self._cascade(overflow)
+        # Higher levels first, their timers may land in lower level slots
+        # that come up at this same tick
+        for level in range(len(self._sizes) - 1, 0, -1):
+            unit = self._units[level]
+            if now % unit == 0:
+                slot = (now // unit) % self._sizes[level]
+                timers = self._levels[level][slot]
+                if timers:
+                    self._levels[level][slot] = dict()
+                    self._cascade(timers)
+
+        slot = now % self._sizes[0]
+        due = self._levels[0][slot]
+        if not due:
+            return []
+
+        self._levels[0][slot] = dict()
+        for key in due:
+            del self._locations[key]
+        return list(due)
+
+    def advance(self, to: int) -> List[KeyType]:
+        fired: List[KeyType] = list()
+        while self._now < to:
+            fired.extend(self.tick())
+        return fired
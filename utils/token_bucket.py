@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    _rate: float  # Tokens added per second
+    _capacity: float  # Max burst size
+    _tokens: float
+    _updated_at: float
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+
+        self._rate = rate
+        self._capacity = capacity if capacity is not None else rate
+        self._tokens = self._capacity
+        self._updated_at = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+
+    def time_until_available(self, tokens: float = 1) -> float:
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self._rate)
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        self._refill()
+        if self._tokens < tokens:
+            return False
+
+        self._tokens -= tokens
+        return True
+
+    async def acquire(self, tokens: float = 1) -> None:
+        if tokens > self._capacity:
+            raise ValueError(
+                f"Cannot acquire {tokens} tokens, capacity is {self._capacity}"
+            )
+
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.time_until_available(tokens))